@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+房间分析结果缓存
+同一张图片、同样的模型/Prompt/温度再分析一次，结果应该直接复用，而不是再等一次最长 120 秒的 Qwen 调用。
+
+缓存键 = SHA-256(
+    图片内容（预处理后的 data URL，或远程图片 URL）,
+    模型名,
+    SYSTEM_PROMPT 和用户 Prompt 的哈希,
+    temperature
+)
+只缓存解析成功并通过验证的结果。存放在 SQLite 中，支持过期时间和总大小上限（按最近使用淘汰），
+命中/未命中次数会累计保存。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_CACHE_PATH = Path(os.getenv("ANALYSIS_CACHE_PATH", SCRIPT_DIR / ".analysis_cache.sqlite3"))
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    created_at REAL,
+    last_used REAL,
+    size INTEGER,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER);
+"""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(image_input: str, model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+    """缓存键；image_input 为实际发给模型的图片（预处理后的 base64 data URL 或图片 URL）"""
+    parts = {
+        "image": _sha256(image_input),
+        "model": model,
+        "prompt": _sha256(system_prompt + "\0" + user_prompt),
+        "temperature": temperature,
+    }
+    return _sha256(json.dumps(parts, sort_keys=True))
+
+
+class AnalysisCache:
+    """持久化的分析结果缓存
+
+    用法:
+        cache = AnalysisCache()
+        key = make_key(image_input, MODEL_VL, SYSTEM_PROMPT, user_prompt, TEMPERATURE)
+        entry = cache.get(key)
+        if entry is None:
+            ...  # 调用模型
+            cache.put(key, {'raw_response': ..., 'parsed_result': ..., 'validation': ...})
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.session = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self._conn = None
+        if enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _count(self, name: str, amount: int = 1):
+        self.session[name] = self.session.get(name, 0) + amount
+        self._conn.execute(
+            "INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """返回缓存的结果；不存在或已过期时返回 None"""
+        if not self.enabled:
+            return None
+        now = now or time.time()
+        with self._conn:
+            row = self._conn.execute("SELECT created_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            created_at, value = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count("expired")
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self._count("hits")
+        entry = json.loads(value)
+        entry["cached_at"] = created_at
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any], now: Optional[float] = None):
+        """保存结果，之后按过期时间和总大小淘汰"""
+        if not self.enabled:
+            return
+        now = now or time.time()
+        value = json.dumps(entry, ensure_ascii=False)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(value.encode("utf-8")), value),
+            )
+            self.evict(now)
+
+    def evict(self, now: Optional[float] = None):
+        """删除过期条目；总大小仍超过上限时按最近使用时间从旧到新删除"""
+        now = now or time.time()
+        expired = self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        if expired:
+            self._count("expired", expired)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._count("evicted", evicted)
+
+    def clear(self):
+        if self.enabled:
+            with self._conn:
+                self._conn.execute("DELETE FROM entries")
+
+    def totals(self) -> Dict[str, int]:
+        """累计统计（所有运行）"""
+        if not self.enabled:
+            return {}
+        return dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+
+    def report(self):
+        if not self.enabled:
+            print("\n🗄️  分析缓存: 未启用")
+            return
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        totals = self.totals()
+        lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        hit_rate = totals.get("hits", 0) / lookups * 100 if lookups else 0
+        print(f"\n🗄️  分析缓存: 本次命中 {self.session['hits']}, 未命中 {self.session['misses']}; "
+              f"累计命中率 {hit_rate:.0f}% ({totals.get('hits', 0)}/{lookups}), "
+              f"过期 {totals.get('expired', 0)}, 淘汰 {totals.get('evicted', 0)}; "
+              f"共 {entries} 条 / {size / 1024:.0f} KB")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+房间分析结果的 Schema 校验
+分析结果的格式用一个 JSON Schema 子集声明（ROOM_ANALYSIS_SCHEMA），导入时编译一次：
+每个节点编译成一个 check 闭包（负责报告错误和修正），整个 Schema 再生成一个内联了所有字段的校验函数，
+绝大多数结果（类型正确、字段齐全）只走这一段直线代码，遇到问题的子树才交给对应的 check 闭包。
+
+除了报告错误，校验还会就地修正模型常见的小问题，并记录在 fixes 中：
+- 类型转换：数字字符串 "4.5" -> 4.5，"true" -> True，整数字段 "92" / 92.0 -> 92，92.6 -> 93（取整）
+- 范围修正：带 clamp 的字段（置信度、bounding box）超出范围时截断到边界，而不是判为无效
+
+支持的 Schema 关键字：type（object / array / string / number / integer / boolean）、properties、required、
+items、enum、minimum、maximum，以及扩展的 clamp（超出范围时截断）。
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOM_TYPES = ['living_room', 'bedroom', 'dining_room', 'home_office']
+ROOM_STYLES = ['Modern', 'Nordic', 'Classic', 'Minimalist', 'Industrial', 'Contemporary', 'Traditional', 'Bohemian']
+FURNITURE_TYPES = ['sofa', 'table', 'chair', 'storage', 'bed', 'desk']
+UNITS = ['meters', 'feet']
+
+# 0-100 的整数置信度（房间类型、尺寸、风格、家具数量）
+PERCENT_CONFIDENCE = {'type': 'integer', 'minimum': 0, 'maximum': 100, 'clamp': True}
+# 0-100 的百分比坐标
+PERCENT = {'type': 'number', 'minimum': 0, 'maximum': 100, 'clamp': True}
+
+ROOM_ANALYSIS_SCHEMA: Dict[str, Any] = {
+    'type': 'object',
+    'required': ['isEmpty', 'roomType', 'roomDimensions', 'roomStyle', 'detectedItems', 'furnitureCount'],
+    'properties': {
+        'isEmpty': {'type': 'boolean'},
+        'roomType': {
+            'type': 'object',
+            'required': ['value', 'confidence'],
+            'properties': {
+                'value': {'type': 'string', 'enum': ROOM_TYPES},
+                'confidence': PERCENT_CONFIDENCE,
+            },
+        },
+        'roomDimensions': {
+            'type': 'object',
+            'required': ['length', 'width', 'height', 'unit', 'confidence'],
+            'properties': {
+                'length': {'type': 'number', 'minimum': 0},
+                'width': {'type': 'number', 'minimum': 0},
+                'height': {'type': 'number', 'minimum': 0},
+                'unit': {'type': 'string', 'enum': UNITS},
+                'confidence': PERCENT_CONFIDENCE,
+            },
+        },
+        'roomStyle': {
+            'type': 'object',
+            'required': ['value'],
+            'properties': {
+                'value': {'type': 'string', 'enum': ROOM_STYLES},
+                'confidence': PERCENT_CONFIDENCE,
+            },
+        },
+        'detectedItems': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'required': ['itemId', 'furnitureType', 'boundingBox', 'confidence'],
+                'properties': {
+                    'itemId': {'type': 'string'},
+                    'furnitureType': {'type': 'string', 'enum': FURNITURE_TYPES},
+                    'boundingBox': {
+                        'type': 'object',
+                        'properties': {'x': PERCENT, 'y': PERCENT, 'width': PERCENT, 'height': PERCENT},
+                    },
+                    'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1, 'clamp': True},
+                },
+            },
+        },
+        'furnitureCount': {
+            'type': 'object',
+            'properties': {
+                'value': {'type': 'integer', 'minimum': 0},
+                'confidence': PERCENT_CONFIDENCE,
+            },
+        },
+    },
+}
+
+TYPE_NAMES = {
+    'object': '对象', 'array': '数组', 'string': '字符串',
+    'number': '数字', 'integer': '整数', 'boolean': '布尔值',
+}
+
+# check(value, path, errors, fixes) -> 修正后的值
+# path 是 (上一层 path, 键或下标) 组成的链表，只在需要报告错误/修正时才格式化成字符串
+Path = Optional[Tuple[Any, Any]]
+Check = Callable[[Any, Path, List[str], List[str]], Any]
+_MISSING = object()
+
+
+@dataclass
+class ValidationResult:
+    is_valid: bool
+    errors: List[str] = field(default_factory=list)
+    fixes: List[str] = field(default_factory=list)
+
+
+def format_path(path: Path) -> str:
+    """(((None, 'detectedItems'), 0), 'confidence') -> 'detectedItems[0].confidence'"""
+    parts = []
+    while path is not None:
+        path, key = path
+        parts.append(f"[{key}]" if isinstance(key, int) else key)
+    text = ''
+    for part in reversed(parts):
+        text += part if part.startswith('[') or not text else '.' + part
+    return text
+
+
+def _compile_object(schema: Dict[str, Any]) -> Check:
+    properties: List[Tuple[str, Check]] = [(key, compile_check(sub)) for key, sub in schema.get('properties', {}).items()]
+    required = list(schema.get('required', ()))
+
+    def check(value, path, errors, fixes):
+        if type(value) is not dict:
+            errors.append(f"{format_path(path) or '结果'} 必须是对象")
+            return value
+        for key in required:
+            if key not in value:
+                errors.append(f"{format_path(path)} 缺少字段: {key}" if path else f"缺少必需字段: {key}")
+        for key, check_property in properties:
+            item = value.get(key, _MISSING)
+            if item is not _MISSING:
+                fixed = check_property(item, (path, key), errors, fixes)
+                if fixed is not item:
+                    value[key] = fixed
+        return value
+
+    return check
+
+
+def _compile_array(schema: Dict[str, Any]) -> Check:
+    check_item = compile_check(schema['items']) if 'items' in schema else None
+
+    def check(value, path, errors, fixes):
+        if type(value) is not list:
+            errors.append(f"{format_path(path)} 必须是数组")
+            return value
+        if check_item is not None:
+            for i, item in enumerate(value):
+                fixed = check_item(item, (path, i), errors, fixes)
+                if fixed is not item:
+                    value[i] = fixed
+        return value
+
+    return check
+
+
+def _compile_string(schema: Dict[str, Any]) -> Check:
+    enum = schema.get('enum')
+    allowed = frozenset(enum) if enum else None
+
+    def check(value, path, errors, fixes):
+        if type(value) is not str:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                fixes.append(f"{format_path(path)}: {value!r} 转换为字符串")
+                value = str(value)
+            else:
+                errors.append(f"{format_path(path)} 必须是字符串")
+                return value
+        if allowed is not None and value not in allowed:
+            errors.append(f"{format_path(path)} 无效: {value} (必须是以下之一: {', '.join(enum)})")
+        return value
+
+    return check
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    """"92" / " 4.5 " / "85%" -> 数字；其它类型返回 None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value.strip().rstrip('%'))
+    except ValueError:
+        return None
+
+
+def _compile_number(schema: Dict[str, Any]) -> Check:
+    integer = schema['type'] == 'integer'
+    minimum, maximum = schema.get('minimum'), schema.get('maximum')
+    low = float('-inf') if minimum is None else minimum
+    high = float('inf') if maximum is None else maximum
+    clamp = schema.get('clamp', False)
+    type_name = TYPE_NAMES[schema['type']]
+
+    def check(value, path, errors, fixes):
+        kind = type(value)
+        # 常见情况：类型正确且在范围内（NaN 比较总是 False；inf 在没有上下限时能通过比较，需要单独排除）
+        if (kind is int or (kind is float and not integer and math.isfinite(value))) and low <= value <= high:
+            return value
+
+        number = value
+        if kind is not int and kind is not float:
+            number = _parse_number(value)
+            if number is None:
+                errors.append(f"{format_path(path)} 必须是{type_name}: {value!r}")
+                return value
+        if isinstance(number, float) and not math.isfinite(number):
+            errors.append(f"{format_path(path)} 必须是{type_name}: {value!r}")
+            return value
+        rounded = False
+        if integer and isinstance(number, float):
+            rounded = not number.is_integer()
+            number = round(number)
+        clamped = False
+        if number < low:
+            if not clamp:
+                errors.append(f"{format_path(path)} 超出范围: {number} (最小 {minimum})")
+                return number
+            number, clamped = minimum, True
+        elif number > high:
+            if not clamp:
+                errors.append(f"{format_path(path)} 超出范围: {number} (最大 {maximum})")
+                return number
+            number, clamped = maximum, True
+        if clamped:
+            fixes.append(f"{format_path(path)}: {value!r} 超出范围，修正为 {number!r}")
+        elif rounded:
+            fixes.append(f"{format_path(path)}: {value!r} 不是整数，取整为 {number!r}")
+        elif number is not value:
+            fixes.append(f"{format_path(path)}: {value!r} 转换为{type_name}")
+        return number
+
+    return check
+
+
+def _compile_boolean(schema: Dict[str, Any]) -> Check:
+    names = {'true': True, 'false': False, 'yes': True, 'no': False, '1': True, '0': False}
+
+    def check(value, path, errors, fixes):
+        if value is True or value is False:
+            return value
+        fixed = names.get(value.strip().lower()) if isinstance(value, str) else (
+            bool(value) if value in (0, 1) else None)
+        if fixed is None:
+            errors.append(f"{format_path(path)} 必须是布尔值: {value!r}")
+            return value
+        fixes.append(f"{format_path(path)}: {value!r} 转换为布尔值")
+        return fixed
+
+    return check
+
+
+COMPILERS: Dict[str, Callable[[Dict[str, Any]], Check]] = {
+    'object': _compile_object,
+    'array': _compile_array,
+    'string': _compile_string,
+    'number': _compile_number,
+    'integer': _compile_number,
+    'boolean': _compile_boolean,
+}
+
+
+def compile_check(schema: Dict[str, Any]) -> Check:
+    """把一个 Schema 节点编译成 check 函数"""
+    try:
+        return COMPILERS[schema['type']](schema)
+    except KeyError:
+        raise ValueError(f"不支持的 Schema: {schema}") from None
+
+
+class _FastPathCompiler:
+    """把 Schema 编译成一个 Python 函数的源码：只内联"类型正确、字段齐全、在范围内"的常见情况，
+    其余情况交给对应节点的 check 闭包（报告错误、转换类型、修正范围）"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {'_MISSING': _MISSING}
+        self.counter = 0
+
+    def name(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def const(self, value: Any) -> str:
+        name = self.name('_c')
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def node(self, schema: Dict[str, Any], var: str, path: str, target: str, indent: int):
+        """校验变量 var；target 为需要替换修正后的值时的赋值目标"""
+        slow = self.const(compile_check(schema))
+        kind = schema['type']
+        if kind == 'object':
+            required = schema.get('required', ())
+            condition = ' and '.join([f"type({var}) is dict"] + [f"{key!r} in {var}" for key in required])
+            self.emit(indent, f"if {condition}:")
+            if not schema.get('properties'):
+                self.emit(indent + 1, "pass")
+            for key, sub in schema.get('properties', {}).items():
+                child = self.name('v')
+                if key in required:
+                    self.emit(indent + 1, f"{child} = {var}[{key!r}]")
+                    self.node(sub, child, f"({path}, {key!r})", f"{var}[{key!r}]", indent + 1)
+                else:
+                    self.emit(indent + 1, f"{child} = {var}.get({key!r}, _MISSING)")
+                    self.emit(indent + 1, f"if {child} is not _MISSING:")
+                    self.node(sub, child, f"({path}, {key!r})", f"{var}[{key!r}]", indent + 2)
+            self.emit(indent, "else:")
+            self.emit(indent + 1, f"{slow}({var}, {path}, errors, fixes)")
+            return
+        if kind == 'array':
+            self.emit(indent, f"if type({var}) is list:")
+            if 'items' not in schema:
+                self.emit(indent + 1, "pass")
+            else:
+                index, item = self.name('i'), self.name('v')
+                self.emit(indent + 1, f"for {index}, {item} in enumerate({var}):")
+                self.node(schema['items'], item, f"({path}, {index})", f"{var}[{index}]", indent + 2)
+            self.emit(indent, "else:")
+            self.emit(indent + 1, f"{slow}({var}, {path}, errors, fixes)")
+            return
+
+        if kind == 'string':
+            condition = f"type({var}) is str"
+            if schema.get('enum'):
+                condition += f" and {var} in {self.const(frozenset(schema['enum']))}"
+        elif kind == 'boolean':
+            condition = f"{var} is True or {var} is False"
+        else:
+            types = f"type({var}) is int" if kind == 'integer' else f"(type({var}) is int or type({var}) is float)"
+            bounds = [f"{schema['minimum']!r} <= {var}"] if schema.get('minimum') is not None else []
+            bounds += [f"{var} <= {schema['maximum']!r}"] if schema.get('maximum') is not None else []
+            if kind == 'number':
+                # 没有上下限的一侧用严格比较排除 inf；NaN 在任何比较中都是 False
+                if schema.get('minimum') is None:
+                    bounds.insert(0, f"{self.const(float('-inf'))} < {var}")
+                if schema.get('maximum') is None:
+                    bounds.append(f"{var} < {self.const(float('inf'))}")
+            condition = ' and '.join([types] + bounds)
+        self.emit(indent, f"if not ({condition}):")
+        self.emit(indent + 1, f"{target} = {slow}({var}, {path}, errors, fixes)")
+
+    def compile(self, schema: Dict[str, Any]) -> Tuple[Callable[[Any, List[str], List[str]], None], str]:
+        self.emit(0, "def validate(data, errors, fixes):")
+        self.node(schema, 'data', 'None', 'data', 1)
+        source = '\n'.join(self.lines)
+        exec(compile(source, '<analysis_schema>', 'exec'), self.namespace)
+        return self.namespace['validate'], source
+
+
+class Validator:
+    """编译好的校验器；validate() 就地修正 data 并返回错误和修正记录"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._validate, self.source = _FastPathCompiler().compile(schema)
+        # 顶层字段的单独校验，供流式输出时逐个字段检查
+        self._fields = {key: compile_check(sub) for key, sub in schema.get('properties', {}).items()}
+
+    def validate(self, data: Any) -> ValidationResult:
+        errors: List[str] = []
+        fixes: List[str] = []
+        self._validate(data, errors, fixes)
+        return ValidationResult(not errors, errors, fixes)
+
+    def validate_field(self, name: str, value: Any) -> Tuple[Any, ValidationResult]:
+        """校验单个顶层字段，返回 (修正后的值, 结果)；未知字段视为有效"""
+        check = self._fields.get(name)
+        if check is None:
+            return value, ValidationResult(True)
+        errors: List[str] = []
+        fixes: List[str] = []
+        value = check(value, (None, name), errors, fixes)
+        return value, ValidationResult(not errors, errors, fixes)
+
+
+ROOM_ANALYSIS_VALIDATOR = Validator(ROOM_ANALYSIS_SCHEMA)
+
+
+def validate_room_analysis(data: Any) -> ValidationResult:
+    """校验（并就地修正）一条房间分析结果"""
+    return ROOM_ANALYSIS_VALIDATOR.validate(data)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+批量房间分析
+对一个目录（或清单文件）中的房间图片并发调用 Qwen-VL，结果逐条写入 JSONL，用于在几百个房间上评估 Prompt 改动。
+
+- 复用同一个异步 HTTP 客户端（http_clients.py：连接池 + keep-alive，装了 h2 时用 HTTP/2），最多 --concurrency 个请求同时进行
+- 令牌桶限流（--rate 个请求/秒，允许 --burst 个突发）
+- 429 / 5xx / 网络错误按指数退避 + 随机抖动重试，遵守 Retry-After
+- 通过验证的结果写入分析缓存（analysis_cache.py），重跑时直接复用
+
+清单文件格式:
+    .txt    每行一个图片路径或 URL
+    .jsonl  每行 {"image": "...", "id": "...", "length": 4.5, "width": 3.8, "height": 2.7, "unit": "meters"}
+相对路径相对于清单文件所在目录。
+
+用法:
+    python batch_room_analysis.py ./test_images --concurrency 8 --rate 4
+    python batch_room_analysis.py rooms.jsonl --system-prompt prompt_v2.txt --output output/v2.jsonl
+
+本地测试（不消耗额度）:
+    python mock_ai_services.py --port 8900 --rate-limit-rate 0.05 --error-rate 0.05 &
+    DASHSCOPE_API_BASE=http://127.0.0.1:8900/compatible-mode/v1 DASHSCOPE_API_KEY=sk-test \\
+        python batch_room_analysis.py ./test_images --no-cache
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:  # 没有 httpx 时改用线程池 + requests
+    httpx = None
+
+from analysis_cache import AnalysisCache, make_key
+from analysis_schema import validate_room_analysis
+from http_clients import HTTP2_AVAILABLE, RetryPolicy, async_client, new_session, request_with_retry
+from image_preprocess import PreprocessOptions, DEFAULT_MAX_SIDE, DEFAULT_QUALITY
+from test_qwen_room_analysis import (
+    DASHSCOPE_API_BASE, MODEL_VL, SYSTEM_PROMPT, TEMPERATURE,
+    build_payload, get_user_prompt, parse_ai_response, prepare_image_input,
+)
+
+SCRIPT_DIR = Path(__file__).parent
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.heic', '.heif'}
+REQUEST_TIMEOUT = 120
+
+
+@dataclass
+class BatchItem:
+    id: str
+    image: str
+    room_dimensions: Optional[Dict[str, Any]] = None
+
+
+class TokenBucket:
+    """令牌桶限流：每秒补充 rate 个令牌，最多积累 burst 个；rate <= 0 时不限流"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:  # 排队的请求按顺序拿令牌
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _room_dimensions(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    dims = entry.get('room_dimensions') or entry
+    if all(dims.get(key) for key in ('length', 'width', 'height')):
+        return {'length': dims['length'], 'width': dims['width'], 'height': dims['height'],
+                'unit': dims.get('unit', 'meters')}
+    return None
+
+
+def _resolve(image: str, base_dir: Path) -> str:
+    if image.startswith('http://') or image.startswith('https://') or os.path.isabs(image):
+        return image
+    return str(base_dir / image)
+
+
+def load_items(source: str) -> List[BatchItem]:
+    """从目录或清单文件读取待分析的图片"""
+    path = Path(source)
+    if path.is_dir():
+        images = sorted(p for p in path.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+        return [BatchItem(str(p.relative_to(path)), str(p)) for p in images]
+
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.suffix.lower() == '.jsonl':
+                entry = json.loads(line)
+                image = _resolve(entry['image'], path.parent)
+                items.append(BatchItem(str(entry.get('id') or entry['image']), image, _room_dimensions(entry)))
+            else:
+                items.append(BatchItem(line, _resolve(line, path.parent)))
+    return items
+
+
+class ApiError(Exception):
+    def __init__(self, status: Optional[int], message: str, attempts: int = 1):
+        super().__init__(message)
+        self.status = status
+        self.attempts = attempts
+
+
+class BatchAnalyzer:
+    """并发分析一批房间图片"""
+
+    def __init__(self, api_key: str, base_url: str = DASHSCOPE_API_BASE, concurrency: int = 8,
+                 rate: float = 5.0, burst: int = 5, retry: Optional[RetryPolicy] = None,
+                 timeout: float = REQUEST_TIMEOUT, preprocess: Optional[PreprocessOptions] = None,
+                 system_prompt: str = SYSTEM_PROMPT, cache: Optional[AnalysisCache] = None):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retry = retry or RetryPolicy(max_retries=4, retry_post=True)
+        self.timeout = timeout
+        self.preprocess = preprocess
+        self.system_prompt = system_prompt
+        self.cache = cache or AnalysisCache(enabled=False)
+        self.statuses: Dict[str, int] = {}
+        self._client = None
+        self._session = None
+
+    # ---------- HTTP ----------
+
+    async def post(self, payload: Dict[str, Any], bucket: TokenBucket) -> Tuple[Dict[str, Any], int]:
+        """发送请求，429 / 5xx / 网络错误时按 self.retry 重试；返回 (响应 JSON, 尝试次数)"""
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"}
+        attempts = 0
+
+        def count(status: Optional[int]):
+            nonlocal attempts
+            attempts += 1
+            if status is not None:
+                self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+        try:
+            if self._client is not None:
+                # 每次尝试（包括重试）都先经过令牌桶
+                response = await request_with_retry(
+                    self._client, 'POST', self.url, retry=self.retry, before_attempt=bucket.acquire,
+                    after_attempt=lambda r: count(r.status_code if r is not None else None),
+                    headers=headers, json=payload,
+                )
+            else:
+                # 没有 httpx 时由 Session 的 urllib3 Retry 重试，只有第一次尝试经过令牌桶
+                await bucket.acquire()
+                response = await asyncio.to_thread(self._session.post, self.url, headers=headers,
+                                                   json=payload, timeout=self.timeout)
+                retries = getattr(response.raw, 'retries', None)
+                for history in (retries.history if retries is not None else ()):
+                    count(history.status)
+                count(response.status_code)
+        except Exception as e:  # httpx.TransportError / requests.RequestException
+            raise ApiError(None, f"网络错误: {type(e).__name__}: {e}", max(attempts, 1))
+        status = response.status_code
+        if status >= 400:
+            raise ApiError(status, f"Qwen API 错误 ({status}): {response.text[:200]}", attempts)
+        return response.json(), attempts
+
+    # ---------- 单个图片 ----------
+
+    async def analyze(self, item: BatchItem, bucket: TokenBucket, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        record: Dict[str, Any] = {'id': item.id, 'image': item.image, 'ok': False, 'cached': False, 'attempts': 0}
+        start = time.perf_counter()
+        async with semaphore:
+            record['queued_ms'] = round((time.perf_counter() - start) * 1000)
+            try:
+                # 预处理（解码、缩放、编码）是 CPU 密集的，放到线程里做
+                image_input = await asyncio.to_thread(prepare_image_input, item.image, self.preprocess)
+                user_prompt = get_user_prompt(item.room_dimensions)
+                key = make_key(image_input, MODEL_VL, self.system_prompt, user_prompt, TEMPERATURE)
+                cached = self.cache.get(key)
+                if cached:
+                    record.update(ok=True, cached=True, raw_response=cached['raw_response'],
+                                  parsed_result=cached['parsed_result'], **cached['validation'])
+                    return self._finish(record, start)
+
+                payload = build_payload(image_input, item.room_dimensions, self.system_prompt)
+                request_start = time.perf_counter()
+                response, record['attempts'] = await self.post(payload, bucket)
+                record['request_ms'] = round((time.perf_counter() - request_start) * 1000)
+                # 200 但格式不对的响应（缺少 choices / message、content 为 null）只让这一张图片失败
+                choices = response.get('choices') or []
+                if not choices:
+                    record['error'] = "API 响应格式错误: 缺少 choices 字段"
+                    return self._finish(record, start)
+                ai_content = choices[0]['message']['content']
+                if not isinstance(ai_content, str):
+                    record['error'] = f"API 响应格式错误: content 为 {type(ai_content).__name__}"
+                    return self._finish(record, start)
+            except ApiError as e:
+                record.update(error=str(e), status=e.status, attempts=e.attempts)
+                return self._finish(record, start)
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+                return self._finish(record, start)
+
+        result = parse_ai_response(ai_content)
+        record.update(raw_response=ai_content, usage=response.get('usage'))
+        if not result:
+            record['error'] = "无法解析 JSON 响应"
+            return self._finish(record, start)
+        report = validate_room_analysis(result)
+        is_valid, errors = report.is_valid, report.errors
+        record.update(ok=True, parsed_result=result, is_valid=is_valid, errors=errors, fixes=report.fixes)
+        if is_valid:
+            self.cache.put(key, {'raw_response': ai_content, 'parsed_result': result,
+                                 'validation': {'is_valid': is_valid, 'errors': errors}})
+        return self._finish(record, start)
+
+    @staticmethod
+    def _finish(record: Dict[str, Any], start: float) -> Dict[str, Any]:
+        record['latency_ms'] = round((time.perf_counter() - start) * 1000)
+        return record
+
+    # ---------- 批量 ----------
+
+    async def run(self, items: List[BatchItem], output_path: Path) -> List[Dict[str, Any]]:
+        """并发分析，每完成一个就追加一行到 output_path；返回所有记录（按完成顺序）"""
+        bucket = TokenBucket(self.rate, self.burst)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        records = []
+
+        if httpx is not None:
+            self._client = async_client(concurrency=self.concurrency, timeout=self.timeout)
+        else:
+            self._session = new_session(self.retry, pool_maxsize=self.concurrency)
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                tasks = [asyncio.create_task(self.analyze(item, bucket, semaphore)) for item in items]
+                for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                    record = await task
+                    records.append(record)
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    f.flush()
+                    mark = '⚡' if record['cached'] else ('✅' if record.get('is_valid') else ('⚠️ ' if record['ok'] else '❌'))
+                    print(f"{mark} [{done}/{len(items)}] {record['id']} {record['latency_ms']} ms"
+                          + (f" ({record['attempts']} 次尝试)" if record['attempts'] > 1 else '')
+                          + (f" - {record['error']}" if record.get('error') else ''))
+        finally:
+            if self._client is not None:
+                await self._client.aclose()
+            if self._session is not None:
+                self._session.close()
+        return records
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def print_summary(records: List[Dict[str, Any]], elapsed: float, statuses: Dict[str, int]):
+    ok = [r for r in records if r['ok']]
+    valid = [r for r in ok if r.get('is_valid')]
+    cached = [r for r in records if r['cached']]
+    called = [r['latency_ms'] for r in records if r['ok'] and not r['cached']]
+    retries = sum(max(0, r['attempts'] - 1) for r in records)
+    fixes = sum(len(r.get('fixes') or []) for r in records)
+    print("\n" + "=" * 60)
+    print("📊 批量分析结果")
+    print("=" * 60)
+    print(f"   图片: {len(records)}, 成功: {len(ok)}, 通过验证: {len(valid)}, 缓存命中: {len(cached)}, "
+          f"失败: {len(records) - len(ok)}")
+    print(f"   总耗时: {elapsed:.1f} 秒, 吞吐: {len(records) / elapsed * 60 if elapsed else 0:.1f} 张/分钟")
+    if called:
+        print(f"   延迟: p50 {percentile(called, 50):.0f} ms, p95 {percentile(called, 95):.0f} ms, "
+              f"最大 {max(called):.0f} ms")
+    print(f"   自动修正: {fixes} 处, 重试: {retries} 次, HTTP 状态: {', '.join(f'{k}×{v}' for k, v in sorted(statuses.items())) or '无'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量测试 Qwen 房间分析')
+    parser.add_argument('source', help='图片目录，或清单文件（.txt 每行一个路径/URL，.jsonl 每行一个对象）')
+    parser.add_argument('--output', help='结果 JSONL（默认 output/room_analysis_<时间>.jsonl）')
+    parser.add_argument('--api-key', help='DashScope API Key (或设置环境变量 DASHSCOPE_API_KEY)')
+    parser.add_argument('--base-url', default=DASHSCOPE_API_BASE, help='API 地址（或设置环境变量 DASHSCOPE_API_BASE）')
+    parser.add_argument('--system-prompt', help='从文件读取 System Prompt（评估 Prompt 改动）')
+    parser.add_argument('--concurrency', type=int, default=8, help='最大并发请求数（默认 8）')
+    parser.add_argument('--rate', type=float, default=5.0, help='每秒最多发起的请求数，0 不限（默认 5）')
+    parser.add_argument('--burst', type=int, default=5, help='令牌桶容量（默认 5）')
+    parser.add_argument('--max-retries', type=int, default=4, help='429/5xx 最多重试次数（默认 4）')
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help='单个请求超时（秒）')
+    parser.add_argument('--limit', type=int, help='只分析前 N 张')
+    parser.add_argument('--max-side', type=int, default=DEFAULT_MAX_SIDE, help='本地图片上传前缩小到的最长边像素')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help='重新编码质量')
+    parser.add_argument('--no-preprocess', action='store_true', help='本地图片不做预处理，原样上传')
+    parser.add_argument('--no-cache', action='store_true', help='不使用分析缓存')
+    args = parser.parse_args()
+
+    api_key = args.api_key or os.getenv('DASHSCOPE_API_KEY')
+    if not api_key:
+        print("❌ 错误: 未找到 API Key")
+        print("   请设置环境变量 DASHSCOPE_API_KEY 或使用 --api-key 参数")
+        return 1
+
+    items = load_items(args.source)[:args.limit]
+    if not items:
+        print(f"❌ 没有找到图片: {args.source}")
+        return 1
+
+    system_prompt = SYSTEM_PROMPT
+    if args.system_prompt:
+        with open(args.system_prompt, 'r', encoding='utf-8') as f:
+            system_prompt = f.read()
+    output_path = Path(args.output or SCRIPT_DIR / 'output' / f"room_analysis_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+
+    preprocess = PreprocessOptions(max_side=args.max_side, quality=args.quality, enabled=not args.no_preprocess)
+    cache = AnalysisCache(enabled=not args.no_cache)
+    analyzer = BatchAnalyzer(api_key, args.base_url, concurrency=args.concurrency, rate=args.rate,
+                             burst=args.burst, retry=RetryPolicy(max_retries=args.max_retries, retry_post=True),
+                             timeout=args.timeout, preprocess=preprocess, system_prompt=system_prompt, cache=cache)
+
+    prompt_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+    print(f"📤 批量分析 {len(items)} 张图片 (模型: {MODEL_VL}, Prompt: {prompt_hash}, "
+          f"并发 {args.concurrency}, 限流 {args.rate or '不限'}/秒, "
+          f"{('httpx + HTTP/2' if HTTP2_AVAILABLE else 'httpx') if httpx is not None else 'requests 线程池'})")
+    start = time.perf_counter()
+    try:
+        records = asyncio.run(analyzer.run(items, output_path))
+    finally:
+        cache.report()
+        cache.close()
+    print_summary(records, time.perf_counter() - start, analyzer.statuses)
+    print(f"\n💾 结果已保存到: {output_path}")
+    return 0 if all(r['ok'] for r in records) else 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+分析结果校验的微基准测试
+生成几千条分析结果（正常的、带字符串数字的、置信度超出范围的、枚举值无效的），
+对比原来手写循环的 validate_analysis_result、只用节点闭包的校验和编译后的 Schema 校验器（analysis_schema.py）的耗时，
+确认校验的开销相对于一次模型调用（秒级）可以忽略。
+计时之前先用一组边界情况（EDGE_CASES）检查节点闭包和编译后的快速路径给出同样的修正值、错误和修正记录。
+"""
+
+import argparse
+import copy
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from analysis_schema import (
+    FURNITURE_TYPES, ROOM_ANALYSIS_SCHEMA, ROOM_STYLES, ROOM_TYPES, compile_check, validate_room_analysis,
+)
+
+
+def legacy_validate(result: Dict[str, Any]) -> tuple[bool, list[str]]:
+    """原来的 validate_analysis_result（手写循环）"""
+    errors = []
+    
+    # 检查必需字段
+    required_fields = ['isEmpty', 'roomType', 'roomDimensions', 'roomStyle', 'detectedItems', 'furnitureCount']
+    for field in required_fields:
+        if field not in result:
+            errors.append(f"缺少必需字段: {field}")
+    
+    # 检查房间类型
+    if 'roomType' in result:
+        room_type = result['roomType']
+        if 'value' not in room_type:
+            errors.append("roomType 缺少 value 字段")
+        elif room_type['value'] not in ['living_room', 'bedroom', 'dining_room', 'home_office']:
+            errors.append(f"roomType.value 无效: {room_type['value']}")
+        if 'confidence' not in room_type:
+            errors.append("roomType 缺少 confidence 字段")
+        elif not (0 <= room_type['confidence'] <= 100):
+            errors.append(f"roomType.confidence 超出范围: {room_type['confidence']}")
+    
+    # 检查房间尺寸
+    if 'roomDimensions' in result:
+        dims = result['roomDimensions']
+        required_dims = ['length', 'width', 'height', 'unit', 'confidence']
+        for field in required_dims:
+            if field not in dims:
+                errors.append(f"roomDimensions 缺少字段: {field}")
+        if 'unit' in dims and dims['unit'] not in ['meters', 'feet']:
+            errors.append(f"roomDimensions.unit 无效: {dims['unit']}")
+    
+    # 检查房间风格
+    if 'roomStyle' in result:
+        style = result['roomStyle']
+        valid_styles = ['Modern', 'Nordic', 'Classic', 'Minimalist', 'Industrial', 'Contemporary', 'Traditional', 'Bohemian']
+        if 'value' not in style:
+            errors.append("roomStyle 缺少 value 字段")
+        elif style['value'] not in valid_styles:
+            errors.append(f"roomStyle.value 无效: {style['value']}")
+    
+    # 检查家具列表
+    if 'detectedItems' in result:
+        if not isinstance(result['detectedItems'], list):
+            errors.append("detectedItems 必须是数组")
+        else:
+            valid_furniture_types = ['sofa', 'table', 'chair', 'storage', 'bed', 'desk']
+            for i, item in enumerate(result['detectedItems']):
+                required_item_fields = ['itemId', 'furnitureType', 'boundingBox', 'confidence']
+                for field in required_item_fields:
+                    if field not in item:
+                        errors.append(f"detectedItems[{i}] 缺少字段: {field}")
+                # 验证家具类型
+                if 'furnitureType' in item:
+                    if item['furnitureType'] not in valid_furniture_types:
+                        errors.append(f"detectedItems[{i}].furnitureType 无效: {item['furnitureType']} (必须是以下之一: {', '.join(valid_furniture_types)})")
+    
+    return len(errors) == 0, errors
+
+
+def legacy_validate_safe(result: Dict[str, Any]) -> tuple[bool, list[str]]:
+    """原校验器遇到字符串置信度会抛出 TypeError，这里按无效处理"""
+    try:
+        return legacy_validate(result)
+    except TypeError as e:
+        return False, [f"TypeError: {e}"]
+
+
+def make_result(rng: random.Random) -> Dict[str, Any]:
+    """随机生成一条分析结果；约 1/4 带有需要修正或无效的字段"""
+    items = [{
+        "itemId": f"item_{i + 1}",
+        "furnitureType": rng.choice(FURNITURE_TYPES),
+        "boundingBox": {"x": rng.randint(0, 80), "y": rng.randint(0, 80),
+                        "width": rng.randint(5, 40), "height": rng.randint(5, 40)},
+        "confidence": round(rng.uniform(0.5, 1.0), 2),
+    } for i in range(rng.randint(0, 12))]
+    result = {
+        "isEmpty": not items,
+        "roomType": {"value": rng.choice(ROOM_TYPES), "confidence": rng.randint(50, 100)},
+        "roomDimensions": {"length": round(rng.uniform(2.5, 8), 1), "width": round(rng.uniform(2.5, 6), 1),
+                           "height": round(rng.uniform(2.4, 3.2), 1), "unit": "meters",
+                           "confidence": rng.randint(40, 90)},
+        "roomStyle": {"value": rng.choice(ROOM_STYLES), "confidence": rng.randint(50, 100)},
+        "detectedItems": items,
+        "furnitureCount": {"value": len(items), "confidence": rng.randint(60, 100)},
+    }
+    kind = rng.random()
+    if kind < 0.08:
+        result["roomType"]["confidence"] = str(result["roomType"]["confidence"])
+        result["roomDimensions"]["length"] = str(result["roomDimensions"]["length"])
+    elif kind < 0.16 and items:
+        items[0]["confidence"] = 1.2
+        items[-1]["boundingBox"]["x"] = -3
+    elif kind < 0.20:
+        result["roomStyle"]["confidence"] += 0.5  # 整数字段给了小数
+    elif kind < 0.25:
+        result["roomStyle"]["value"] = "Japandi"
+    return result
+
+
+# 没有任何问题的分析结果，边界情况在它的基础上改一个字段
+BASE_RESULT = {
+    "isEmpty": True,
+    "roomType": {"value": "bedroom", "confidence": 90},
+    "roomDimensions": {"length": 4.2, "width": 3.5, "height": 2.7, "unit": "meters", "confidence": 80},
+    "roomStyle": {"value": "Modern", "confidence": 80},
+    "detectedItems": [],
+    "furnitureCount": {"value": 0, "confidence": 90},
+}
+
+# (说明, 字段路径, 输入值, 期望的修正值, 期望错误数, 期望修正数)
+EDGE_CASES = [
+    ("整数置信度", ("roomType", "confidence"), 92, 92, 0, 0),
+    ("整数字段的整数值小数", ("roomType", "confidence"), 92.0, 92, 0, 1),
+    ("整数字段的小数", ("roomType", "confidence"), 92.6, 93, 0, 1),
+    ("整数字段的小数字符串", ("roomType", "confidence"), "70.4", 70, 0, 1),
+    ("整数字段取整后超出范围", ("roomType", "confidence"), 100.4, 100, 0, 1),
+    ("整数字段的 NaN", ("roomType", "confidence"), float("nan"), None, 1, 0),
+    ("数字字段保留小数", ("roomDimensions", "length"), 4.5, 4.5, 0, 0),
+    ("数字字段的 NaN", ("roomDimensions", "length"), float("nan"), None, 1, 0),
+    ("数字字段的无穷大", ("roomDimensions", "length"), float("inf"), None, 1, 0),
+    ("数字字段的 NaN 字符串", ("roomDimensions", "length"), "nan", None, 1, 0),
+    ("整数字段的无穷大", ("furnitureCount", "value"), float("inf"), None, 1, 0),
+    ("家具数量的小数", ("furnitureCount", "value"), 3.7, 4, 0, 1),
+]
+
+
+def check_edge_cases() -> int:
+    """节点闭包和编译后的校验器分别校验每个边界情况，返回不符合期望的条数"""
+    check = compile_check(ROOM_ANALYSIS_SCHEMA)
+    failures = 0
+    for label, (parent, key), value, expected, error_count, fix_count in EDGE_CASES:
+        result = copy.deepcopy(BASE_RESULT)
+        result[parent][key] = value
+        closure_data, compiled_data = copy.deepcopy(result), copy.deepcopy(result)
+        errors, fixes = [], []
+        check(closure_data, None, errors, fixes)
+        report = validate_room_analysis(compiled_data)
+        for name, data, errs, fxs in (("节点闭包", closure_data, errors, fixes),
+                                      ("编译后", compiled_data, report.errors, report.fixes)):
+            fixed = data[parent][key]
+            ok = (len(errs), len(fxs)) == (error_count, fix_count) and (
+                expected is None or (fixed == expected and type(fixed) is type(expected)))
+            if not ok:
+                failures += 1
+                print(f"❌ {label} ({name}): {value!r} -> {fixed!r}, 错误 {errs}, 修正 {fxs}")
+    print(f"{'✅' if not failures else '❌'} 边界情况: {len(EDGE_CASES)} 个, 不符合 {failures} 处")
+    return failures
+
+
+def bench(name: str, validate: Callable[[Dict[str, Any]], Any], results: List[Dict[str, Any]], rounds: int):
+    best = None
+    for _ in range(rounds):
+        batch = copy.deepcopy(results)  # 新校验器会就地修正，每轮用新的副本（不计时）
+        start = time.perf_counter()
+        for result in batch:
+            validate(result)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<24}{best * 1000:>10.1f} ms  {best / len(results) * 1e6:>8.1f} µs/条")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分析结果校验耗时')
+    parser.add_argument('--count', type=int, default=5000, help='分析结果条数（默认 5000）')
+    parser.add_argument('--rounds', type=int, default=5, help='重复轮数，取最快的一轮')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if check_edge_cases():
+        return 1
+
+    rng = random.Random(args.seed)
+    results = [make_result(rng) for _ in range(args.count)]
+    items = sum(len(r["detectedItems"]) for r in results)
+    print(f"📊 {args.count} 条分析结果, 共 {items} 件家具")
+
+    legacy = bench("原手写校验", legacy_validate_safe, results, args.rounds)
+    check = compile_check(ROOM_ANALYSIS_SCHEMA)
+    bench("仅节点闭包（不内联）", lambda result: check(result, None, [], []), results, args.rounds)
+    compiled = bench("编译后的 Schema 校验", validate_room_analysis, results, args.rounds)
+    print(f"   编译后 / 原手写: {compiled / legacy:.2f}× (多校验了家具的 bounding box、置信度范围和各字段类型)")
+
+    reports = [validate_room_analysis(r) for r in copy.deepcopy(results)]
+    legacy_reports = [legacy_validate_safe(r) for r in results]
+    legacy_valid = sum(valid for valid, _ in legacy_reports)
+    legacy_crashes = sum(1 for _, errors in legacy_reports if errors and errors[0].startswith('TypeError'))
+    print(f"\n✅ 通过: 原校验 {legacy_valid}/{args.count} (TypeError {legacy_crashes} 条), Schema 校验 {sum(r.is_valid for r in reports)}/{args.count} "
+          f"(自动修正 {sum(1 for r in reports if r.fixes)} 条)")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Cloudinary 图片变换节省的流量测试
+从商品目录取 N 张图片，分别下载原始 URL 和各用途的变换 URL，统计字节数和下载时间
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from cloudinary_urls import PRESETS, derive_url
+from http_clients import RetryPolicy, new_session
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_YAML = SCRIPT_DIR.parent.parent / "product" / "products.yaml"
+ORIGINAL = "original"
+
+
+def catalog_image_urls(yaml_path: Path, first_only: bool = False, limit: Optional[int] = None) -> List[str]:
+    """从商品目录中取出图片 URL"""
+    sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "product"))
+    from catalog import load_catalog, iter_products
+
+    urls = []
+    for _, product in iter_products(load_catalog(yaml_path)):
+        images = [image["url"] for image in product.get("images") or []]
+        urls.extend(images[:1] if first_only else images)
+        if limit and len(urls) >= limit:
+            return urls[:limit]
+    return urls
+
+
+def fetch_size(session: requests.Session, url: str) -> Tuple[Optional[int], float, str]:
+    """下载图片，返回 (字节数, 耗时秒, Content-Type)；失败时字节数为 None"""
+    start = time.perf_counter()
+    try:
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        return len(response.content), time.perf_counter() - start, response.headers.get("content-type", "")
+    except requests.RequestException as e:
+        print(f"❌ 下载失败: {url} ({e})")
+        return None, time.perf_counter() - start, ""
+
+
+def run(urls: List[str], concurrency: int) -> Dict[str, List[Tuple[Optional[int], float, str]]]:
+    variants = {ORIGINAL: urls}
+    variants.update({purpose: [derive_url(url, purpose) for url in urls] for purpose in PRESETS})
+    # 不重试，耗时只包含一次下载
+    session = new_session(RetryPolicy(max_retries=0), pool_maxsize=concurrency)
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for name, variant_urls in variants.items():
+            results[name] = list(pool.map(lambda u: fetch_size(session, u), variant_urls))
+    return results
+
+
+def print_report(results: Dict[str, List[Tuple[Optional[int], float, str]]]):
+    # 只统计所有版本都下载成功的图片，保证可比
+    count = len(results[ORIGINAL])
+    ok = [i for i in range(count) if all(results[name][i][0] is not None for name in results)]
+    if not ok:
+        print("❌ 没有成功下载的图片")
+        return
+    original_total = sum(results[ORIGINAL][i][0] for i in ok)
+    print(f"\n📊 {len(ok)}/{count} 张图片下载成功")
+    print(f"{'用途':<18}{'总大小':>12}{'平均':>10}{'节省':>8}{'平均耗时':>10}  格式")
+    for name, rows in results.items():
+        total = sum(rows[i][0] for i in ok)
+        avg_time = sum(rows[i][1] for i in ok) / len(ok)
+        types = sorted({rows[i][2].split(';')[0] for i in ok if rows[i][2]})
+        saved = 1 - total / original_total if original_total else 0
+        print(f"{name:<18}{total / 1024 / 1024:>10.2f}MB{total / len(ok) / 1024:>8.1f}KB"
+              f"{saved * 100:>7.1f}%{avg_time * 1000:>8.0f}ms  {', '.join(types)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比原始 Cloudinary 图片和按用途变换后的大小')
+    parser.add_argument('--yaml', default=str(DEFAULT_YAML), help='商品目录 YAML')
+    parser.add_argument('--count', type=int, default=20, help='测试图片数量（默认 20）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发下载数')
+    args = parser.parse_args()
+
+    urls = catalog_image_urls(Path(args.yaml), first_only=True, limit=args.count)
+    print(f"📥 测试 {len(urls)} 张商品图片: 原图 + {', '.join(PRESETS)}")
+    for purpose, preset in PRESETS.items():
+        print(f"   {purpose}: {preset}")
+    print_report(run(urls, args.concurrency))
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
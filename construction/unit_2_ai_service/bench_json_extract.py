@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+JSON 提取基准测试
+对比原来的贪婪正则（re.search(r'\\{[\\s\\S]*\\}')）和 json_extract.py 的单次扫描：
+在各种形态的模型输出（代码块、前后文字、多个 JSON 块、多余逗号、被截断）上能否提取出分析结果，
+以及在构造的恶意输入上的耗时随长度的增长（正则是平方级，扫描是线性的）。
+
+可以用 --corpus 加入真实的模型输出：test_qwen_room_analysis.py --save 保存的 JSON，
+或 batch_room_analysis.py 输出的 JSONL（取其中的 raw_response）。
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from json_extract import locate_json
+from mock_ai_services import SAMPLE_ANALYSIS
+
+ADVERSARIAL_SIZES = (2000, 8000, 32000)
+LEGACY_MAX_SIZE = 40000
+
+
+def legacy_parse(ai_response: str) -> Optional[Dict[str, Any]]:
+    """原来的 parse_ai_response"""
+    try:
+        return json.loads(ai_response)
+    except json.JSONDecodeError:
+        json_match = re.search(r'\{[\s\S]*\}', ai_response)
+        if json_match:
+            try:
+                return json.loads(json_match.group(0))
+            except json.JSONDecodeError:
+                pass
+    return None
+
+
+def new_parse(ai_response: str) -> Optional[Dict[str, Any]]:
+    return locate_json(ai_response)[0]
+
+
+def response_cases() -> List[Tuple[str, str, bool]]:
+    """模型输出的各种形态：(名称, 文本, 是否应该提取出分析结果)"""
+    pretty = json.dumps(SAMPLE_ANALYSIS, ensure_ascii=False, indent=2)
+    compact = json.dumps(SAMPLE_ANALYSIS, ensure_ascii=False)
+    fenced = f"```json\n{pretty}\n```"
+    cases = [
+        ("纯 JSON", pretty, True),
+        ("紧凑 JSON", compact, True),
+        ("代码块", fenced, True),
+        ("前后有说明", f"好的，以下是分析结果：\n\n{fenced}\n\n如需调整请告诉我。", True),
+        ("说明中有花括号", f"字段格式为 {{value, confidence}}。\n{fenced}\n注意 {{}} 表示对象。", True),
+        ("没有代码块 + 花括号", f"格式 {{value}}：\n{pretty}\n以上 {{完}}", True),
+        ("先给示例再给结果", f'示例: {{"roomType": {{"value": "bedroom"}}}}\n\n结果:\n{pretty}', True),
+        ("多余逗号", pretty.replace('"confidence": 0.81\n', '"confidence": 0.81,\n').replace('\n  ]', ',\n  ]'), True),
+        ("字符串中有括号", pretty.replace('"item_1"', '"item_1 {sofa} [L]"'), True),
+        ("未闭合代码块", f"结果如下：\n```json\n{pretty}", True),
+    ]
+    for fraction in (0.5, 0.75, 0.95):
+        cut = int(len(pretty) * fraction)
+        cases.append((f"截断 {int(fraction * 100)}%", f"```json\n{pretty[:cut]}", True))
+    cases.append(("没有 JSON", "抱歉，我无法分析这张图片。", False))
+    return cases
+
+
+def adversarial_cases(sizes=ADVERSARIAL_SIZES) -> List[Tuple[str, str, bool]]:
+    cases = []
+    for n in sizes:
+        cases.append((f"'{{' × {n}", "{" * n, False))
+        cases.append((f"'{{x}}' × {n // 3}", "{x}" * (n // 3), False))
+        cases.append((f"'{{\"a\": [' + '[' × {n}", '{"a": ' + "[" * n, False))
+        cases.append((f"文字 {n} 字符 + '{{'", "分析" * (n // 2) + "{", False))
+    return cases
+
+
+def load_corpus(paths: List[str]) -> List[Tuple[str, str, bool]]:
+    """读取保存的真实模型输出"""
+    cases = []
+    for path in map(Path, paths):
+        files = sorted(path.glob('*.json*')) if path.is_dir() else [path]
+        for file in files:
+            with open(file, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()] if file.suffix == '.jsonl' else [json.load(f)]
+            for i, record in enumerate(records):
+                if record.get('raw_response'):
+                    cases.append((f"{file.name}#{i}", record['raw_response'], True))
+    return cases
+
+
+CRASHED = object()
+
+
+def run_case(parse: Callable[[str], Any], text: str, repeat: int) -> Tuple[Any, float]:
+    """返回 (结果, 平均耗时)；抛出异常时结果为 CRASHED"""
+    start = time.perf_counter()
+    try:
+        for _ in range(repeat):
+            result = parse(text)
+    except Exception:  # 正则版本遇到深层嵌套会 RecursionError
+        return CRASHED, time.perf_counter() - start
+    return result, (time.perf_counter() - start) / repeat
+
+
+def is_analysis(result: Any) -> bool:
+    return isinstance(result, dict) and 'roomType' in result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比 JSON 提取方式的正确性和耗时')
+    parser.add_argument('--corpus', nargs='*', default=[], help='真实模型输出（--save 的 JSON 或批量分析的 JSONL，文件或目录）')
+    parser.add_argument('--repeat', type=int, default=200, help='小输入重复次数（默认 200）')
+    parser.add_argument('--legacy-max-size', type=int, default=LEGACY_MAX_SIZE,
+                        help=f'超过该长度的恶意输入不跑正则（平方级，默认 {LEGACY_MAX_SIZE}）')
+    args = parser.parse_args()
+
+    cases = response_cases() + load_corpus(args.corpus)
+    print(f"{'输入':<28}{'长度':>8}   {'正则':<14}{'单次扫描':<14}方式")
+    ok = {'legacy': 0, 'new': 0}
+    for name, text, expected in cases:
+        legacy, legacy_time = run_case(legacy_parse, text, args.repeat)
+        new, new_time = run_case(new_parse, text, args.repeat)  # 恶意输入之外不应该抛出异常
+        how = locate_json(text)[1] or '-'
+        legacy_ok, new_ok = is_analysis(legacy) == expected, is_analysis(new) == expected
+        ok['legacy'] += legacy_ok
+        ok['new'] += new_ok
+        print(f"{name:<28}{len(text):>8}   {'✅' if legacy_ok else '❌'} {legacy_time * 1e6:>7.0f}µs  "
+              f"{'✅' if new_ok else '❌'} {new_time * 1e6:>7.0f}µs  {how}")
+    print(f"\n📊 正确: 正则 {ok['legacy']}/{len(cases)}, 单次扫描 {ok['new']}/{len(cases)}")
+
+    print(f"\n{'恶意输入':<28}{'长度':>8}   {'正则':>12}{'单次扫描':>12}")
+    for name, text, _ in adversarial_cases():
+        if len(text) <= args.legacy_max_size:
+            result, legacy_time = run_case(legacy_parse, text, 1)
+            legacy_cell = f"{'异常' if result is CRASHED else ''}{legacy_time * 1000:>10.1f}ms"
+        else:
+            legacy_cell = f"{'跳过':>10}"
+        _, new_time = run_case(new_parse, text, 1)
+        print(f"{name:<28}{len(text):>8}   {legacy_cell}{new_time * 1000:>10.1f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
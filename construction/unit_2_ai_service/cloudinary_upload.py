@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Cloudinary 上传管理
+原来每次运行都用 f"test_decor8ai_room_{timestamp}" 作为 public_id，同一张房间照片每次渲染前都要重新上传几 MB。
+这里按图片内容（SHA-256）生成 public_id，上传前先查本地清单（可选再查 Cloudinary），已经上传过的直接复用 secure_url。
+
+- public_id = <前缀>_<内容哈希前 20 位>，内容不变 public_id 就不变（overwrite=false，不会覆盖已有图片）
+- 本地清单 .cloudinary_uploads.json：cloud/public_id -> secure_url、大小、上传时间
+- check_remote=True 时清单里没有的图片先用 Admin API 查询是否已经存在（换了机器、清单被删的情况）
+- 超过 large_file_bytes 的文件按 chunk_size 分块上传（X-Unique-Upload-Id + Content-Range）
+- 请求体边发送边从文件读取（MultipartFileBody），整个文件和每一块都不会读进内存；重试时回到开头重新读
+
+    uploader = CloudinaryUploader.from_env()
+    result = uploader.upload(Path("room.jpg"), prefix="room")
+    print(result.secure_url, result.reused)   # reused: manifest / remote / None（刚上传）
+
+本地测试（不消耗额度）:
+    python mock_ai_services.py --port 8900 &
+    CLOUDINARY_API_BASE=http://127.0.0.1:8900 CLOUDINARY_CLOUD_NAME=demo CLOUDINARY_API_KEY=key \\
+        CLOUDINARY_API_SECRET=mock-secret python cloudinary_upload.py room.jpg
+"""
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from http_clients import get_session, report as report_http
+
+SCRIPT_DIR = Path(__file__).parent
+CLOUDINARY_API_BASE = os.getenv("CLOUDINARY_API_BASE", "https://api.cloudinary.com")
+DEFAULT_MANIFEST_PATH = Path(os.getenv("CLOUDINARY_MANIFEST_PATH", SCRIPT_DIR / ".cloudinary_uploads.json"))
+LARGE_FILE_BYTES = 20 * 1024 * 1024  # 超过该大小分块上传
+CHUNK_SIZE = 6 * 1024 * 1024         # Cloudinary 要求除最后一块外每块至少 5 MB
+HASH_BLOCK_SIZE = 1024 * 1024
+SEND_BLOCK_SIZE = 64 * 1024          # 发送请求体时每次从文件读取的大小
+UPLOAD_TIMEOUT = 120
+
+MANIFEST = "manifest"
+REMOTE = "remote"
+
+
+@dataclass
+class UploadResult:
+    public_id: str
+    secure_url: str
+    bytes: int
+    reused: Optional[str] = None  # manifest / remote；刚上传时为 None
+
+
+def file_sha256(path: Path) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sign(params: Dict[str, Any], api_secret: str) -> str:
+    """Cloudinary 签名：参数按名称排序拼成 a=1&b=2，后接 API Secret 取 SHA-1"""
+    to_sign = '&'.join(f"{key}={params[key]}" for key in sorted(params) if params[key] not in (None, ''))
+    return hashlib.sha1((to_sign + api_secret).encode('utf-8')).hexdigest()
+
+
+class MultipartFileBody:
+    """multipart/form-data 请求体：表单字段 + 文件 path[offset:offset + length]，读取时才从文件中取数据
+
+    requests 的 files= 会先把整个文件编码进内存；这里只保存表单头尾，文件内容按需读取。
+    支持 len() / tell() / seek()：requests 据此设置 Content-Length，urllib3 重试前 seek 回开头重新发送。
+    """
+
+    def __init__(self, fields: Dict[str, Any], filename: str, content_type: str, path: Path,
+                 offset: int = 0, length: Optional[int] = None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        filename = filename.replace('"', '%22').replace('\r', '').replace('\n', '')
+        head = ''.join(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                       for name, value in fields.items())
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n')
+        self._head = head.encode('utf-8')
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        self._offset = offset
+        self._length = Path(path).stat().st_size - offset if length is None else length
+        self._size = len(self._head) + self._length + len(self._tail)
+        self._file = open(path, 'rb')
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(SEND_BLOCK_SIZE), b'')
+
+    def __enter__(self) -> "MultipartFileBody":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self._size}[whence]
+        self._pos = min(max(0, base + pos), self._size)
+        return self._pos
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._size - self._pos
+        parts = []
+        file_start, file_end = len(self._head), len(self._head) + self._length
+        while size > 0 and self._pos < self._size:
+            pos = self._pos
+            if pos < file_start:
+                data = self._head[pos:pos + size]
+            elif pos < file_end:
+                self._file.seek(self._offset + pos - file_start)
+                data = self._file.read(min(size, file_end - pos))
+                if not data:
+                    raise IOError(f"文件在上传过程中被截断: {self._file.name}")
+            else:
+                data = self._tail[pos - file_end:pos - file_end + size]
+            parts.append(data)
+            self._pos += len(data)
+            size -= len(data)
+        return b''.join(parts)
+
+    def close(self):
+        self._file.close()
+
+
+class CloudinaryUploader:
+    """按内容去重的 Cloudinary 上传（可以在多个线程中使用）"""
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str, api_base: str = CLOUDINARY_API_BASE,
+                 manifest_path: Path = DEFAULT_MANIFEST_PATH, check_remote: bool = False,
+                 large_file_bytes: int = LARGE_FILE_BYTES, chunk_size: int = CHUNK_SIZE):
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.api_base = api_base.rstrip('/')
+        self.manifest_path = Path(manifest_path)
+        self.check_remote = check_remote
+        self.large_file_bytes = large_file_bytes
+        self.chunk_size = chunk_size
+        self.stats = {"uploaded": 0, "uploaded_bytes": 0, "reused": 0, "reused_bytes": 0}
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional["CloudinaryUploader"]:
+        """从 CLOUDINARY_CLOUD_NAME / CLOUDINARY_API_KEY / CLOUDINARY_API_SECRET 创建；没有配置时返回 None"""
+        credentials = [os.getenv(name) for name in
+                       ("CLOUDINARY_CLOUD_NAME", "CLOUDINARY_API_KEY", "CLOUDINARY_API_SECRET")]
+        if not all(credentials):
+            return None
+        return cls(*credentials, **kwargs)
+
+    # ---------- 清单 ----------
+
+    def _manifest_key(self, public_id: str) -> str:
+        return f"{self.cloud_name}/{public_id}"
+
+    def _count(self, kind: str, size: int):
+        with self._lock:
+            self.stats[kind] += 1
+            self.stats[f"{kind}_bytes"] += size
+
+    def _record(self, result: UploadResult):
+        with self._lock:
+            self.manifest[self._manifest_key(result.public_id)] = {
+                "secure_url": result.secure_url, "bytes": result.bytes, "uploaded_at": time.time(),
+            }
+            tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    # ---------- 上传 ----------
+
+    def upload(self, path: Path, prefix: str = "room") -> UploadResult:
+        """上传图片并返回 secure_url；相同内容已经上传过时直接复用"""
+        path = Path(path)
+        size = path.stat().st_size
+        public_id = f"{prefix}_{file_sha256(path)[:20]}"
+
+        entry = self.manifest.get(self._manifest_key(public_id))
+        result = UploadResult(public_id, entry["secure_url"], size, MANIFEST) if entry else None
+        if result is None and self.check_remote:
+            result = self._find_remote(public_id, size)
+        if result is not None:
+            self._count("reused", size)
+            if result.reused == REMOTE:
+                self._record(result)
+            return result
+
+        if size > self.large_file_bytes:
+            response = self._upload_chunked(path, public_id, size)
+        else:
+            response = self._post(public_id, path)
+        result = UploadResult(public_id, response.get('secure_url') or response['url'], size,
+                              REMOTE if response.get('existing') else None)
+        self._count("uploaded", size)
+        self._record(result)
+        return result
+
+    @staticmethod
+    def _mime_type(path: Path) -> str:
+        return mimetypes.guess_type(path.name)[0] or 'image/jpeg'
+
+    def _post(self, public_id: str, path: Path, offset: int = 0, length: Optional[int] = None,
+              headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """上传 path[offset:offset + length]（默认整个文件），请求体边发送边读取"""
+        params = {"overwrite": "false", "public_id": public_id, "timestamp": int(time.time())}
+        fields = dict(params, api_key=self.api_key, signature=sign(params, self.api_secret))
+        # public_id 由内容决定且 overwrite=false，重复提交没有副作用，超时和 5xx 也可以重试
+        url = f"{self.api_base}/v1_1/{self.cloud_name}/image/upload"
+        with MultipartFileBody(fields, path.name, self._mime_type(path), path, offset, length) as body:
+            response = get_session(retry_post=True).post(
+                url, data=body, headers=dict(headers or {}, **{"Content-Type": body.content_type}),
+                timeout=UPLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def _upload_chunked(self, path: Path, public_id: str, size: int) -> Dict[str, Any]:
+        """分块上传；最后一块的响应是完整的上传结果"""
+        upload_id = uuid.uuid4().hex
+        response: Dict[str, Any] = {}
+        for start in range(0, size, self.chunk_size):
+            length = min(self.chunk_size, size - start)
+            headers = {"X-Unique-Upload-Id": upload_id, "Content-Range": f"bytes {start}-{start + length - 1}/{size}"}
+            response = self._post(public_id, path, start, length, headers)
+        return response
+
+    def _find_remote(self, public_id: str, size: int) -> Optional[UploadResult]:
+        """用 Admin API 查询 public_id 是否已经存在"""
+        response = get_session().get(
+            f"{self.api_base}/v1_1/{self.cloud_name}/resources/image/upload/{public_id}",
+            auth=(self.api_key, self.api_secret), timeout=30,
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        resource = response.json()
+        return UploadResult(public_id, resource.get('secure_url') or resource['url'], size, REMOTE)
+
+    def report(self):
+        with self._lock:
+            s = dict(self.stats)
+        print(f"\n☁️  Cloudinary 上传: 上传 {s['uploaded']} 张 ({s['uploaded_bytes'] / 1024 / 1024:.1f} MB), "
+              f"复用 {s['reused']} 张 (省去 {s['reused_bytes'] / 1024 / 1024:.1f} MB); "
+              f"清单共 {len(self.manifest)} 张")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='上传图片到 Cloudinary（相同内容只上传一次）')
+    parser.add_argument('images', nargs='+', help='本地图片路径')
+    parser.add_argument('--prefix', default='room', help='public_id 前缀（默认 room）')
+    parser.add_argument('--check-remote', action='store_true', help='清单中没有时先查询 Cloudinary 是否已存在')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST_PATH), help='本地上传清单')
+    args = parser.parse_args()
+
+    uploader = CloudinaryUploader.from_env(manifest_path=Path(args.manifest), check_remote=args.check_remote)
+    if uploader is None:
+        print("❌ 错误: 需要设置 CLOUDINARY_CLOUD_NAME / CLOUDINARY_API_KEY / CLOUDINARY_API_SECRET 环境变量")
+        return 1
+    failed = 0
+    for image in args.images:
+        try:
+            result = uploader.upload(Path(image), prefix=args.prefix)
+        except Exception as e:
+            print(f"❌ {image}: {e}")
+            failed += 1
+            continue
+        mark = {MANIFEST: '⚡ 清单', REMOTE: '⚡ 已存在'}.get(result.reused, '✅ 已上传')
+        print(f"{mark} {image} -> {result.secure_url}")
+    uploader.report()
+    report_http()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
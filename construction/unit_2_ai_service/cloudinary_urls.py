@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Cloudinary 图片 URL 变换
+products.yaml 中的商品图片都是 w_1995,f_auto,q_auto 的约 2K 原图，直接传给 decor8ai / Qwen 会浪费上传和推理时间。
+这里按用途改写 URL 中的变换参数（宽度、格式、质量），让 Cloudinary 直接返回够用的最小版本：
+
+    thumbnail          缩略图网格    400px, f_auto, q_auto:eco
+    model_input        模型输入      1024px, jpg,  q_auto:good
+    render_reference   渲染参考图    1536px, jpg,  q_auto:good
+
+背景色 (b_rgb)、裁剪方式 (c_fit) 等其它参数保持不变；只会缩小不会放大；不是 Cloudinary 的 URL 原样返回。
+"""
+
+import re
+from typing import Dict, Optional
+
+THUMBNAIL = "thumbnail"
+MODEL_INPUT = "model_input"
+RENDER_REFERENCE = "render_reference"
+
+# 各用途的变换参数；模型和渲染服务不一定支持 AVIF，所以不用 f_auto
+PRESETS: Dict[str, Dict[str, object]] = {
+    THUMBNAIL: {"w": 400, "f": "auto", "q": "auto:eco"},
+    MODEL_INPUT: {"w": 1024, "f": "jpg", "q": "auto:good"},
+    RENDER_REFERENCE: {"w": 1536, "f": "jpg", "q": "auto:good"},
+}
+
+# https://res.cloudinary.com/<cloud>/image/<private|upload>/<变换参数链>/v<版本号>/<public_id>
+CLOUDINARY_URL_RE = re.compile(r'^(https?://res\.cloudinary\.com/[^/]+/image/[^/]+/)((?:[^/]+/)*?)(v\d+/.+)$')
+
+# 这些参数由预设决定，其余参数（b_rgb、c_fit、e_ 等）原样保留
+SIZE_KEYS = ("w", "h", "f", "q", "dpr")
+
+
+def is_cloudinary_url(url: str) -> bool:
+    return bool(CLOUDINARY_URL_RE.match(url or ""))
+
+
+def parse_transformation(segment: str) -> Dict[str, str]:
+    """'w_1995,f_auto,c_fit' -> {'w': '1995', 'f': 'auto', 'c': 'fit'}（保持顺序）"""
+    params = {}
+    for component in segment.split(","):
+        if "_" in component:
+            key, value = component.split("_", 1)
+            params[key] = value
+        elif component:
+            params[component] = ""
+    return params
+
+
+def format_transformation(params: Dict[str, str]) -> str:
+    return ",".join(f"{key}_{value}" if value != "" else key for key, value in params.items())
+
+
+def derive_url(url: str, purpose: str = MODEL_INPUT, width: Optional[int] = None) -> str:
+    """按用途改写 Cloudinary 图片 URL；width 可以覆盖预设宽度"""
+    if purpose not in PRESETS:
+        raise ValueError(f"未知的图片用途: {purpose} (可选: {', '.join(PRESETS)})")
+    match = CLOUDINARY_URL_RE.match(url or "")
+    if not match:
+        return url
+    prefix, chain, asset = match.groups()
+    segments = [segment for segment in chain.split("/") if segment]
+
+    # 只改最后一段变换（链式变换前面的段是裁剪/特效，保持不变）
+    params = parse_transformation(segments.pop()) if segments else {}
+    preset = dict(PRESETS[purpose])
+    target_width = width or preset["w"]
+    original_width = params.get("w")
+    if original_width and original_width.isdigit():
+        target_width = min(target_width, int(original_width))  # 不放大
+    preset["w"] = target_width
+
+    for key in SIZE_KEYS:
+        if key not in preset:
+            params.pop(key, None)
+    for key, value in preset.items():
+        params[key] = str(value)
+    if "c" not in params:
+        params["c"] = "limit"  # 没有指定裁剪方式时按比例缩小，不裁剪也不放大
+
+    segments.append(format_transformation(params))
+    return prefix + "/".join(segments) + "/" + asset
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+共享的 HTTP 客户端
+DashScope、decor8ai、Cloudinary 的调用都走这里，而不是各自 requests.post / 每次新建 Session：
+同一个主机的连接保持 keep-alive 复用，一次会话中几十个分析/渲染请求只需要做一次 TLS 握手。
+
+    from http_clients import get_session, async_client
+    response = get_session().post(url, json=payload, timeout=120)       # 同步
+    async with async_client(concurrency=8) as client:                   # 异步（需要 httpx）
+        response = await request_with_retry(client, 'POST', url, json=payload)
+
+- 连接池：每个主机一个池，最多 POOL_MAXSIZE 个连接
+- 重试：GET 等幂等请求在 429 / 5xx / 网络错误时按指数退避重试，遵守 Retry-After（同步由 urllib3 Retry 完成，
+  异步由 request_with_retry 完成）。POST（渲染、模型调用都按次计费）默认只在连接失败、请求还没有发出时重试，
+  重复提交没有副作用的接口用 RetryPolicy(retry_post=True) / get_session(retry_post=True) 显式打开
+- HTTP/2：安装了 h2（pip install httpx[http2]）时异步客户端自动启用
+- 计时：每个请求的耗时按主机汇总（report()），也可以用 add_timing_hook() 注册自己的回调
+"""
+
+import asyncio
+import importlib.util
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # 没有 httpx 时只能用同步客户端
+    httpx = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = Retry.DEFAULT_ALLOWED_METHODS  # GET / HEAD / PUT / DELETE / OPTIONS / TRACE
+POOL_CONNECTIONS = 16  # 保持连接池的主机数
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))  # 每个主机的最大连接数
+HTTP2_AVAILABLE = httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class RetryPolicy:
+    """指数退避 + 全抖动：第 n 次重试等待 uniform(0, min(max_delay, base_delay × 2^n))"""
+    max_retries: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    statuses: tuple = RETRY_STATUSES
+    retry_post: bool = False  # POST 也在 429 / 5xx / 超时时重试；只用于重复提交没有副作用的接口
+
+    def retries_method(self, method: str) -> bool:
+        """该方法的请求在服务端可能已经处理之后（5xx、读超时）是否还能重试"""
+        method = method.upper()
+        return method in IDEMPOTENT_METHODS or (self.retry_post and method == "POST")
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def urllib3_retry(self) -> Retry:
+        """同步 Session 使用的等价 urllib3 配置；连接错误对所有方法都重试，状态码和读超时只对 retries_method 的方法重试"""
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.base_delay,
+            status_forcelist=self.statuses,
+            allowed_methods=IDEMPOTENT_METHODS | {"POST"} if self.retry_post else IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,  # 重试用完后返回最后一个响应，由调用方 raise_for_status()
+        )
+        # urllib3 2.x 才有 backoff_max 参数
+        if hasattr(retry, "backoff_max"):
+            retry.backoff_max = self.max_delay
+        return retry
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:  # HTTP 日期格式的 Retry-After 按没有处理
+        return None
+
+
+# ---------- 计时 ----------
+
+TimingHook = Callable[[str, str, Optional[int], float], None]  # (method, url, status, 秒)
+
+
+class HostTimings:
+    """按主机汇总请求次数、失败次数和耗时（线程安全）
+
+    异步请求每次尝试都记录；同步请求由 urllib3 在内部重试，只记录最终的响应。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts: Dict[str, Dict[str, float]] = {}
+        self.hooks: List[TimingHook] = []
+
+    def record(self, method: str, url: str, status: Optional[int], seconds: float):
+        host = urlsplit(url).netloc
+        with self._lock:
+            stats = self.hosts.setdefault(host, {"requests": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += status is None or status >= 400
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+        for hook in self.hooks:
+            hook(method, url, status, seconds)
+
+    def report(self):
+        if not self.hosts:
+            return
+        print("\n🌐 HTTP 请求统计:")
+        for host, stats in sorted(self.hosts.items()):
+            print(f"   {host}: {stats['requests']:.0f} 次 (失败 {stats['errors']:.0f}), "
+                  f"平均 {stats['total'] / stats['requests'] * 1000:.0f} ms, 最长 {stats['max'] * 1000:.0f} ms")
+
+
+TIMINGS = HostTimings()
+
+
+def add_timing_hook(hook: TimingHook):
+    """注册计时回调，每个请求完成（收到响应头）时调用 hook(method, url, status, 秒)"""
+    TIMINGS.hooks.append(hook)
+
+
+def report():
+    TIMINGS.report()
+
+
+def _record_response(response: requests.Response, *args, **kwargs):
+    # elapsed 是发出请求到解析完响应头的时间（流式响应不包括读取正文）
+    TIMINGS.record(response.request.method, response.url, response.status_code, response.elapsed.total_seconds())
+
+
+# ---------- 同步 ----------
+
+_sessions: Dict[bool, requests.Session] = {}
+_session_lock = threading.Lock()
+
+
+def new_session(retry: Optional[RetryPolicy] = None, pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    """新建一个带连接池、重试和计时的 Session；一般直接用 get_session()"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=(retry or RetryPolicy()).urllib3_retry(),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_record_response)
+    return session
+
+
+def get_session(retry_post: bool = False) -> requests.Session:
+    """进程内共享的 Session（首次调用时创建）；retry_post=True 的 Session 对 POST 也按幂等请求重试"""
+    session = _sessions.get(retry_post)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(retry_post)
+            if session is None:
+                session = _sessions[retry_post] = new_session(RetryPolicy(retry_post=retry_post))
+    return session
+
+
+# ---------- 异步 ----------
+
+# 这些错误发生时请求还没有发到服务端，任何方法都可以安全重试
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) if httpx is not None else ()
+
+
+def async_client(concurrency: int = POOL_MAXSIZE, timeout: float = 30, http2: Optional[bool] = None,
+                 **kwargs) -> "httpx.AsyncClient":
+    """新建 httpx.AsyncClient：连接池大小为 concurrency，可用时启用 HTTP/2，带计时钩子"""
+    if httpx is None:
+        raise RuntimeError("异步客户端需要 httpx: pip install httpx")
+
+    async def on_request(request):
+        request.extensions["start_time"] = time.perf_counter()
+
+    async def on_response(response):
+        start = response.request.extensions.get("start_time")
+        if start is not None:
+            TIMINGS.record(response.request.method, str(response.request.url), response.status_code,
+                           time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        http2=HTTP2_AVAILABLE if http2 is None else http2,
+        follow_redirects=True,
+        event_hooks={"request": [on_request], "response": [on_response]},
+        **kwargs,
+    )
+
+
+async def request_with_retry(client: "httpx.AsyncClient", method: str, url: str,
+                             retry: Optional[RetryPolicy] = None,
+                             before_attempt: Optional[Callable[[], Any]] = None,
+                             after_attempt: Optional[Callable[[Optional["httpx.Response"]], None]] = None,
+                             **kwargs) -> "httpx.Response":
+    """发送请求并按 retry 重试；返回最后一个响应（可能仍是错误状态）
+
+    连接失败（请求还没有发出）时总是重试；429 / 5xx 和读超时等其它网络错误只对 retry.retries_method(method)
+    的请求重试，POST 默认不会因为超时被重复提交。
+    before_attempt 为每次尝试前 await 的回调（例如限流器的 acquire）；after_attempt 在每次尝试后以响应调用
+    （网络错误时为 None），可用来统计每次尝试的状态码。
+    response.extensions["attempts"] 为实际尝试次数。
+    """
+    retry = retry or RetryPolicy()
+    retryable = retry.retries_method(method)
+    attempt = 0
+    while True:
+        if before_attempt is not None:
+            await before_attempt()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if after_attempt is not None:
+                after_attempt(None)
+            if attempt >= retry.max_retries or not (retryable or isinstance(e, CONNECT_ERRORS)):
+                raise
+            retry_after = None
+        else:
+            if after_attempt is not None:
+                after_attempt(response)
+            if not retryable or response.status_code not in retry.statuses or attempt >= retry.max_retries:
+                response.extensions["attempts"] = attempt + 1
+                return response
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            await response.aclose()
+        await asyncio.sleep(retry.delay(attempt, retry_after))
+        attempt += 1
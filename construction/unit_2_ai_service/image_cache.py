@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+渲染结果图片本地缓存
+test-decor8ai.py 和 render_jobs.py 下载渲染结果图片时经过这里：并发预取，按内容哈希（SHA-256）存放在本地，
+总大小超过上限时按最近使用时间淘汰，重复实验不会再次下载同一张结果图片。
+商品图片不经过这个缓存，渲染请求直接使用 cloudinary_urls.derive_url() 生成的缩放 URL。
+
+用法:
+    from image_cache import ImageCache
+    cache = ImageCache()
+    cache.prefetch(urls)          # 并发预取
+    path = cache.get(url)         # 本地路径（未缓存时下载）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # 没有 httpx 时预取改用线程池 + requests
+    httpx = None
+
+from http_clients import async_client, get_session, request_with_retry
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", SCRIPT_DIR / ".image_cache"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("IMAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+DEFAULT_CONCURRENCY = 8
+DOWNLOAD_TIMEOUT = 30
+
+CONTENT_TYPE_EXT = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/gif": ".gif",
+    "image/heic": ".heic",
+}
+
+
+def _guess_ext(url: str, content_type: Optional[str]) -> str:
+    ext = CONTENT_TYPE_EXT.get((content_type or "").split(";")[0].strip().lower())
+    if ext:
+        return ext
+    suffix = Path(url.split("?")[0]).suffix.lower()
+    return suffix if suffix in CONTENT_TYPE_EXT.values() or suffix == ".jpeg" else ".bin"
+
+
+class ImageCache:
+    """按内容寻址的图片缓存
+
+    目录结构:
+        <cache_dir>/index.json          URL -> 内容哈希；哈希 -> 大小、扩展名、最近使用时间
+        <cache_dir>/blobs/ab/abcdef....jpg
+    不同 URL 内容相同时只存一份。
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DOWNLOAD_TIMEOUT):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.index_path = self.cache_dir / "index.json"
+        self.urls: Dict[str, str] = {}
+        self.blobs: Dict[str, Dict] = {}
+        self.stats = {"hits": 0, "downloads": 0, "downloaded_bytes": 0, "failures": 0, "evicted": 0}
+        self._load()
+
+    # ---------- 索引 ----------
+
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.urls = index.get("urls", {})
+            self.blobs = index.get("blobs", {})
+        except (OSError, ValueError):
+            print(f"⚠️  图片缓存索引损坏，重新开始: {self.index_path}")
+            self.urls, self.blobs = {}, {}
+
+    def save(self):
+        """原子写入索引"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"urls": self.urls, "blobs": self.blobs}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / (digest + self.blobs[digest]["ext"])
+
+    def total_bytes(self) -> int:
+        return sum(blob["size"] for blob in self.blobs.values())
+
+    # ---------- 查询 ----------
+
+    def lookup(self, url: str) -> Optional[Path]:
+        """已缓存时返回本地路径并更新最近使用时间，否则返回 None（不下载）"""
+        digest = self.urls.get(url)
+        if digest and digest in self.blobs:
+            path = self._blob_path(digest)
+            if path.exists():
+                self.blobs[digest]["last_used"] = time.time()
+                self.stats["hits"] += 1
+                return path
+            # 文件被手动删掉了
+            del self.blobs[digest]
+        self.urls.pop(url, None)
+        return None
+
+    def get(self, url: str) -> Optional[Path]:
+        """返回图片的本地路径，未缓存时下载；下载失败返回 None"""
+        path = self.lookup(url)
+        if path:
+            return path
+        try:
+            response = get_session().get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"❌ 下载图片失败: {url} ({e})")
+            self.stats["failures"] += 1
+            return None
+        path = self._store(url, response.content, response.headers.get("content-type"))
+        self.evict()
+        self.save()
+        return path
+
+    def _store(self, url: str, content: bytes, content_type: Optional[str]) -> Path:
+        """写入内容寻址的文件并登记 URL"""
+        digest = hashlib.sha256(content).hexdigest()
+        if digest not in self.blobs:
+            self.blobs[digest] = {"size": len(content), "ext": _guess_ext(url, content_type), "last_used": time.time()}
+            path = self._blob_path(digest)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        else:
+            self.blobs[digest]["last_used"] = time.time()
+        self.urls[url] = digest
+        self.stats["downloads"] += 1
+        self.stats["downloaded_bytes"] += len(content)
+        return self._blob_path(digest)
+
+    # ---------- 淘汰 ----------
+
+    def evict(self, max_bytes: Optional[int] = None):
+        """总大小超过上限时，按最近使用时间从旧到新删除"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_bytes()
+        if total <= max_bytes:
+            return
+        removed = set()
+        for digest, blob in sorted(self.blobs.items(), key=lambda item: item[1]["last_used"]):
+            if total <= max_bytes:
+                break
+            path = self._blob_path(digest)
+            path.unlink(missing_ok=True)
+            total -= blob["size"]
+            removed.add(digest)
+        for digest in removed:
+            del self.blobs[digest]
+        self.urls = {url: digest for url, digest in self.urls.items() if digest not in removed}
+        self.stats["evicted"] += len(removed)
+
+    # ---------- 并发预取 ----------
+
+    async def prefetch_async(self, urls: Iterable[str]) -> Dict[str, Optional[Path]]:
+        """并发下载尚未缓存的图片（最多 concurrency 个同时进行），返回 URL -> 本地路径"""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        results = {url: self.lookup(url) for url in urls}
+        missing = [url for url, path in results.items() if path is None]
+        if not missing:
+            return results
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(client, url):
+            async with semaphore:
+                try:
+                    if client is not None:
+                        response = await request_with_retry(client, "GET", url)
+                    else:
+                        response = await asyncio.to_thread(get_session().get, url, timeout=self.timeout)
+                    response.raise_for_status()
+                except Exception as e:
+                    print(f"❌ 下载图片失败: {url} ({e})")
+                    self.stats["failures"] += 1
+                    return
+            # 写文件和更新索引在事件循环线程中进行，不需要加锁
+            results[url] = self._store(url, response.content, response.headers.get("content-type"))
+
+        if httpx is not None:
+            async with async_client(concurrency=self.concurrency, timeout=self.timeout) as client:
+                await asyncio.gather(*(fetch(client, url) for url in missing))
+        else:
+            await asyncio.gather(*(fetch(None, url) for url in missing))
+
+        self.evict()
+        self.save()
+        # 淘汰后路径可能已经不存在
+        return {url: (path if path and path.exists() else None) for url, path in results.items()}
+
+    def prefetch(self, urls: Iterable[str]) -> Dict[str, Optional[Path]]:
+        """prefetch_async 的同步版本"""
+        return asyncio.run(self.prefetch_async(urls))
+
+    def report(self):
+        s = self.stats
+        print(f"\n🖼️  图片缓存: 命中 {s['hits']}, 下载 {s['downloads']} ({s['downloaded_bytes'] / 1024 / 1024:.1f} MB), "
+              f"失败 {s['failures']}, 淘汰 {s['evicted']}; "
+              f"缓存共 {len(self.blobs)} 张 / {self.total_bytes() / 1024 / 1024:.1f} MB (上限 {self.max_bytes / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+上传给视觉模型之前的图片预处理
+手机拍的房间照片经常有 5-10 MB，base64 后请求体还要再大 1/3，而 Qwen-VL 实际只用约 100 万像素。
+这里先解码、按 EXIF 方向旋正、缩小到模型的有效输入分辨率，再重新编码成 JPEG/WebP，然后才嵌入请求。
+
+需要 Pillow（HEIC 还需要 pillow-heif）；没有安装时原样返回图片字节。
+"""
+
+import io
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # 没有 Pillow 时不做预处理
+    Image = None
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:  # 没有 pillow-heif 时无法解码 HEIC
+    pass
+
+# Qwen-VL 按 28×28 像素一个视觉 token，默认最多约 1280 个 token，超过的部分会在服务端被缩小
+DEFAULT_MAX_PIXELS = 1280 * 28 * 28
+DEFAULT_MAX_SIDE = 1568
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 85
+
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.heic': 'image/heic',
+    '.heif': 'image/heif',
+}
+OUTPUT_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass
+class PreprocessOptions:
+    """预处理参数；enabled=False 时原样上传"""
+    max_side: int = DEFAULT_MAX_SIDE
+    max_pixels: int = DEFAULT_MAX_PIXELS
+    image_format: str = DEFAULT_FORMAT
+    quality: int = DEFAULT_QUALITY
+    enabled: bool = True
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    original_size: Optional[Tuple[int, int]] = None
+    size: Optional[Tuple[int, int]] = None
+    elapsed: float = 0.0
+
+    def describe(self) -> str:
+        if self.size is None:
+            return f"未预处理, {self.original_bytes / 1024:.0f} KB"
+        return (f"{self.original_size[0]}×{self.original_size[1]} {self.original_bytes / 1024:.0f} KB -> "
+                f"{self.size[0]}×{self.size[1]} {len(self.data) / 1024:.0f} KB ({self.mime_type}), "
+                f"耗时 {self.elapsed * 1000:.0f} ms")
+
+
+def target_size(width: int, height: int, max_side: int, max_pixels: int) -> Tuple[int, int]:
+    """等比缩小到最长边不超过 max_side 且总像素不超过 max_pixels；不放大"""
+    scale = min(1.0, max_side / max(width, height), (max_pixels / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def prepare_image(image_path: str, options: Optional[PreprocessOptions] = None) -> PreparedImage:
+    """读取图片并按 options 预处理，返回要上传的字节和 MIME 类型"""
+    options = options or PreprocessOptions()
+    with open(image_path, 'rb') as f:
+        raw = f.read()
+    original_mime = MIME_TYPES.get(Path(image_path).suffix.lower(), 'image/jpeg')
+    if not options.enabled or Image is None:
+        return PreparedImage(raw, original_mime, len(raw))
+    if options.image_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {options.image_format} (可选: {', '.join(OUTPUT_FORMATS)})")
+
+    start = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(raw))
+        orientation = image.getexif().get(0x0112, 1)  # EXIF Orientation
+        original_size = image.size[::-1] if orientation in (5, 6, 7, 8) else image.size
+        image.draft('RGB', target_size(*image.size, options.max_side, options.max_pixels))  # JPEG 解码时直接降采样
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        print(f"⚠️  图片无法解码，原样上传: {e}")
+        return PreparedImage(raw, original_mime, len(raw))
+
+    size = target_size(*original_size, options.max_side, options.max_pixels)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    pil_format, mime_type = OUTPUT_FORMATS[options.image_format]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, quality=options.quality, optimize=True)
+    data = buffer.getvalue()
+    elapsed = time.perf_counter() - start
+
+    # 原图已经足够小、方向正确，重新编码反而变大时保留原图
+    if (len(data) >= len(raw) and size == original_size and orientation == 1
+            and original_mime in ('image/jpeg', 'image/webp', 'image/png')):
+        return PreparedImage(raw, original_mime, len(raw), original_size, original_size, elapsed)
+    return PreparedImage(data, mime_type, len(raw), original_size, image.size, elapsed)
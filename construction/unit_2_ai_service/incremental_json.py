@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+增量 JSON 解析
+流式输出时模型一段一段地吐出 JSON，完整的 roomType、roomStyle 或 detectedItems 中的某一件家具
+往往在整个响应结束前很久就已经生成完了。IncrementalJsonParser 每收到一段文本就继续扫描，
+某个值一结束就把 (路径, 值) 报告出来，而不用等到最后一个 '}'。
+
+    parser = IncrementalJsonParser()
+    for chunk in chunks:
+        for path, value in parser.feed(chunk):
+            ...  # ('roomType',) {...}  /  ('detectedItems', 0) {...}
+    result = parser.result
+
+顶层必须是对象。JSON 之前的文字和 ```json 代码块标记会被跳过：文字里的 '{' 先当作候选的开始，
+一旦遇到不符合 JSON 语法的字符（"{width}"、"{x: 1}"）就放弃这个候选，从这个字符重新寻找；
+每个字符最多扫描两次。文字里 '[' 开头的内容不会被当作 JSON。
+放弃的候选中已经报告的值（如 '{"a": 1 2}' 中的 ('a',) 1）无法撤回，最终结果以 result 为准。
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+Path = Tuple[Any, ...]
+Event = Tuple[Path, Any]
+
+WHITESPACE = ' \t\r\n'
+SCALAR_START = '-0123456789tfn'
+SCALAR_END = ',}]' + WHITESPACE
+CLOSING = {'{': '}', '[': ']'}
+
+
+class _Frame:
+    """一层对象/数组：key 为当前成员名（对象）或下标（数组）
+
+    expect 是下一个非空白字符应该是什么：对象 key -> colon -> value -> comma -> key ...，数组 value -> comma -> value ...
+    """
+    __slots__ = ('kind', 'start', 'key', 'expect')
+
+    def __init__(self, kind: str, start: int):
+        self.kind = kind
+        self.start = start
+        self.key: Any = None if kind == '{' else 0
+        self.expect = 'key' if kind == '{' else 'value'
+
+
+class IncrementalJsonParser:
+    """逐段扫描 JSON，深度不超过 max_depth 的值完成时立即返回
+
+    深度 1 是顶层对象的成员（('roomType',)），深度 2 是它们的成员或数组元素（('detectedItems', 0)）。
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buffer = ''
+        self.pos = 0
+        self.stack: List[_Frame] = []
+        self.result: Optional[Any] = None
+        self.done = False
+        self.error: Optional[str] = None
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._scalar_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Event]:
+        """追加一段文本，返回这段文本中完成的 (路径, 值)"""
+        self.buffer += chunk
+        events: List[Event] = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.done and self.error is None:
+            self._step(buffer[self.pos], events)
+            self.pos += 1
+        return events
+
+    def _step(self, ch: str, events: List[Event]):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._end_string(events)
+            return
+
+        if not self.stack:
+            if ch == '{':  # 跳过 JSON 之前的文字
+                self.stack.append(_Frame(ch, self.pos))
+            return
+
+        if self._scalar_start is not None:
+            if ch not in SCALAR_END:
+                return
+            scalar_start, self._scalar_start = self._scalar_start, None
+            if not self._complete(scalar_start, self.pos, events, scalar=True):
+                self._restart(ch, events)
+                return
+
+        if ch in WHITESPACE:
+            return
+        frame = self.stack[-1]
+        expect = frame.expect
+        if ch == '"' and expect in ('key', 'value'):
+            self._in_string = True
+            self._string_start = self.pos
+        elif ch in '{[' and expect == 'value':
+            self.stack.append(_Frame(ch, self.pos))
+        elif ch == CLOSING[frame.kind] and expect != 'colon' and (expect != 'value' or frame.kind == '['):
+            # 空对象/数组和多余的逗号（',}' ',]'）都允许，最后的整体解析会处理多余的逗号
+            self.stack.pop()
+            if self.stack:
+                self._complete(frame.start, self.pos + 1, events)
+            else:
+                self.done = True
+                try:
+                    self.result = json.loads(self.buffer[frame.start:self.pos + 1])
+                except ValueError as e:
+                    self.error = str(e)
+        elif ch == ':' and expect == 'colon':
+            frame.expect = 'value'
+        elif ch == ',' and expect == 'comma':
+            if frame.kind == '{':
+                frame.expect = 'key'
+            else:
+                frame.key += 1
+                frame.expect = 'value'
+        elif ch in SCALAR_START and expect == 'value':
+            self._scalar_start = self.pos
+        else:
+            self._restart(ch, events)
+
+    def _restart(self, ch: str, events: List[Event]):
+        """当前候选不是 JSON（只是文字里的花括号）：丢弃它，从这个字符重新寻找顶层对象"""
+        self.stack.clear()
+        self._in_string = self._escape = False
+        self._scalar_start = None
+        self._step(ch, events)
+
+    def _end_string(self, events: List[Event]):
+        frame = self.stack[-1]
+        if frame.kind == '{' and frame.expect == 'key':
+            try:
+                frame.key = json.loads(self.buffer[self._string_start:self.pos + 1])
+            except ValueError:
+                self._restart('"', events)
+                return
+            frame.expect = 'colon'
+        else:
+            self._complete(self._string_start, self.pos + 1, events)
+
+    def _complete(self, start: int, end: int, events: List[Event], scalar: bool = False) -> bool:
+        """stack[-1] 中的当前成员（buffer[start:end]）已经完整；标量不是合法 JSON 时返回 False"""
+        self.stack[-1].expect = 'comma'
+        if len(self.stack) > self.max_depth and not scalar:
+            return True
+        try:
+            value = json.loads(self.buffer[start:end])
+        except ValueError:  # 对象/数组不是合法 JSON 时留给最后的整体解析处理
+            return not scalar
+        if len(self.stack) <= self.max_depth:
+            events.append((tuple(frame.key for frame in self.stack), value))
+        return True
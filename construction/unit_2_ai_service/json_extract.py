@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+从模型输出中提取 JSON
+模型的回复不一定是干净的 JSON：前后可能有说明文字、```json 代码块、多余的逗号，
+max_tokens 不够时还会在中途被截断。原来的 re.search(r'\\{[\\s\\S]*\\}') 会从第一个 '{' 贪婪匹配到最后一个 '}'，
+文字里有花括号或有多个 JSON 块时就会失败，遇到大量 '{' 时还会反复回溯（平方级）。
+
+这里用一个识别字符串和括号的状态机把文本扫描一遍（线性时间）：
+1. 整段就是 JSON 时直接解析
+2. 优先在 ```json 代码块中查找
+3. 找出所有顶层的 {...}，能解析的里面取最长的一个；解析失败时去掉 ',}' ',]' 这样的多余逗号再试，
+   末尾被截断的对象在最近的完整成员处截断并补齐括号
+"""
+
+import json
+import re
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+# 扫描时只关心这些字符，其余字符（数字、字面量、空白、文字）整段跳过
+STRUCTURAL_RE = re.compile(r'[{}\[\]",:]')
+STRING_SPECIAL_RE = re.compile(r'["\\]')
+NON_SPACE_RE = re.compile(r'\S')
+FENCE_RE = re.compile(r'```[ \t]*(?:json|JSON)?[ \t]*\n?')
+CLOSING = {'{': '}', '[': ']'}
+
+_INVALID = object()
+
+DIRECT = "direct"
+FENCED = "fenced"
+SCANNED = "scanned"
+REPAIRED = "repaired"
+
+
+class Candidate(NamedTuple):
+    """文本中一个顶层 {...}；truncated 时 end 为最近的完整成员之后，close 为需要补上的括号"""
+    start: int
+    end: int
+    removals: Tuple[int, ...]  # 需要删除的多余逗号的位置
+    truncated: bool = False
+    close: str = ''
+
+
+def scan_objects(text: str, start: int = 0, end: Optional[int] = None) -> List[Candidate]:
+    """扫描 text[start:end]，返回所有顶层对象（包括末尾被截断的那一个）"""
+    end = len(text) if end is None else end
+    candidates: List[Candidate] = []
+    pos = start
+    while True:
+        pos = text.find('{', pos, end)
+        if pos < 0:
+            return candidates
+        first = NON_SPACE_RE.search(text, pos + 1, end)
+        if first is not None and first.group() not in '"}':
+            pos += 1  # '{' 后面不是键，只是文字里的花括号
+            continue
+        candidate = _scan_object(text, pos, end)
+        candidates.append(candidate)
+        if candidate.truncated:
+            return candidates
+        pos = candidate.end
+
+
+def _closing(node: Optional[Tuple[str, Any]]) -> str:
+    close = []
+    while node is not None:
+        close.append(CLOSING[node[0]])
+        node = node[1]
+    return ''.join(close)
+
+
+def _scan_object(text: str, start: int, end: int) -> Candidate:
+    """从 text[start] == '{' 开始扫描到对应的 '}'；每个字符最多看一次"""
+    # 未闭合的括号用不可变链表 (括号, 上一层) 表示，记录截断点时只保存引用，不用复制
+    node: Optional[Tuple[str, Any]] = None
+    expect_key: List[bool] = []  # 每一层是否在等待对象的键
+    removals: List[int] = []
+    safe_end, safe_node = start + 1, ('{', None)  # 最近一个可以截断的位置，以及此时未闭合的括号
+    last_comma = -1
+    pos = start
+    while True:
+        match = STRUCTURAL_RE.search(text, pos, end)
+        if match is None:
+            break
+        pos = match.start()
+        ch = text[pos]
+
+        if ch == '"':
+            pos = _skip_string(text, pos + 1, end)
+            if pos < 0:  # 字符串被截断
+                break
+            if expect_key and expect_key[-1]:
+                expect_key[-1] = False  # 这是键，后面应该是 ':'
+            else:
+                safe_end, safe_node = pos, node
+            last_comma = -1
+            continue
+
+        if ch in '{[':
+            node = (ch, node)
+            expect_key.append(ch == '{')
+            safe_end, safe_node = pos + 1, node
+            last_comma = -1
+        elif ch in '}]':
+            if last_comma >= 0 and not text[last_comma + 1:pos].strip():
+                removals.append(last_comma)  # ',}' / ',]'
+            last_comma = -1
+            if node is None or CLOSING[node[0]] != ch:
+                # 括号不匹配，不是 JSON；从这里之后继续找
+                return Candidate(start, pos + 1, tuple(removals))
+            node = node[1]
+            expect_key.pop()
+            if node is None:
+                return Candidate(start, pos + 1, tuple(removals))
+            safe_end, safe_node = pos + 1, node
+        elif ch == ',':
+            if last_comma < 0 or text[last_comma + 1:pos].strip():
+                safe_end, safe_node = pos, node
+            if node is not None and node[0] == '{':
+                expect_key[-1] = True
+            last_comma = pos
+        elif ch == ':':
+            last_comma = -1
+        pos += 1
+
+    # 文本在对象中途结束：截断到最近的完整成员，补齐括号
+    return Candidate(start, safe_end, tuple(r for r in removals if r < safe_end), True, _closing(safe_node))
+
+
+def _skip_string(text: str, pos: int, end: int) -> int:
+    """pos 在字符串内部，返回结束引号之后的位置；字符串没有结束时返回 -1"""
+    while True:
+        match = STRING_SPECIAL_RE.search(text, pos, end)
+        if match is None:
+            return -1
+        if match.group() == '"':
+            return match.end()
+        pos = match.end() + 1  # 跳过转义字符
+        if pos > end:
+            return -1
+
+
+def _try_loads(raw: str) -> Any:
+    """json.loads；不是合法 JSON 或嵌套过深时返回 _INVALID"""
+    try:
+        return json.loads(raw)
+    except (ValueError, RecursionError):
+        return _INVALID
+
+
+def _loads(text: str, candidate: Candidate) -> Tuple[Optional[Any], bool]:
+    """解析候选对象，返回 (值, 是否做过修复)；无法解析时值为 None"""
+    raw = text[candidate.start:candidate.end]
+    if not candidate.truncated:
+        value = _try_loads(raw)
+        if value is not _INVALID:
+            return value, False
+        if not candidate.removals:
+            return None, False
+    if candidate.removals:
+        parts, previous = [], candidate.start
+        for removal in candidate.removals:
+            parts.append(text[previous:removal])
+            previous = removal + 1
+        parts.append(text[previous:candidate.end])
+        raw = ''.join(parts)
+    value = _try_loads(raw.rstrip() + candidate.close)
+    return (None, False) if value is _INVALID else (value, True)
+
+
+def _best(text: str, candidates: List[Candidate], repair: bool) -> Tuple[Optional[Any], Optional[str]]:
+    """取能解析的最长的候选（被截断的候选按截断后的长度比较）"""
+    best, best_length, best_how = None, -1, None
+    for candidate in candidates:
+        length = candidate.end - candidate.start
+        if length <= best_length or (candidate.truncated and not repair):
+            continue
+        value, repaired = _loads(text, candidate)
+        if value is None or (repaired and not repair):
+            continue
+        best, best_length, best_how = value, length, REPAIRED if repaired else SCANNED
+    return best, best_how
+
+
+def _fenced_blocks(text: str) -> List[Tuple[int, int]]:
+    """```json ... ``` 代码块内容的位置；最后一个代码块没有结束标记时到文本末尾"""
+    blocks = []
+    pos = 0
+    while True:
+        match = FENCE_RE.search(text, pos)
+        if match is None:
+            return blocks
+        close = text.find('```', match.end())
+        if close < 0:
+            blocks.append((match.end(), len(text)))
+            return blocks
+        blocks.append((match.end(), close))
+        pos = close + 3
+
+
+def locate_json(text: str, repair: bool = True) -> Tuple[Optional[Any], Optional[str]]:
+    """提取 JSON 对象，返回 (值, 方式)；方式为 direct / fenced / scanned / repaired，找不到时为 (None, None)"""
+    if not text:
+        return None, None
+    stripped = text.strip()
+    if stripped[:1] in ('{', '['):
+        value = _try_loads(stripped)
+        if value is not _INVALID:
+            return value, DIRECT
+
+    for block_start, block_end in _fenced_blocks(text):
+        value = _try_loads(text[block_start:block_end].strip())
+        if isinstance(value, (dict, list)):
+            return value, FENCED
+        value, how = _best(text, scan_objects(text, block_start, block_end), repair)
+        if value is not None:
+            return value, FENCED if how == SCANNED else how
+    return _best(text, scan_objects(text), repair)
+
+
+def extract_json(text: str, repair: bool = True) -> Optional[Any]:
+    """提取模型输出中的 JSON 对象；找不到时返回 None"""
+    return locate_json(text, repair)[0]
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+本地 AI 服务模拟器
+模拟 DashScope 兼容模式的 /chat/completions 接口（包括 stream: true 的 SSE 输出）、decor8ai 的
+/generate_designs_for_room 渲染接口和 Cloudinary 的上传接口（签名校验、分块上传、Admin API 查询），
+用于在没有 API Key / 不花费额度的情况下测试批量分析、渲染队列和上传去重的并发、限流和重试逻辑。
+可以配置响应延迟、429 / 5xx 比例和最大并发数。
+
+用法:
+    python mock_ai_services.py --port 8900 --latency 1.5 --error-rate 0.05 --rate-limit-rate 0.05
+    DASHSCOPE_API_BASE=http://127.0.0.1:8900/compatible-mode/v1 python batch_room_analysis.py images/
+    DECOR8AI_API_BASE=http://127.0.0.1:8900 python render_jobs.py room.jpg --styles minimalist boho
+    CLOUDINARY_API_BASE=http://127.0.0.1:8900 CLOUDINARY_API_SECRET=mock-secret python cloudinary_upload.py room.jpg
+
+或在代码中:
+    server, base_url = start_mock_server(latency=0.1)   # decor8ai 接口在 base_url 去掉 /compatible-mode/v1 的根路径下
+    ...
+    server.shutdown()
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+STREAM_CHUNK_CHARS = 6  # 流式输出每段的字符数（大致相当于 1-2 个 token）
+RENDER_SIZE = (1536, 1024)  # 渲染结果报告的尺寸（实际返回的是一张 8×8 的占位图）
+PLACEHOLDER_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABALDA4MChAODQ4SERATGCgaGBYWGDEjJR0oOjM9PDkzODdASFxOQERXRTc4UG1RV19iZ2hnPk1xeXBk"
+    "eFxlZ2P/2wBDARESEhgVGC8aGi9jQjhCY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2P/wAARCAAIAAgD"
+    "ASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKB"
+    "kaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZ"
+    "mqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQF"
+    "BgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5"
+    "OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX"
+    "2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwDoKKKKxLP/2Q=="
+)
+
+# 通过 validate_analysis_result 的固定分析结果
+SAMPLE_ANALYSIS: Dict[str, Any] = {
+    "isEmpty": False,
+    "roomType": {"value": "living_room", "confidence": 92},
+    "roomDimensions": {"length": 4.5, "width": 3.8, "height": 2.7, "unit": "meters", "confidence": 75},
+    "roomStyle": {"value": "Modern", "confidence": 88},
+    "detectedItems": [
+        {"itemId": "item_1", "furnitureType": "sofa",
+         "boundingBox": {"x": 15, "y": 30, "width": 40, "height": 25}, "confidence": 0.95},
+        {"itemId": "item_2", "furnitureType": "table",
+         "boundingBox": {"x": 35, "y": 55, "width": 20, "height": 12}, "confidence": 0.88},
+        {"itemId": "item_3", "furnitureType": "chair",
+         "boundingBox": {"x": 70, "y": 35, "width": 15, "height": 30}, "confidence": 0.81},
+    ],
+    "furnitureCount": {"value": 3, "confidence": 90},
+}
+
+
+@dataclass
+class MockOptions:
+    """模拟器行为；比例为 0-1 之间的概率"""
+    latency: float = 0.5            # 平均响应延迟（秒）
+    jitter: float = 0.5             # 延迟在 latency × (1 ± jitter) 之间均匀分布
+    error_rate: float = 0.0         # 返回 500/502/503 的比例
+    rate_limit_rate: float = 0.0    # 返回 429 的比例
+    max_concurrent: int = 0         # 同时处理的请求超过该数时返回 429（0 表示不限制）
+    retry_after: float = 1.0        # 429 响应的 Retry-After（秒）
+    stream_chunk_delay: float = 0.02  # 流式输出时每段之间的间隔（秒）
+    render_latency: float = 3.0     # decor8ai 渲染的平均延迟（秒，每多一张图再加一倍）
+    cloudinary_api_secret: str = "mock-secret"  # 校验上传签名用的 API Secret
+    api_key_prefix: str = "sk-"     # Authorization 必须以 "Bearer <前缀>" 开头
+    seed: Optional[int] = None
+
+
+class MockState:
+    """模拟器计数（线程安全）"""
+
+    def __init__(self, options: MockOptions):
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.counts: Dict[str, int] = {}
+        self.resources: Dict[str, Dict[str, Any]] = {}     # Cloudinary: cloud/public_id -> 资源
+        self.chunks: Dict[str, Dict[int, bytes]] = {}      # 分块上传: upload_id -> {起始位置: 数据}
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def roll(self) -> Tuple[float, float]:
+        with self.lock:
+            return self.random.random(), self.random.uniform(-1, 1)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockAIServices/1.0"
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，方便测试连接复用
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def log_message(self, format, *args):  # 默认每个请求打印一行，批量测试时太多
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None):
+        self.state.count(str(status))
+        self._send_json(status, {"error": {"code": code, "message": message}}, headers)
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/stats":
+            with self.state.lock:
+                stats = dict(self.state.counts, max_in_flight=self.state.max_in_flight)
+            self._send_json(200, stats)
+        elif path == "/speak_friend_and_enter":
+            if self._check_bearer(""):
+                self._send_json(200, {"message": "Welcome, friend"})
+        elif path.startswith("/v1_1/") and "/resources/image/upload/" in path:
+            self.handle_cloudinary_resource(path)
+        elif path.startswith("/res/"):
+            resource = self.state.resources.get(self._resource_key_from_delivery_path(path))
+            if resource is None:
+                self._error(404, "NotFound", f"资源不存在: {path}")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(resource["data"])))
+            self.end_headers()
+            self.wfile.write(resource["data"])
+        elif path.startswith("/renders/") and path.endswith(".jpg"):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(PLACEHOLDER_JPEG)))
+            self.end_headers()
+            self.wfile.write(PLACEHOLDER_JPEG)
+        else:
+            self._error(404, "NotFound", f"未知路径: {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            self.handle_chat_completions(raw)
+        elif path == "/generate_designs_for_room":
+            self.handle_generate_designs(raw)
+        elif path.startswith("/v1_1/") and path.endswith("/image/upload"):
+            self.handle_cloudinary_upload(path.split("/")[2], raw)
+        else:
+            self._error(404, "NotFound", f"未知路径: {self.path}")
+
+    def _check_bearer(self, prefix: str) -> bool:
+        auth = self.headers.get("Authorization") or ""
+        if not auth.startswith(f"Bearer {prefix}") or len(auth) <= len("Bearer "):
+            self._error(401, "InvalidApiKey", "Invalid API-key provided.")
+            return False
+        return True
+
+    @contextmanager
+    def _simulate(self, latency: float) -> Iterator[bool]:
+        """计入并发数，按配置返回 429 / 5xx 或等待 latency；可以继续响应时 yield True"""
+        state, options = self.state, self.state.options
+        with state.lock:
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            over_limit = options.max_concurrent and state.in_flight > options.max_concurrent
+        try:
+            roll, spread = state.roll()
+            if over_limit or roll < options.rate_limit_rate:
+                self._error(429, "Throttling.RateQuota", "Requests rate limit exceeded, please try again later.",
+                            {"Retry-After": f"{options.retry_after:g}"})
+                yield False
+                return
+            time.sleep(max(0.0, latency * (1 + options.jitter * spread)))
+            if roll < options.rate_limit_rate + options.error_rate:
+                status = state.random.choice([500, 502, 503])
+                self._error(status, "InternalError", "The request processing has failed due to some unknown error.")
+                yield False
+                return
+            yield True
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def handle_chat_completions(self, raw: bytes):
+        if not self._check_bearer(self.state.options.api_key_prefix):
+            return
+        try:
+            payload = json.loads(raw)
+            model = payload["model"]
+            payload["messages"]
+        except (ValueError, KeyError) as e:
+            self._error(400, "InvalidParameter", f"请求体格式错误: {e}")
+            return
+
+        with self._simulate(self.state.options.latency) as ok:
+            if not ok:
+                return
+            content = "```json\n" + json.dumps(SAMPLE_ANALYSIS, ensure_ascii=False, indent=2) + "\n```"
+            self.state.count("200")
+            if payload.get("stream"):
+                self._send_stream(model, content)
+                return
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 1500, "completion_tokens": len(content) // 2,
+                          "total_tokens": 1500 + len(content) // 2},
+            })
+
+    def handle_generate_designs(self, raw: bytes):
+        """decor8ai /generate_designs_for_room：参数错误时和真实接口一样返回 200 + error 字段"""
+        if not self._check_bearer(""):
+            return
+        try:
+            payload = json.loads(raw)
+            decor_items = json.loads(payload.get("decor_items") or "[]")
+            num_images = int(payload.get("num_images") or 1)
+        except (ValueError, TypeError) as e:
+            self._error(400, "InvalidParameter", f"请求体格式错误: {e}")
+            return
+        missing = [key for key in ("input_image_url", "room_type", "design_style") if not payload.get(key)]
+        if missing or not 1 <= num_images <= 4:
+            self.state.count("render_error")
+            self._send_json(200, {"error": f"Invalid parameters: {', '.join(missing) or 'num_images'}",
+                                  "message": "", "info": {}})
+            return
+
+        with self._simulate(self.state.options.render_latency * num_images) as ok:
+            if not ok:
+                return
+            self.state.count("200")
+            self.state.count("renders")
+            host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+            width, height = RENDER_SIZE
+            images = []
+            for _ in range(num_images):
+                image_uuid = str(uuid.uuid4())
+                images.append({"uuid": image_uuid, "url": f"http://{host}/renders/{image_uuid}.jpg",
+                               "width": width * int(payload.get("scale_factor") or 1) // 2,
+                               "height": height * int(payload.get("scale_factor") or 1) // 2})
+            self._send_json(200, {
+                "error": "",
+                "message": f"Generated {num_images} design(s) in {payload['design_style']} style "
+                           f"with {len(decor_items)} decor item(s)",
+                "info": {"images": images},
+            })
+
+    # ---------- Cloudinary ----------
+
+    @staticmethod
+    def _resource_key_from_delivery_path(path: str) -> str:
+        # /res/<cloud>/image/upload/v<版本>/<public_id>.jpg
+        parts = path.split("/")
+        return f"{parts[2]}/{parts[-1].rsplit('.', 1)[0]}"
+
+    def _resource_body(self, cloud: str, resource: Dict[str, Any], existing: bool = False) -> Dict[str, Any]:
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        url = f"http://{host}/res/{cloud}/image/upload/v{resource['version']}/{resource['public_id']}.jpg"
+        body = {"public_id": resource["public_id"], "version": resource["version"], "format": "jpg",
+                "resource_type": "image", "bytes": len(resource["data"]), "url": url, "secure_url": url}
+        if existing:
+            body["existing"] = True
+        return body
+
+    def handle_cloudinary_upload(self, cloud: str, raw: bytes):
+        """签名上传；带 X-Unique-Upload-Id / Content-Range 时按分块上传处理，最后一块返回完整结果"""
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + raw)
+        if not message.is_multipart():
+            self._error(400, "InvalidParameter", "需要 multipart/form-data")
+            return
+        fields: Dict[str, str] = {}
+        data = None
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                data = part.get_payload(decode=True)
+            else:
+                fields[name] = part.get_payload(decode=True).decode("utf-8")
+        signed = {k: v for k, v in fields.items() if k not in ("api_key", "signature") and v != ""}
+        to_sign = "&".join(f"{k}={signed[k]}" for k in sorted(signed)) + self.state.options.cloudinary_api_secret
+        if data is None or fields.get("signature") != hashlib.sha1(to_sign.encode("utf-8")).hexdigest():
+            self._error(401, "InvalidSignature", "Invalid Signature or missing file")
+            return
+
+        with self._simulate(0) as ok:
+            if not ok:
+                return
+            state = self.state
+            upload_id = self.headers.get("X-Unique-Upload-Id")
+            if upload_id:
+                start, _, total = (self.headers.get("Content-Range") or "").replace("bytes ", "").partition("/")
+                with state.lock:
+                    chunks = state.chunks.setdefault(upload_id, {})
+                    chunks[int(start.split("-")[0])] = data
+                    received = sum(len(chunk) for chunk in chunks.values())
+                    complete = received >= int(total)
+                    if complete:
+                        data = b"".join(chunks[offset] for offset in sorted(chunks))
+                        del state.chunks[upload_id]
+                state.count("upload_chunks")
+                if not complete:
+                    self._send_json(200, {"done": False, "bytes": received})
+                    return
+
+            public_id = fields.get("public_id") or uuid.uuid4().hex
+            key = f"{cloud}/{public_id}"
+            with state.lock:
+                existing = state.resources.get(key)
+                if existing is None or fields.get("overwrite") != "false":
+                    state.resources[key] = {"public_id": public_id, "version": int(time.time()), "data": data}
+                resource = state.resources[key]
+            state.count("uploads")
+            state.count("upload_bytes", len(data))
+            self._send_json(200, self._resource_body(cloud, resource, existing is not None))
+
+    def handle_cloudinary_resource(self, path: str):
+        """Admin API: GET /v1_1/<cloud>/resources/image/upload/<public_id>（Basic 认证）"""
+        if not (self.headers.get("Authorization") or "").startswith("Basic "):
+            self._error(401, "Unauthorized", "Must supply api_key")
+            return
+        cloud, public_id = path.split("/")[2], path.split("/resources/image/upload/", 1)[1]
+        resource = self.state.resources.get(f"{cloud}/{public_id}")
+        if resource is None:
+            self._error(404, "NotFound", f"Resource not found - {public_id}")
+            return
+        self._send_json(200, self._resource_body(cloud, resource))
+
+    def _send_stream(self, model: str, content: str):
+        """按 OpenAI 兼容的 SSE 格式分段输出 content"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        chunk_id, created = f"chatcmpl-{uuid.uuid4().hex}", int(time.time())
+
+        def send(data: str):
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def send_delta(delta: Dict[str, Any], finish_reason: Optional[str] = None):
+            send(json.dumps({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }, ensure_ascii=False))
+
+        send_delta({"role": "assistant", "content": ""})
+        for i in range(0, len(content), STREAM_CHUNK_CHARS):
+            time.sleep(self.state.options.stream_chunk_delay)
+            send_delta({"content": content[i:i + STREAM_CHUNK_CHARS]})
+        send_delta({}, "stop")
+        send("[DONE]")
+
+
+class MockServer(ThreadingHTTPServer):
+    # 默认 listen backlog 只有 5，并发连接多于 5 个时新连接要等 SYN 重传（约 1 秒），延迟统计会失真
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def make_server(host: str, port: int, options: MockOptions) -> ThreadingHTTPServer:
+    server = MockServer((host, port), MockHandler)
+    server.state = MockState(options)
+    return server
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options) -> Tuple[ThreadingHTTPServer, str]:
+    """在后台线程启动模拟器，返回 (server, DashScope 兼容 base URL)；port=0 时随机分配端口"""
+    server = make_server(host, port, MockOptions(**options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/compatible-mode/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 DashScope /chat/completions、decor8ai 渲染和 Cloudinary 上传接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.5, help='平均响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.5, help='延迟抖动比例')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='5xx 比例（0-1）')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='429 比例（0-1）')
+    parser.add_argument('--max-concurrent', type=int, default=0, help='超过该并发数返回 429（0 不限制）')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='429 响应的 Retry-After 秒数')
+    parser.add_argument('--stream-chunk-delay', type=float, default=0.02, help='流式输出每段之间的间隔（秒）')
+    parser.add_argument('--render-latency', type=float, default=3.0, help='decor8ai 渲染的平均延迟（秒/张）')
+    parser.add_argument('--cloudinary-api-secret', default='mock-secret', help='校验 Cloudinary 上传签名的 API Secret')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    args = parser.parse_args()
+
+    options = MockOptions(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          rate_limit_rate=args.rate_limit_rate, max_concurrent=args.max_concurrent,
+                          retry_after=args.retry_after, stream_chunk_delay=args.stream_chunk_delay,
+                          render_latency=args.render_latency, cloudinary_api_secret=args.cloudinary_api_secret,
+                          seed=args.seed)
+    server = make_server(args.host, args.port, options)
+    print(f"🧪 模拟 DashScope 已启动: http://{args.host}:{args.port}/compatible-mode/v1")
+    print(f"   export DASHSCOPE_API_BASE=http://{args.host}:{args.port}/compatible-mode/v1")
+    print(f"   export DECOR8AI_API_BASE=http://{args.host}:{args.port}")
+    print(f"   export CLOUDINARY_API_BASE=http://{args.host}:{args.port}")
+    print(f"   统计: http://{args.host}:{args.port}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+渲染结果缓存
+同一张房间图片、同样的装饰物品和渲染参数再调用一次 decor8ai，结果应该直接复用，
+而不是再花一次渲染额度、再等几分钟。
+
+缓存键 = SHA-256(规范化的请求):
+    input_image_url   内容的哈希（base64 data URL 即图片内容，远程图片为 URL）
+    decor_items       解析后重新序列化（键排序、紧凑格式），JSON 字符串和列表等价
+    room_type、design_style、num_images、scale_factor
+每个条目保存接口返回的图片信息和下载下来的图片文件:
+    <cache_dir>/index.sqlite3                  键 -> 返回结果、大小、最近使用时间
+    <cache_dir>/<键前两位>/<键>/<序号>.jpg
+总大小超过上限时按最近使用时间淘汰整个条目。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from http_clients import get_session
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_CACHE_DIR = Path(os.getenv("RENDER_CACHE_DIR", SCRIPT_DIR / ".render_cache"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("RENDER_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+DOWNLOAD_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    created_at REAL,
+    last_used REAL,
+    size INTEGER,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER);
+"""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_render_key(payload: Dict[str, Any]) -> str:
+    """缓存键；payload 为发给 /generate_designs_for_room 的请求体"""
+    decor_items = payload.get("decor_items") or []
+    if isinstance(decor_items, str):
+        decor_items = json.loads(decor_items)
+    parts = {
+        "image": _sha256(payload["input_image_url"]),
+        "decor_items": json.dumps(decor_items, sort_keys=True, separators=(",", ":"), ensure_ascii=False),
+        "room_type": payload.get("room_type"),
+        "design_style": payload.get("design_style"),
+        "num_images": int(payload.get("num_images") or 1),
+        "scale_factor": int(payload.get("scale_factor") or 1),
+    }
+    return _sha256(json.dumps(parts, sort_keys=True))
+
+
+class RenderCache:
+    """持久化的渲染结果缓存（可以在多个线程中使用）
+
+    用法:
+        cache = RenderCache()
+        key = make_render_key(request_data)
+        entry = cache.get(key)
+        if entry is None:
+            result = ...  # 调用 decor8ai
+            result = cache.put(key, result)   # 同时下载图片
+        # result['info']['images'][i]['local_path'] 为缓存中的图片文件
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.session = {"hits": 0, "misses": 0, "evicted": 0, "downloaded_bytes": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite3"), check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _count(self, name: str, amount: int = 1):
+        self.session[name] = self.session.get(name, 0) + amount
+        self._conn.execute(
+            "INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """返回 {'result': 接口返回结果（图片带 local_path）, 'cached_at': 时间}；不存在时返回 None
+
+        上次没有下载成功的图片会再尝试下载一次。
+        """
+        if not self.enabled:
+            return None
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT created_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._count("hits")
+        created_at, value = row
+        return {"result": self._fetch_images(key, json.loads(value)), "cached_at": created_at}
+
+    def put(self, key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """保存接口返回结果并下载图片，返回带 local_path 的结果；之后按总大小淘汰"""
+        if not self.enabled:
+            return result
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, 0, ?)",
+                               (key, now, now, json.dumps(result, ensure_ascii=False)))
+        return self._fetch_images(key, result)
+
+    def _fetch_images(self, key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """下载还没有缓存的图片，更新条目大小；返回的结果中每张图片带 local_path（下载失败时没有）"""
+        result = json.loads(json.dumps(result))  # 不修改调用方的结果
+        entry_dir = self._entry_dir(key)
+        images = (result.get("info") or {}).get("images") or []
+        for i, image in enumerate(images, 1):
+            path = entry_dir / f"{i}.jpg"
+            if not path.exists() and image.get("url"):
+                try:
+                    response = get_session().get(image["url"], timeout=DOWNLOAD_TIMEOUT)
+                    response.raise_for_status()
+                except Exception as e:  # requests.RequestException
+                    print(f"❌ 下载渲染图片失败: {image['url']} ({e})")
+                    continue
+                entry_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(response.content)
+                os.replace(tmp_path, path)
+                self.session["downloaded_bytes"] += len(response.content)
+            if path.exists():
+                image["local_path"] = str(path)
+
+        size = sum(p.stat().st_size for p in entry_dir.glob("*.jpg")) if entry_dir.exists() else 0
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET size = ? WHERE key = ?",
+                               (size + len(json.dumps(result)), key))
+            self._evict(keep=key)
+        return result
+
+    def _evict(self, keep: Optional[str] = None):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:  # 刚写入的条目即使超过上限也保留
+                continue
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+        self._count("evicted", evicted)
+
+    def evict(self):
+        """总大小超过上限时，按最近使用时间从旧到新删除条目"""
+        if self.enabled:
+            with self._lock, self._conn:
+                self._evict()
+
+    def clear(self):
+        if self.enabled:
+            with self._lock, self._conn:
+                for (key,) in self._conn.execute("SELECT key FROM entries").fetchall():
+                    shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                self._conn.execute("DELETE FROM entries")
+
+    def totals(self) -> Dict[str, int]:
+        """累计统计（所有运行）"""
+        if not self.enabled:
+            return {}
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, value FROM stats").fetchall())
+
+    def report(self):
+        if not self.enabled:
+            print("\n🖌️  渲染缓存: 未启用")
+            return
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        totals = self.totals()
+        print(f"\n🖌️  渲染缓存: 本次命中 {self.session['hits']}, 未命中 {self.session['misses']}, "
+              f"下载 {self.session['downloaded_bytes'] / 1024 / 1024:.1f} MB; "
+              f"累计命中 {totals.get('hits', 0)}, 淘汰 {totals.get('evicted', 0)}; "
+              f"共 {entries} 条 / {size / 1024 / 1024:.1f} MB (上限 {self.max_bytes / 1024 / 1024:.0f} MB)")
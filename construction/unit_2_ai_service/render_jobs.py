@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+decor8ai 渲染任务队列
+一次渲染要在 /generate_designs_for_room 上阻塞几十秒到几分钟。把多个 (房间, 风格, 装饰物品) 任务放进本地队列，
+最多 --concurrency 个同时渲染，一个房间的多种风格可以并行生成，而不是一个接一个地等。
+
+- 任务状态保存在磁盘上（每个任务一个 JSON 文件），进程中断后 --resume 继续未完成的任务
+- 任务 ID 由请求参数（本地房间图片取内容哈希）决定，重复提交已完成的任务直接返回之前的结果
+- 调用方可以 await 结果（wait），也可以轮询状态（get / --status）
+- 请求经过 http_clients.py 的共享客户端；渲染按次计费，只在连接失败时重试，429 / 5xx 和超时不会重复提交
+- 本地房间图片配置了 Cloudinary 时只上传一次（按内容去重，cloudinary_upload.py），各任务共用同一个 URL
+- 结果和图片保存在渲染缓存中（render_cache.py），其他脚本发出相同的请求也直接复用；--no-cache 时总是重新渲染
+
+    async with RenderQueue(api_key, concurrency=3) as queue:
+        jobs = [queue.submit(RenderRequest(room_url, design_style=style, decor_items=items)) for style in styles]
+        for job in await asyncio.gather(*(queue.wait(job.id) for job in jobs)):
+            print(job.status, job.images)
+
+用法:
+    python render_jobs.py room.jpg --styles minimalist scandinavian industrial --products 2 --download
+    python render_jobs.py --status
+    python render_jobs.py --resume
+
+本地测试（不消耗额度）:
+    python mock_ai_services.py --port 8900 --render-latency 3 &
+    DECOR8AI_API_BASE=http://127.0.0.1:8900 DECOR8AI_API_KEY=test python render_jobs.py room.jpg --styles minimalist boho
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:  # 没有 httpx 时在线程中用共享的 requests Session
+    httpx = None
+
+from http_clients import RetryPolicy, async_client, get_session, request_with_retry, report as report_http
+from render_cache import RenderCache, make_render_key
+from cloudinary_upload import CloudinaryUploader
+
+SCRIPT_DIR = Path(__file__).parent
+DECOR8AI_API_BASE = os.getenv("DECOR8AI_API_BASE", "https://api.decor8.ai")
+DEFAULT_JOB_DIR = Path(os.getenv("RENDER_JOB_DIR", SCRIPT_DIR / "output" / "render_jobs"))
+DEFAULT_YAML = SCRIPT_DIR.parent.parent / "product" / "products.yaml"
+RENDER_TIMEOUT = 600  # 单次渲染最长等待时间（秒）
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class RenderRequest:
+    """一次 /generate_designs_for_room 调用的参数；room_image 为 URL 或本地路径（以 base64 data URL 发送）"""
+    room_image: str
+    room_type: str = "livingroom"
+    design_style: str = "minimalist"
+    decor_items: List[Dict[str, str]] = field(default_factory=list)
+    num_images: int = 1
+    scale_factor: int = 2
+
+    def job_id(self) -> str:
+        params = asdict(self)
+        if is_local_image(self.room_image):
+            with open(self.room_image, 'rb') as f:
+                params['room_image'] = hashlib.sha256(f.read()).hexdigest()
+        return hashlib.sha256(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+@dataclass
+class RenderJob:
+    id: str
+    request: RenderRequest
+    status: str = QUEUED
+    attempts: int = 0
+    images: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    cached: bool = False  # 结果来自渲染缓存
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RenderJob":
+        data = dict(data, request=RenderRequest(**data['request']))
+        return cls(**data)
+
+
+class RenderError(Exception):
+    pass
+
+
+def is_local_image(image: str) -> bool:
+    return not image.startswith(('http://', 'https://', 'data:'))
+
+
+def image_input(image: str) -> str:
+    """URL 原样返回，本地文件转换为 base64 data URL"""
+    if not is_local_image(image):
+        return image
+    mime_type = mimetypes.guess_type(image)[0] or 'image/jpeg'
+    with open(image, 'rb') as f:
+        return f"data:{mime_type};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+def build_render_payload(request: RenderRequest) -> Dict[str, Any]:
+    return {
+        "input_image_url": image_input(request.room_image),
+        "room_type": request.room_type,
+        "design_style": request.design_style,
+        "num_images": request.num_images,
+        "scale_factor": request.scale_factor,
+        "decor_items": json.dumps(request.decor_items),
+    }
+
+
+class JobStore:
+    """每个任务一个 JSON 文件（先写临时文件再替换，中断时不会留下半个文件）"""
+
+    def __init__(self, directory: Path = DEFAULT_JOB_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def save(self, job: RenderJob):
+        path = self._path(job.id)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(job), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[RenderJob]:
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return RenderJob.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def load_all(self) -> List[RenderJob]:
+        jobs = []
+        for path in self.directory.glob('*.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                jobs.append(RenderJob.from_dict(json.load(f)))
+        return sorted(jobs, key=lambda job: job.created_at)
+
+
+class RenderQueue:
+    """有界并发的渲染队列；需要在事件循环中使用（async with）"""
+
+    def __init__(self, api_key: str, base_url: str = DECOR8AI_API_BASE, concurrency: int = 3,
+                 store: Optional[JobStore] = None, retry: Optional[RetryPolicy] = None,
+                 timeout: float = RENDER_TIMEOUT, cache: Optional[RenderCache] = None,
+                 on_update: Optional[Callable[[RenderJob], None]] = None):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/generate_designs_for_room"
+        self.concurrency = concurrency
+        self.store = store or JobStore()
+        self.retry = retry or RetryPolicy()
+        self.timeout = timeout
+        self.cache = cache or RenderCache(enabled=False)
+        self.on_update = on_update
+        self.jobs: Dict[str, RenderJob] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._client = None
+
+    async def __aenter__(self) -> "RenderQueue":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # 正常退出时等所有任务完成；出错或被中断时直接停止，未完成的任务留在磁盘上等 --resume
+        await self.close(wait=exc_type is None)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        if httpx is not None:
+            self._client = async_client(concurrency=self.concurrency, timeout=self.timeout)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def close(self, wait: bool = True):
+        if wait and self._queue is not None:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---------- 提交 / 查询 ----------
+
+    def submit(self, request: RenderRequest, force: bool = False) -> RenderJob:
+        """提交任务并立即返回；相同参数的任务已经成功（或正在排队、运行中）时返回已有的任务
+
+        force 时重新渲染已经结束的任务；正在排队或运行中的任务即使 force 也不会再入队一次。
+        """
+        job_id = request.job_id()
+        future = self._futures.get(job_id)
+        if future is not None and not future.done():
+            return self.jobs[job_id]
+        if not force and future is not None and self.jobs[job_id].status == SUCCEEDED:
+            return self.jobs[job_id]
+
+        job = None if force else self.store.load(job_id)
+        future = asyncio.get_running_loop().create_future()
+        self._futures[job_id] = future
+        if job is not None and job.status == SUCCEEDED:
+            self.jobs[job_id] = job
+            future.set_result(job)
+            return job
+        if job is None or job.status == FAILED:
+            job = RenderJob(job_id, request)
+        else:  # 上次中断时还在排队或运行中
+            job.status = QUEUED
+        self.jobs[job_id] = job
+        self.store.save(job)
+        self._queue.put_nowait(job_id)
+        return job
+
+    def resume(self) -> List[RenderJob]:
+        """重新提交磁盘上所有没有成功的任务"""
+        return [self.submit(job.request) for job in self.store.load_all() if job.status != SUCCEEDED]
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        """当前状态（轮询用）"""
+        return self.jobs.get(job_id) or self.store.load(job_id)
+
+    async def wait(self, job_id: str) -> RenderJob:
+        """等待任务结束（成功或失败）"""
+        return await asyncio.shield(self._futures[job_id])
+
+    # ---------- 执行 ----------
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(self.jobs[job_id])
+            except Exception as e:  # _run 已经结束了 future，这里只保证 worker 继续处理后面的任务
+                print(f"❌ 渲染任务 {job_id} 出错: {type(e).__name__}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _update(self, job: RenderJob):
+        self.store.save(job)
+        if self.on_update is not None:
+            self.on_update(job)
+
+    async def _run(self, job: RenderJob):
+        """执行任务并结束对应的 future：保存状态出错时任务记为失败，被取消时 future 也取消，wait() 不会一直挂起"""
+        future = self._futures.get(job.id)
+        try:
+            await self._render(job)
+        except asyncio.CancelledError:
+            if future is not None:
+                future.cancel()
+            raise
+        except Exception as e:
+            job.status, job.error = FAILED, f"保存任务状态失败: {type(e).__name__}: {e}"
+            job.finished_at = job.finished_at or time.time()
+        if future is not None and not future.done():
+            future.set_result(job)
+
+    async def _render(self, job: RenderJob):
+        """渲染并记录结果；渲染本身的错误记在 job.error 里，只有保存状态（_update）出错时抛出"""
+        job.status, job.started_at, job.finished_at, job.error = RUNNING, time.time(), None, None
+        job.cached = False
+        try:
+            self._update(job)
+            payload = await asyncio.to_thread(build_render_payload, job.request)  # 本地图片需要读取并编码
+            key = make_render_key(payload)
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached:
+                result, job.cached = cached['result'], True
+            else:
+                result = await self._post(job, payload)
+            images = (result.get('info') or {}).get('images') or []
+            if result.get('error') or not images:
+                raise RenderError(result.get('error') or "响应中没有图片")
+            if not job.cached:
+                result = await asyncio.to_thread(self.cache.put, key, result)  # 同时下载图片
+            job.status, job.images = SUCCEEDED, result['info']['images']
+        except asyncio.CancelledError:
+            raise  # 保持 running，--resume 时重新渲染
+        except Exception as e:
+            job.status, job.error = FAILED, f"{type(e).__name__}: {e}"
+        job.finished_at = time.time()
+        self._update(job)
+
+    async def _post(self, job: RenderJob, payload: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        if self._client is not None:
+            response = await request_with_retry(self._client, "POST", self.url, retry=self.retry,
+                                                json=payload, headers=headers)
+            job.attempts += response.extensions.get("attempts", 1)
+        else:
+            response = await asyncio.to_thread(get_session().post, self.url, json=payload, headers=headers,
+                                               timeout=self.timeout)
+            job.attempts += 1
+        response.raise_for_status()
+        return response.json()
+
+
+# ---------- 命令行 ----------
+
+def load_decor_items(yaml_path: Path, count: int) -> List[Dict[str, str]]:
+    """从商品目录取前 count 个有图片的商品，图片改用渲染参考尺寸"""
+    if count <= 0 or not yaml_path.exists():
+        return []
+    sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "product"))
+    from catalog_store import CatalogStore
+    from cloudinary_urls import derive_url, RENDER_REFERENCE
+    with CatalogStore.open(yaml_path) as store:
+        return [{"url": derive_url(image_url, RENDER_REFERENCE), "name": name or "Unknown Product"}
+                for name, image_url in store.first_images(limit=count)]
+
+
+def print_job(job: RenderJob):
+    label = f"[{job.id[:8]} {job.request.design_style}]"
+    if job.status == RUNNING:
+        print(f"🎨 {label} 开始渲染")
+    elif job.status == SUCCEEDED and job.cached:
+        print(f"⚡ {label} {len(job.images)} 张图片, 命中渲染缓存")
+    elif job.status == SUCCEEDED:
+        print(f"✅ {label} {len(job.images)} 张图片, {job.duration:.1f} 秒"
+              + (f" ({job.attempts} 次尝试)" if job.attempts > 1 else ''))
+    elif job.status == FAILED:
+        print(f"❌ {label} {job.error}")
+
+
+def print_status(jobs: List[RenderJob]):
+    if not jobs:
+        print("没有渲染任务")
+        return
+    print(f"{'任务':<18}{'状态':<11}{'风格':<16}{'图片':>4}{'耗时':>8}  错误")
+    for job in jobs:
+        duration = f"{job.duration:.1f}s" if job.duration is not None else '-'
+        print(f"{job.id:<18}{job.status:<11}{job.request.design_style:<16}{len(job.images):>4}{duration:>8}"
+              f"  {job.error or ''}")
+
+
+def download_results(jobs: List[RenderJob], output_dir: Path):
+    """复制结果图片到 output_dir；已在渲染缓存中的直接复制，其余经过图片缓存下载"""
+    from image_cache import ImageCache
+    image_cache = ImageCache()
+    urls = [image['url'] for job in jobs for image in job.images
+            if image.get('url') and not (image.get('local_path') and os.path.exists(image['local_path']))]
+    local_paths = image_cache.prefetch(urls)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for job in jobs:
+        for i, image in enumerate(job.images, 1):
+            cached = local_paths.get(image.get('url'))
+            if image.get('local_path') and os.path.exists(image['local_path']):
+                cached = Path(image['local_path'])
+            if cached:
+                output_path = output_dir / f"render_{job.request.design_style}_{job.id[:8]}_{i}{cached.suffix}"
+                shutil.copyfile(cached, output_path)
+                print(f"💾 {output_path}")
+    image_cache.report()
+
+
+async def run_jobs(args, api_key: str, store: JobStore, cache: RenderCache) -> List[RenderJob]:
+    async with RenderQueue(api_key, args.base_url, concurrency=args.concurrency, store=store,
+                           retry=RetryPolicy(max_retries=args.max_retries), cache=cache,
+                           on_update=print_job) as queue:
+        if args.resume:
+            jobs = queue.resume()
+        else:
+            decor_items = load_decor_items(Path(args.yaml), args.products)
+            jobs = [queue.submit(RenderRequest(args.room, room_type=args.room_type, design_style=style,
+                                               decor_items=decor_items, num_images=args.num_images,
+                                               scale_factor=args.scale_factor), force=args.no_cache)
+                    for style in args.styles]
+        for job in jobs:
+            if job.status == SUCCEEDED:
+                print(f"⚡ [{job.id[:8]} {job.request.design_style}] 已渲染过，直接使用之前的结果")
+        return list(await asyncio.gather(*(queue.wait(job.id) for job in jobs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并行生成一个房间的多种风格渲染图（decor8ai）')
+    parser.add_argument('room', nargs='?', help='房间图片（URL 或本地路径）')
+    parser.add_argument('--styles', nargs='+', default=['minimalist'], help='设计风格（每种风格一个任务）')
+    parser.add_argument('--room-type', default='livingroom', help='房间类型（默认 livingroom）')
+    parser.add_argument('--num-images', type=int, default=1, help='每种风格的图片数（默认 1）')
+    parser.add_argument('--scale-factor', type=int, default=2, help='放大倍数（默认 2）')
+    parser.add_argument('--products', type=int, default=2, help='从商品目录取前 N 个商品作为装饰物品（默认 2）')
+    parser.add_argument('--yaml', default=str(DEFAULT_YAML), help='商品目录 YAML')
+    parser.add_argument('--concurrency', type=int, default=3, help='同时进行的渲染数（默认 3）')
+    parser.add_argument('--max-retries', type=int, default=3, help='连接失败时最多重试次数（默认 3；渲染请求不幂等，429/5xx 和超时不重试）')
+    parser.add_argument('--base-url', default=DECOR8AI_API_BASE, help='decor8ai API 地址')
+    parser.add_argument('--job-dir', default=str(DEFAULT_JOB_DIR), help='任务状态目录')
+    parser.add_argument('--no-cache', '--force', dest='no_cache', action='store_true',
+                        help='不使用渲染缓存和之前的任务结果，总是重新渲染')
+    parser.add_argument('--resume', action='store_true', help='继续任务目录中未完成（或失败）的任务')
+    parser.add_argument('--no-upload', action='store_true',
+                        help='本地房间图片不上传 Cloudinary，直接以 base64 data URL 发送')
+    parser.add_argument('--status', action='store_true', help='只显示任务状态')
+    parser.add_argument('--download', action='store_true', help='把结果图片下载到 output/')
+    args = parser.parse_args()
+
+    store = JobStore(Path(args.job_dir))
+    if args.status:
+        print_status(store.load_all())
+        return 0
+    if not args.room and not args.resume:
+        parser.error('需要房间图片（或使用 --resume / --status）')
+    if args.room and is_local_image(args.room) and not os.path.exists(args.room):
+        print(f"❌ 错误: 房间图片不存在: {args.room}")
+        return 1
+    api_key = os.getenv("DECOR8AI_API_KEY")
+    if not api_key:
+        print("❌ 错误: 未设置 DECOR8AI_API_KEY 环境变量")
+        return 1
+
+    # 本地房间图片先上传一次（相同内容复用之前的 URL），否则每个任务都要发送一份 base64
+    uploader = None if args.no_upload or not args.room or not is_local_image(args.room) else CloudinaryUploader.from_env()
+    if uploader is not None:
+        try:
+            upload = uploader.upload(Path(args.room), prefix="room")
+            print(f"☁️  房间图片{'已上传过，复用' if upload.reused else '已上传'}: {upload.secure_url}")
+            args.room = upload.secure_url
+        except Exception as e:
+            print(f"⚠️  Cloudinary 上传失败，使用 base64 data URL: {e}")
+
+    print(f"📤 渲染任务目录: {store.directory} (并发 {args.concurrency})")
+    cache = RenderCache(enabled=not args.no_cache)
+    started_at, start = time.time(), time.perf_counter()
+    try:
+        jobs = asyncio.run(run_jobs(args, api_key, store, cache))
+    except KeyboardInterrupt:
+        print("\n⏸️  已中断，未完成的任务可以用 --resume 继续")
+        return 1
+    finally:
+        cache.report()
+        cache.close()
+
+    elapsed = time.perf_counter() - start
+    rendered = sum(job.duration for job in jobs if job.status == SUCCEEDED and not job.cached
+                   and job.started_at >= started_at)
+    print(f"\n📊 任务: {len(jobs)}, 成功: {sum(job.status == SUCCEEDED for job in jobs)}, "
+          f"失败: {sum(job.status == FAILED for job in jobs)}, 总耗时 {elapsed:.1f} 秒"
+          + (f" (串行约 {rendered:.1f} 秒)" if rendered else ''))
+    if args.download:
+        download_results([job for job in jobs if job.status == SUCCEEDED], SCRIPT_DIR / "output")
+    report_http()
+    return 0 if all(job.status == SUCCEEDED for job in jobs) else 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试批量房间分析（不需要 API Key 和网络）
+在后台线程启动 mock_ai_services.py 的模拟器，对几张图片 URL 跑一小批：
+检查 429 / 5xx 重试、令牌桶限流和 JSONL 输出（延迟、排队时间、解析结果）。
+
+    python test_batch_room_analysis.py
+    python -m pytest test_batch_room_analysis.py
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from batch_room_analysis import BatchAnalyzer, BatchItem, TokenBucket, percentile
+from http_clients import RetryPolicy
+from mock_ai_services import start_mock_server
+
+# 非 Cloudinary URL 原样发给模型，不需要下载或预处理图片
+ITEMS = [BatchItem(f"room_{i}", f"https://example.com/rooms/room_{i}.jpg") for i in range(8)]
+FAST_RETRY = RetryPolicy(max_retries=10, base_delay=0.01, max_delay=0.05, retry_post=True)
+
+
+@contextmanager
+def mock_server(**options):
+    """启动模拟器，返回 (server, base_url)；退出时关闭"""
+    options = dict({'latency': 0.0, 'jitter': 0.0, 'retry_after': 0.01, 'seed': 7}, **options)
+    server, base_url = start_mock_server(**options)
+    try:
+        yield server, base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_batch(base_url, items=ITEMS, **kwargs):
+    """跑一批，返回 (记录, JSONL 中的记录, 耗时秒, analyzer)"""
+    analyzer = BatchAnalyzer('sk-test', base_url, retry=FAST_RETRY, **kwargs)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = Path(tmp) / 'out' / 'rooms.jsonl'
+        start = time.perf_counter()
+        records = asyncio.run(analyzer.run(items, output_path))
+        elapsed = time.perf_counter() - start
+        lines = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+    return records, lines, elapsed, analyzer
+
+
+def test_retries_429_and_5xx():
+    with mock_server(rate_limit_rate=0.25, error_rate=0.25) as (server, base_url):
+        records, _, _, analyzer = run_batch(base_url, concurrency=2, rate=0)
+        server_counts = dict(server.state.counts)
+    # 重试之后全部成功
+    assert all(r['ok'] and r['is_valid'] for r in records), [r.get('error') for r in records]
+    assert server_counts.get('429') and any(server_counts.get(s) for s in ('500', '502', '503'))
+    assert server_counts['200'] == len(ITEMS)
+    # 客户端记录的每次尝试和服务端收到的请求一一对应
+    assert analyzer.statuses == server_counts
+    assert sum(r['attempts'] for r in records) == sum(server_counts.values())
+    assert any(r['attempts'] > 1 for r in records)
+
+
+def test_retries_exhausted():
+    with mock_server(rate_limit_rate=1.0) as (_, base_url):
+        analyzer = BatchAnalyzer('sk-test', base_url, concurrency=2, rate=0,
+                                 retry=RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05, retry_post=True))
+        with tempfile.TemporaryDirectory() as tmp:
+            records = asyncio.run(analyzer.run(ITEMS[:2], Path(tmp) / 'rooms.jsonl'))
+    for record in records:
+        assert not record['ok'] and record['status'] == 429 and record['attempts'] == 3
+        assert '429' in record['error']
+
+
+def test_token_bucket_limits_throughput():
+    rate, burst = 20.0, 2
+    with mock_server() as (_, base_url):
+        records, _, limited, _ = run_batch(base_url, concurrency=len(ITEMS), rate=rate, burst=burst)
+        _, _, unlimited, _ = run_batch(base_url, concurrency=len(ITEMS), rate=0)
+    assert all(r['is_valid'] for r in records)
+    # 前 burst 个请求立即发出，其余每 1/rate 秒一个
+    expected = (len(ITEMS) - burst) / rate
+    assert limited >= expected * 0.9, (limited, expected)
+    assert unlimited < expected, unlimited
+
+
+def test_token_bucket_acquire():
+    async def acquire_all(bucket, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(acquire_all(TokenBucket(50, burst=5), 5)) < 0.05  # 桶里的令牌直接可用
+    assert asyncio.run(acquire_all(TokenBucket(50, burst=5), 15)) >= 10 / 50 * 0.9
+    assert asyncio.run(acquire_all(TokenBucket(0), 100)) < 0.05  # rate <= 0 不限流
+
+
+def test_jsonl_output_and_latency():
+    latency = 0.05
+    with mock_server(latency=latency) as (_, base_url):
+        records, lines, _, _ = run_batch(base_url, concurrency=4, rate=0)
+    # 每完成一个写一行，顺序与返回的记录相同
+    assert lines == records
+    assert sorted(r['id'] for r in lines) == sorted(item.id for item in ITEMS)
+    for record in lines:
+        assert record['ok'] and record['is_valid'] and not record['cached'] and record['attempts'] == 1
+        assert record['parsed_result']['roomType']['value']
+        assert record['usage']['total_tokens'] > 0
+        assert record['latency_ms'] >= record['request_ms'] >= latency * 1000 * 0.9
+        assert record['queued_ms'] >= 0
+    # 8 个请求、并发 4：后一半要排队等前一半
+    assert sum(1 for r in lines if r['queued_ms'] >= latency * 1000 * 0.9) >= len(ITEMS) // 2
+    latencies = [r['latency_ms'] for r in lines]
+    assert percentile(latencies, 50) <= percentile(latencies, 95) <= max(latencies)
+
+
+def main():
+    tests = [test_retries_429_and_5xx, test_retries_exhausted, test_token_bucket_limits_throughput,
+             test_token_bucket_acquire, test_jsonl_output_and_latency]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
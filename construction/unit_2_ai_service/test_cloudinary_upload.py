@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+测试按内容去重的 Cloudinary 上传（不需要 Cloudinary 账号和网络）
+在后台线程启动 mock_ai_services.py 的模拟器：相同内容只上传一次、清单/远端复用、分块上传和重试时重新发送请求体。
+
+    python test_cloudinary_upload.py
+    python -m pytest test_cloudinary_upload.py
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from cloudinary_upload import MANIFEST, REMOTE, CloudinaryUploader, MultipartFileBody
+from mock_ai_services import start_mock_server
+
+CLOUD = 'demo'
+SECRET = 'mock-secret'
+
+
+@contextmanager
+def mock_cloudinary(**options):
+    """启动模拟器，返回 (server, Cloudinary API 地址, 临时目录)；退出时关闭"""
+    server, _ = start_mock_server(**dict({'cloudinary_api_secret': SECRET, 'seed': 7}, **options))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            yield server, f"http://127.0.0.1:{server.server_address[1]}", Path(tmp)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def make_uploader(api_base, tmp, **kwargs):
+    return CloudinaryUploader(CLOUD, 'key', SECRET, api_base=api_base, manifest_path=tmp / 'uploads.json', **kwargs)
+
+
+def write_image(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def test_same_bytes_uploaded_once():
+    with mock_cloudinary() as (server, api_base, tmp):
+        data = os.urandom(50 * 1024)
+        first_path = write_image(tmp / 'room.jpg', data)
+        second_path = write_image(tmp / 'room_copy.jpg', data)  # 文件名不同、内容相同
+        uploader = make_uploader(api_base, tmp)
+        first = uploader.upload(first_path)
+        second = uploader.upload(second_path)
+
+        assert first.reused is None and second.reused == MANIFEST
+        assert (second.public_id, second.secure_url) == (first.public_id, first.secure_url)
+        assert server.state.counts['uploads'] == 1
+        assert server.state.resources[f"{CLOUD}/{first.public_id}"]['data'] == data
+        assert uploader.stats == {"uploaded": 1, "uploaded_bytes": len(data), "reused": 1, "reused_bytes": len(data)}
+        manifest = json.loads((tmp / 'uploads.json').read_text(encoding='utf-8'))
+        assert list(manifest) == [f"{CLOUD}/{first.public_id}"]
+
+        # 新进程读取清单，仍然不上传
+        again = make_uploader(api_base, tmp).upload(first_path)
+        assert again.reused == MANIFEST and server.state.counts['uploads'] == 1
+
+
+def test_remote_reuse_without_manifest():
+    with mock_cloudinary() as (server, api_base, tmp):
+        path = write_image(tmp / 'room.jpg', os.urandom(10 * 1024))
+        first = make_uploader(api_base, tmp).upload(path)
+        (tmp / 'uploads.json').unlink()  # 换了机器、清单被删
+
+        uploader = make_uploader(api_base, tmp, check_remote=True)
+        result = uploader.upload(path)
+        assert result.reused == REMOTE and result.secure_url == first.secure_url
+        assert server.state.counts['uploads'] == 1
+        assert uploader.upload(path).reused == MANIFEST  # 查到之后写入了清单
+
+
+def test_chunked_upload_with_retries():
+    # 部分请求返回 429（Retry-After: 0），重试时请求体要从头重新发送；seed=4 时有两块各被拒绝一次
+    with mock_cloudinary(rate_limit_rate=0.3, retry_after=0, seed=4) as (server, api_base, tmp):
+        data = os.urandom(2500)
+        path = write_image(tmp / 'large.jpg', data)
+        uploader = make_uploader(api_base, tmp, large_file_bytes=1000, chunk_size=1000)
+        result = uploader.upload(path)
+
+        assert result.reused is None and result.bytes == len(data)
+        assert server.state.counts['429'] == 2
+        assert server.state.counts['upload_chunks'] == 3 and server.state.counts['uploads'] == 1
+        assert server.state.resources[f"{CLOUD}/{result.public_id}"]['data'] == data
+        assert uploader.upload(path).reused == MANIFEST
+
+
+def test_multipart_body_streams_file_range():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_image(Path(tmp) / 'room.jpg', bytes(range(256)) * 40)
+        with MultipartFileBody({'public_id': 'room_1', 'timestamp': 1}, 'room.jpg', 'image/jpeg',
+                               path, offset=1000, length=5000) as body:
+            whole = body.read()
+            assert len(whole) == len(body) and body.tell() == len(body)
+            assert path.read_bytes()[1000:6000] in whole
+            assert b'name="public_id"\r\n\r\nroom_1\r\n' in whole
+            assert whole.endswith(f'--{body.boundary}--\r\n'.encode())
+            # 重试时 seek 回开头；小块读取和一次读取结果相同
+            body.seek(0)
+            assert b''.join(iter(lambda: body.read(333), b'')) == whole
+            body.seek(0)
+            assert b''.join(body) == whole
+
+
+def main():
+    tests = [test_same_bytes_uploaded_once, test_remote_reuse_without_manifest, test_chunked_upload_with_retries,
+             test_multipart_body_streams_file_range]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
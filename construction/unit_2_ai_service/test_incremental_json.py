@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测试增量 JSON 解析（incremental_json.py）
+把同一段模型输出在每个位置切成两段（以及逐字符）喂给解析器，检查报告的 (路径, 值) 和最终结果都相同；
+包括 JSON 之前带 '[' / '{' 的说明文字。
+
+    python test_incremental_json.py
+    python -m pytest test_incremental_json.py
+"""
+
+import json
+
+from incremental_json import IncrementalJsonParser
+
+ANALYSIS = {
+    "isEmpty": False,
+    "roomType": {"value": "bedroom", "confidence": 88},
+    "detectedItems": [
+        {"itemId": "item_1", "furnitureType": "bed", "confidence": 0.93},
+        {"itemId": "item_2", "furnitureType": "nightstand", "note": "左侧 {靠墙} [2 个]", "confidence": 0.8},
+    ],
+    "furnitureCount": {"value": 2, "confidence": None},
+}
+DOCUMENT = json.dumps(ANALYSIS, ensure_ascii=False, indent=2)
+# max_depth=2：顶层成员和它们的成员/数组元素，按完成的顺序
+EXPECTED = [
+    (("isEmpty",), False),
+    (("roomType", "value"), "bedroom"),
+    (("roomType", "confidence"), 88),
+    (("roomType",), ANALYSIS["roomType"]),
+    (("detectedItems", 0), ANALYSIS["detectedItems"][0]),
+    (("detectedItems", 1), ANALYSIS["detectedItems"][1]),
+    (("detectedItems",), ANALYSIS["detectedItems"]),
+    (("furnitureCount", "value"), 2),
+    (("furnitureCount", "confidence"), None),
+    (("furnitureCount",), ANALYSIS["furnitureCount"]),
+]
+
+
+def feed_all(chunks, max_depth=2):
+    parser = IncrementalJsonParser(max_depth)
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def check_every_split(text, expected=EXPECTED, result=ANALYSIS):
+    """在每个位置切成两段、以及逐字符喂入，结果都与一次喂入相同"""
+    splits = [[text[:i], text[i:]] for i in range(len(text) + 1)] + [list(text)]
+    for chunks in splits:
+        parser, events = feed_all(chunks)
+        assert events == expected, (chunks[0][-20:], events)
+        assert parser.done and parser.error is None and parser.result == result, chunks[0][-20:]
+
+
+def test_plain_document():
+    check_every_split(DOCUMENT)
+
+
+def test_fenced_with_prose():
+    check_every_split(f"分析结果如下：\n```json\n{DOCUMENT}\n```\n如需调整请告诉我。")
+
+
+def test_prose_with_brackets_before_json():
+    # 文字里的 '[' / '{' 不是 JSON 的开始，不能在文字里的 ']' / '}' 处结束解析
+    prose = ("I see [two sofas] and {a rug}. Use {width} x {height}, e.g. {x: 1} or {\"a\" b} "
+             "or {\"a\": maybe} or {\"a\" : {\"b\"]}. [注意] 结果：\n")
+    check_every_split(prose + DOCUMENT + "\n[完]")
+
+
+def test_streaming_order():
+    # 还没结束的值不报告；某个值一结束立即报告，不等整个对象
+    parser = IncrementalJsonParser()
+    assert parser.feed('说明 [1] {"roomType": {"value": "bed') == []
+    assert parser.feed('room", "confidence"') == [(("roomType", "value"), "bedroom")]
+    assert parser.feed(': 88') == []  # 数字后面可能还有位数
+    assert parser.feed('}, "detectedItems": [') == [(("roomType", "confidence"), 88),
+                                                    (("roomType",), {"value": "bedroom", "confidence": 88})]
+    assert parser.feed('{"itemId": "item_1"}, {"itemId": "it') == [(("detectedItems", 0), {"itemId": "item_1"})]
+    assert not parser.done and parser.result is None
+
+
+def test_max_depth():
+    _, events = feed_all([DOCUMENT], max_depth=1)
+    assert events == [event for event in EXPECTED if len(event[0]) == 1]
+
+
+def test_stops_after_document():
+    parser, events = feed_all([DOCUMENT, ' 另外 {"extra": 1}'])
+    assert events == EXPECTED and parser.result == ANALYSIS
+    assert parser.feed('{"more": 2}') == []
+
+
+def test_invalid_document():
+    # 语法正确但 json.loads 失败（多余的逗号）时记录错误；已经报告的字段保留
+    parser, events = feed_all(['{"roomType": {"value": "bedroom"},}'])
+    assert events == [(("roomType", "value"), "bedroom"), (("roomType",), {"value": "bedroom"})]
+    assert parser.done and parser.result is None and parser.error
+
+
+def main():
+    tests = [test_plain_document, test_fenced_with_prose, test_prose_with_brackets_before_json, test_streaming_order,
+             test_max_depth, test_stops_after_document, test_invalid_document]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
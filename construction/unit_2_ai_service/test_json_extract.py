@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+测试从模型输出中提取 JSON（json_extract.py）
+覆盖 ```json 代码块、带花括号的说明文字、多个 JSON 块、多余的逗号、被截断的输出，以及病态输入下的线性时间
+
+    python test_json_extract.py
+    python -m pytest test_json_extract.py
+"""
+
+import time
+
+from json_extract import DIRECT, FENCED, REPAIRED, SCANNED, extract_json, locate_json
+
+ANALYSIS = '{"roomType": {"value": "bedroom", "confidence": 88}, "furnitureCount": {"value": 2}}'
+EXPECTED = {"roomType": {"value": "bedroom", "confidence": 88}, "furnitureCount": {"value": 2}}
+
+
+def test_direct():
+    assert locate_json(ANALYSIS) == (EXPECTED, DIRECT)
+    assert locate_json(f"  \n{ANALYSIS}\n") == (EXPECTED, DIRECT)
+    assert locate_json('[1, 2]') == ([1, 2], DIRECT)
+
+
+def test_fenced_block():
+    text = f"分析结果如下：\n```json\n{ANALYSIS}\n```\n如需调整请告诉我 {{例如换成客厅}}。"
+    assert locate_json(text) == (EXPECTED, FENCED)
+    # 没有语言标记的代码块、代码块前面的文字里有花括号
+    assert locate_json(f"用 {{width}} 和 {{height}} 表示尺寸：\n```\n{ANALYSIS}\n```") == (EXPECTED, FENCED)
+    # 代码块里 JSON 前后还有文字
+    assert locate_json(f"```json\n// 结果\n{ANALYSIS}\n// 完\n```") == (EXPECTED, FENCED)
+
+
+def test_prose_with_braces():
+    text = f"Set {{width}} and {{height}} first. Result: {ANALYSIS} -- see {{notes}} and {{}}"
+    assert locate_json(text) == (EXPECTED, SCANNED)
+    # 字符串里的括号和引号不影响扫描
+    text = 'x {"note": "a } b { c [", "quote": "say \\"}\\"", "n": 1} y'
+    assert extract_json(text) == {"note": "a } b { c [", "quote": 'say "}"', "n": 1}
+    assert locate_json("没有 JSON {不是 JSON} 的回复") == (None, None)
+    assert locate_json("") == (None, None)
+
+
+def test_multiple_blocks():
+    # 多个顶层对象时取能解析的最长的一个
+    text = f'先给一个摘要 {{"roomType": "bedroom"}}，完整结果：{ANALYSIS}，另外 {{"ok": true}}'
+    assert locate_json(text) == (EXPECTED, SCANNED)
+    # 多个代码块时取第一个能解析的
+    text = f'```json\n{ANALYSIS}\n```\n补充：\n```json\n{{"extra": 1}}\n```'
+    assert locate_json(text) == (EXPECTED, FENCED)
+    text = f'```json\n{{"roomType": \n```\n重新输出：\n```json\n{ANALYSIS}\n```'
+    assert extract_json(text, repair=False) == EXPECTED
+
+
+def test_trailing_commas():
+    text = '{"items": [1, 2, ], "room": {"value": "bedroom",},}'
+    assert locate_json(text) == ({"items": [1, 2], "room": {"value": "bedroom"}}, REPAIRED)
+    assert locate_json(f"结果：{text} 完") == ({"items": [1, 2], "room": {"value": "bedroom"}}, REPAIRED)
+    # 字符串里的 ',}' 不是多余的逗号
+    assert extract_json('{"a": ",}", "b": [",]",],}') == {"a": ",}", "b": [",]"]}
+    assert locate_json(text, repair=False) == (None, None)
+
+
+def test_truncation_repair():
+    # max_tokens 不够时在字符串中间被截断：截断到最近的完整成员并补齐括号
+    text = '```json\n{"roomType": {"value": "bedroom"}, "detectedItems": [{"itemId": "item_1", "furnitureType": "be'
+    assert locate_json(text) == ({"roomType": {"value": "bedroom"}, "detectedItems": [{"itemId": "item_1"}]}, REPAIRED)
+    text = '结果：{"roomType": {"value": "bedroom"}, "furnitureCount": {"value": 2, "confidence":'
+    assert locate_json(text) == ({"roomType": {"value": "bedroom"}, "furnitureCount": {"value": 2}}, REPAIRED)
+    # 截断前的多余逗号也会去掉
+    assert extract_json('{"a": [1, 2,], "b": "tru') == {"a": [1, 2]}
+    assert locate_json(text, repair=False) == (None, None)
+
+
+def _best_time(text, rounds=3):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        locate_json(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_linear_time():
+    # 原来的 re.search(r'\{[\s\S]*\}') 在大量 '{' 上是平方级的；扫描器每个字符只看一次
+    for unit in ('{"a":', '{', '{"a": [', '说明 { '):
+        small, large = _best_time(unit * 50000), _best_time(unit * 200000)
+        assert small < 2.0, (unit, small)
+        # 输入变为 4 倍，线性时间大约也是 4 倍（平方级会是 16 倍）
+        assert large < small * 8 + 0.05, (unit, small, large)
+
+
+def main():
+    tests = [test_direct, test_fenced_block, test_prose_with_braces, test_multiple_blocks, test_trailing_commas,
+             test_truncation_repair, test_linear_time]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
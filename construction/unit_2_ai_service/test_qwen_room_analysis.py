@@ -6,15 +6,23 @@ Qwen 房间分析测试脚本
 
 import os
 import json
-import re
-import requests
-from typing import Optional, Dict, Any
-from pathlib import Path
+import time
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+from cloudinary_urls import derive_url, MODEL_INPUT
+from image_preprocess import PreprocessOptions, prepare_image, DEFAULT_MAX_SIDE, DEFAULT_QUALITY
+from analysis_cache import AnalysisCache, make_key, DEFAULT_TTL_SECONDS
+from incremental_json import IncrementalJsonParser
+from json_extract import extract_json
+from analysis_schema import ROOM_ANALYSIS_VALIDATOR, validate_room_analysis
+from http_clients import get_session, report as report_http
 
 # DashScope API 配置
-DASHSCOPE_API_BASE = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+DASHSCOPE_API_BASE = os.getenv("DASHSCOPE_API_BASE", "https://dashscope.aliyuncs.com/compatible-mode/v1")
 MODEL_VL = "qwen3-vl-plus"  # 视觉模型
 MODEL_TEXT = "qwen-plus"  # 文本模型
+TEMPERATURE = 0.3
+MAX_TOKENS = 2000
 
 # 系统 Prompt（与 TypeScript 版本一致）
 SYSTEM_PROMPT = """你是一个专业的室内设计师、家具识别专家和房间分析专家。请全面分析这张房间图片，提供详细的房间信息。
@@ -144,55 +152,49 @@ def get_user_prompt(room_dimensions: Optional[Dict[str, Any]] = None) -> str:
     return prompt
 
 
-def image_to_base64(image_path: str) -> str:
-    """将图片转换为 base64 编码"""
+def image_to_base64(image_path: str, preprocess: Optional[PreprocessOptions] = None) -> str:
+    """将图片预处理（旋正、缩小、重新编码）后转换为 base64 data URL"""
     import base64
     
-    with open(image_path, 'rb') as f:
-        image_data = f.read()
-        base64_data = base64.b64encode(image_data).decode('utf-8')
-        
-        # 根据文件扩展名确定 MIME 类型
-        ext = Path(image_path).suffix.lower()
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.webp': 'image/webp',
-        }
-        mime_type = mime_types.get(ext, 'image/jpeg')
-        
-        return f"data:{mime_type};base64,{base64_data}"
+    prepared = prepare_image(image_path, preprocess)
+    print(f"🖼️  图片预处理: {prepared.describe()}")
+    base64_data = base64.b64encode(prepared.data).decode('utf-8')
+    return f"data:{prepared.mime_type};base64,{base64_data}"
 
 
-def call_qwen_api(
+def prepare_image_input(
     image_url_or_path: str,
-    api_key: str,
-    room_dimensions: Optional[Dict[str, Any]] = None
-) -> Dict[str, Any]:
-    """调用 Qwen API 进行房间分析"""
-    
+    preprocess: Optional[PreprocessOptions] = None
+) -> str:
+    """返回实际发给模型的图片：URL，或本地图片预处理后的 base64 data URL"""
     # 判断是 URL 还是本地文件路径
     if image_url_or_path.startswith('http://') or image_url_or_path.startswith('https://'):
-        image_data = {"url": image_url_or_path}
-    else:
-        # 本地文件，转换为 base64
-        if not os.path.exists(image_url_or_path):
-            raise FileNotFoundError(f"图片文件不存在: {image_url_or_path}")
-        image_data = {"url": image_to_base64(image_url_or_path)}
-    
+        # Cloudinary 图片改用模型输入尺寸，其它 URL 原样传递
+        return derive_url(image_url_or_path, MODEL_INPUT)
+    # 本地文件，转换为 base64
+    if not os.path.exists(image_url_or_path):
+        raise FileNotFoundError(f"图片文件不存在: {image_url_or_path}")
+    return image_to_base64(image_url_or_path, preprocess)
+
+
+def build_payload(
+    image_input: str,
+    room_dimensions: Optional[Dict[str, Any]] = None,
+    system_prompt: str = SYSTEM_PROMPT
+) -> Dict[str, Any]:
+    """构建 /chat/completions 请求体；image_input 为 URL 或 base64 data URL"""
     # 构建请求消息
     messages = [
         {
             "role": "system",
-            "content": SYSTEM_PROMPT
+            "content": system_prompt
         },
         {
             "role": "user",
             "content": [
                 {
                     "type": "image_url",
-                    "image_url": image_data
+                    "image_url": {"url": image_input}
                 },
                 {
                     "type": "text",
@@ -203,12 +205,26 @@ def call_qwen_api(
     ]
     
     # 构建请求体
-    payload = {
+    return {
         "model": MODEL_VL,
         "messages": messages,
-        "temperature": 0.3,
-        "max_tokens": 2000,
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS,
     }
+
+
+def call_qwen_api(
+    image_url_or_path: str,
+    api_key: str,
+    room_dimensions: Optional[Dict[str, Any]] = None,
+    preprocess: Optional[PreprocessOptions] = None,
+    image_input: Optional[str] = None
+) -> Dict[str, Any]:
+    """调用 Qwen API 进行房间分析；image_input 为已经准备好的图片（见 prepare_image_input）"""
+    
+    if image_input is None:
+        image_input = prepare_image_input(image_url_or_path, preprocess)
+    payload = build_payload(image_input, room_dimensions)
     
     # 发送请求
     headers = {
@@ -219,7 +235,7 @@ def call_qwen_api(
     print(f"📤 正在调用 Qwen API (模型: {MODEL_VL})...")
     print(f"   图片: {image_url_or_path}")
     
-    response = requests.post(
+    response = get_session().post(
         f"{DASHSCOPE_API_BASE}/chat/completions",
         headers=headers,
         json=payload,
@@ -233,81 +249,112 @@ def call_qwen_api(
     return response.json()
 
 
-def parse_ai_response(ai_response: str) -> Optional[Dict[str, Any]]:
-    """解析 AI 返回的 JSON 响应"""
-    try:
-        # 尝试直接解析
-        return json.loads(ai_response)
-    except json.JSONDecodeError:
-        # 如果失败，尝试提取 JSON 部分
-        json_match = re.search(r'\{[\s\S]*\}', ai_response)
-        if json_match:
-            try:
-                return json.loads(json_match.group(0))
-            except json.JSONDecodeError:
-                pass
+def stream_qwen_api(
+    image_input: str,
+    api_key: str,
+    room_dimensions: Optional[Dict[str, Any]] = None
+) -> Iterator[str]:
+    """以流式（SSE, stream: true）调用 Qwen API，逐段返回模型输出的文本"""
+    payload = build_payload(image_input, room_dimensions)
+    payload["stream"] = True
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        "Accept": "text/event-stream",
+    }
+    
+    with get_session().post(
+        f"{DASHSCOPE_API_BASE}/chat/completions",
+        headers=headers,
+        json=payload,
+        stream=True,
+        timeout=120  # 120秒超时（连接和两段数据之间）
+    ) as response:
+        if not response.ok:
+            raise Exception(f"Qwen API 错误 ({response.status_code}): {response.text}")
+        # 按字节读取再解码，text/event-stream 没有声明 charset 时 requests 会按 ISO-8859-1 解码
+        for line in response.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            data = line[5:].strip()
+            if data == b'[DONE]':
+                break
+            chunk = json.loads(data)
+            for choice in chunk.get('choices') or []:
+                content = (choice.get('delta') or {}).get('content')
+                if content:
+                    yield content
+
+
+def print_partial_result(path: Tuple[Any, ...], value: Any, elapsed: float):
+    """流式输出时，某个字段一完成就打印出来"""
+    prefix = f"   [{elapsed:5.1f}s]"
+    if not isinstance(value, dict):
+        if path == ('isEmpty',):
+            print(f"{prefix} 📦 是否为空: {'是' if value else '否'}")
+        return
+    if path == ('roomType',):
+        print(f"{prefix} 🏠 房间类型: {value.get('value', 'N/A')} ({value.get('confidence', 0)}%)")
+    elif path == ('roomStyle',):
+        print(f"{prefix} 🎨 房间风格: {value.get('value', 'N/A')} ({value.get('confidence', 0)}%)")
+    elif path == ('roomDimensions',):
+        print(f"{prefix} 📐 房间尺寸: {value.get('length', 0)} × {value.get('width', 0)} × "
+              f"{value.get('height', 0)} {value.get('unit', 'meters')} ({value.get('confidence', 0)}%)")
+    elif path == ('furnitureCount',):
+        print(f"{prefix} 🪑 家具数量: {value.get('value', 0)} ({value.get('confidence', 0)}%)")
+    elif len(path) == 2 and path[0] == 'detectedItems':
+        print(f"{prefix} 🪑 家具 {path[1] + 1}: {value.get('furnitureType', 'N/A')} "
+              f"({value.get('confidence', 0) * 100:.0f}%)")
+
+
+def call_qwen_api_stream(
+    image_url_or_path: str,
+    api_key: str,
+    room_dimensions: Optional[Dict[str, Any]] = None,
+    preprocess: Optional[PreprocessOptions] = None,
+    image_input: Optional[str] = None
+) -> str:
+    """流式调用 Qwen API，边生成边打印已经完整的字段，返回完整的模型输出"""
+    if image_input is None:
+        image_input = prepare_image_input(image_url_or_path, preprocess)
+    
+    print(f"📤 正在调用 Qwen API (模型: {MODEL_VL}, 流式)...")
+    print(f"   图片: {image_url_or_path}")
     
-    return None
+    start = time.perf_counter()
+    parser = IncrementalJsonParser()
+    parts = []
+    first_token = first_field = None
+    for content in stream_qwen_api(image_input, api_key, room_dimensions):
+        elapsed = time.perf_counter() - start
+        if first_token is None:
+            first_token = elapsed
+        parts.append(content)
+        for path, value in parser.feed(content):
+            if first_field is None and len(path) == 1:
+                first_field = elapsed
+            print_partial_result(path, value, elapsed)
+            if len(path) == 1:
+                # 字段一完成就校验，不用等整个响应
+                _, report = ROOM_ANALYSIS_VALIDATOR.validate_field(path[0], value)
+                for error in report.errors:
+                    print(f"             ⚠️  {error}")
+    
+    total = time.perf_counter() - start
+    print(f"\n⏱️  首个 token: {first_token or 0:.1f}s, 首个字段: {first_field or 0:.1f}s, 完成: {total:.1f}s")
+    return ''.join(parts)
+
+
+def parse_ai_response(ai_response: str) -> Optional[Dict[str, Any]]:
+    """解析 AI 返回的 JSON 响应（允许前后有文字、```json 代码块、多余的逗号和被截断的输出，见 json_extract.py）"""
+    result = extract_json(ai_response)
+    return result if isinstance(result, dict) else None
 
 
 def validate_analysis_result(result: Dict[str, Any]) -> tuple[bool, list[str]]:
-    """验证分析结果是否符合要求"""
-    errors = []
-    
-    # 检查必需字段
-    required_fields = ['isEmpty', 'roomType', 'roomDimensions', 'roomStyle', 'detectedItems', 'furnitureCount']
-    for field in required_fields:
-        if field not in result:
-            errors.append(f"缺少必需字段: {field}")
-    
-    # 检查房间类型
-    if 'roomType' in result:
-        room_type = result['roomType']
-        if 'value' not in room_type:
-            errors.append("roomType 缺少 value 字段")
-        elif room_type['value'] not in ['living_room', 'bedroom', 'dining_room', 'home_office']:
-            errors.append(f"roomType.value 无效: {room_type['value']}")
-        if 'confidence' not in room_type:
-            errors.append("roomType 缺少 confidence 字段")
-        elif not (0 <= room_type['confidence'] <= 100):
-            errors.append(f"roomType.confidence 超出范围: {room_type['confidence']}")
-    
-    # 检查房间尺寸
-    if 'roomDimensions' in result:
-        dims = result['roomDimensions']
-        required_dims = ['length', 'width', 'height', 'unit', 'confidence']
-        for field in required_dims:
-            if field not in dims:
-                errors.append(f"roomDimensions 缺少字段: {field}")
-        if 'unit' in dims and dims['unit'] not in ['meters', 'feet']:
-            errors.append(f"roomDimensions.unit 无效: {dims['unit']}")
-    
-    # 检查房间风格
-    if 'roomStyle' in result:
-        style = result['roomStyle']
-        valid_styles = ['Modern', 'Nordic', 'Classic', 'Minimalist', 'Industrial', 'Contemporary', 'Traditional', 'Bohemian']
-        if 'value' not in style:
-            errors.append("roomStyle 缺少 value 字段")
-        elif style['value'] not in valid_styles:
-            errors.append(f"roomStyle.value 无效: {style['value']}")
-    
-    # 检查家具列表
-    if 'detectedItems' in result:
-        if not isinstance(result['detectedItems'], list):
-            errors.append("detectedItems 必须是数组")
-        else:
-            valid_furniture_types = ['sofa', 'table', 'chair', 'storage', 'bed', 'desk']
-            for i, item in enumerate(result['detectedItems']):
-                required_item_fields = ['itemId', 'furnitureType', 'boundingBox', 'confidence']
-                for field in required_item_fields:
-                    if field not in item:
-                        errors.append(f"detectedItems[{i}] 缺少字段: {field}")
-                # 验证家具类型
-                if 'furnitureType' in item:
-                    if item['furnitureType'] not in valid_furniture_types:
-                        errors.append(f"detectedItems[{i}].furnitureType 无效: {item['furnitureType']} (必须是以下之一: {', '.join(valid_furniture_types)})")
-    
-    return len(errors) == 0, errors
+    """验证分析结果是否符合要求（同时就地转换类型、修正超出范围的置信度，见 analysis_schema.py）"""
+    report = validate_room_analysis(result)
+    return report.is_valid, report.errors
 
 
 def print_analysis_result(result: Dict[str, Any]):
@@ -367,6 +414,16 @@ def main():
     parser.add_argument('--height', type=float, help='房间高度（参考值）')
     parser.add_argument('--unit', default='meters', choices=['meters', 'feet'], help='尺寸单位')
     parser.add_argument('--save', help='保存结果到JSON文件')
+    parser.add_argument('--max-side', type=int, default=DEFAULT_MAX_SIDE,
+                        help=f'本地图片上传前缩小到的最长边像素（默认 {DEFAULT_MAX_SIDE}，同时不超过约 100 万像素）')
+    parser.add_argument('--image-format', default='jpeg', choices=['jpeg', 'webp'], help='本地图片重新编码的格式')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help=f'重新编码质量（默认 {DEFAULT_QUALITY}）')
+    parser.add_argument('--no-preprocess', action='store_true', help='本地图片不做预处理，原样上传')
+    parser.add_argument('--stream', action='store_true', help='流式输出，字段一生成完就打印')
+    parser.add_argument('--no-cache', action='store_true', help='不使用分析缓存，总是调用模型')
+    parser.add_argument('--refresh', action='store_true', help='忽略已有缓存重新分析，并更新缓存')
+    parser.add_argument('--cache-ttl-hours', type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                        help=f'分析缓存有效期（小时，默认 {DEFAULT_TTL_SECONDS // 3600}）')
     
     args = parser.parse_args()
     
@@ -391,31 +448,66 @@ def main():
         }
         print(f"📏 使用房间尺寸参考: {room_dimensions['length']} × {room_dimensions['width']} × {room_dimensions['height']} {room_dimensions['unit']}")
     
+    cache = AnalysisCache(ttl_seconds=args.cache_ttl_hours * 3600, enabled=not args.no_cache)
     try:
-        # 调用 API
-        response = call_qwen_api(args.image, api_key, room_dimensions)
-        
-        # 提取 AI 响应内容
-        if 'choices' not in response or not response['choices']:
-            print("❌ API 响应格式错误: 缺少 choices 字段")
-            return 1
-        
-        ai_content = response['choices'][0]['message']['content']
-        print(f"\n📥 收到 AI 响应 (长度: {len(ai_content)} 字符)")
-        
-        # 解析 JSON
-        print("\n🔍 正在解析 JSON...")
-        result = parse_ai_response(ai_content)
+        preprocess = PreprocessOptions(
+            max_side=args.max_side,
+            image_format=args.image_format,
+            quality=args.quality,
+            enabled=not args.no_preprocess,
+        )
+        image_input = prepare_image_input(args.image, preprocess)
         
-        if not result:
-            print("❌ 无法解析 JSON 响应")
-            print("\n原始响应:")
-            print(ai_content)
-            return 1
+        # 同一图片 + 模型 + Prompt + 温度的结果直接复用
+        cache_key = make_key(image_input, MODEL_VL, SYSTEM_PROMPT, get_user_prompt(room_dimensions), TEMPERATURE)
+        cached = None if args.refresh else cache.get(cache_key)
         
-        # 验证结果
-        print("\n✅ JSON 解析成功")
-        is_valid, errors = validate_analysis_result(result)
+        if cached:
+            ai_content = cached['raw_response']
+            result = cached['parsed_result']
+            is_valid, errors = cached['validation']['is_valid'], cached['validation']['errors']
+            print(f"\n⚡ 命中分析缓存 (分析于 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cached['cached_at']))})")
+        else:
+            # 调用 API
+            if args.stream:
+                ai_content = call_qwen_api_stream(args.image, api_key, room_dimensions, image_input=image_input)
+            else:
+                response = call_qwen_api(args.image, api_key, room_dimensions, image_input=image_input)
+                
+                # 提取 AI 响应内容
+                if 'choices' not in response or not response['choices']:
+                    print("❌ API 响应格式错误: 缺少 choices 字段")
+                    return 1
+                
+                ai_content = response['choices'][0]['message']['content']
+            print(f"\n📥 收到 AI 响应 (长度: {len(ai_content)} 字符)")
+            
+            # 解析 JSON
+            print("\n🔍 正在解析 JSON...")
+            result = parse_ai_response(ai_content)
+            
+            if not result:
+                print("❌ 无法解析 JSON 响应")
+                print("\n原始响应:")
+                print(ai_content)
+                return 1
+            
+            # 验证结果
+            print("\n✅ JSON 解析成功")
+            report = validate_room_analysis(result)
+            is_valid, errors = report.is_valid, report.errors
+            if report.fixes:
+                print(f"\n🔧 已自动修正 {len(report.fixes)} 处:")
+                for fix in report.fixes:
+                    print(f"   - {fix}")
+            
+            # 只缓存通过验证的结果
+            if is_valid:
+                cache.put(cache_key, {
+                    'raw_response': ai_content,
+                    'parsed_result': result,
+                    'validation': {'is_valid': is_valid, 'errors': errors},
+                })
         
         if not is_valid:
             print("\n⚠️  验证失败，发现以下问题:")
@@ -447,6 +539,10 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        cache.report()
+        cache.close()
+        report_http()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+商品目录加载性能测试
+用 products.yaml 中的真实商品生成一个合成大目录（默认 5 万个商品），
+对比纯 Python SafeLoader、CSafeLoader、冷启动（解析并写缓存）和热启动（读缓存）的耗时
+"""
+
+import argparse
+import copy
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from catalog import load_catalog, parse_yaml, cache_path_for, iter_products, YamlLoader
+from catalog_writer import dump_yaml
+
+SOURCE_FILE = Path(__file__).parent / 'products.yaml'
+
+
+def build_synthetic_catalog(count):
+    """复制真实商品并改写名称和 URL，生成 count 个商品的目录"""
+    source = load_catalog(SOURCE_FILE, use_cache=False)
+    templates = [(category, product) for category, product in iter_products(source)]
+    categories = [{'name': c['name'], 'url': c['url'], 'products': []} for c in source['categories']]
+    by_name = {c['name']: c for c in categories}
+    for i in range(count):
+        category, product = templates[i % len(templates)]
+        product = copy.deepcopy(product)
+        product['name'] = f"{product['name']} #{i}"
+        product['url'] = f"{product['url'].split('?')[0]}-{i}"
+        by_name[category['name']]['products'].append(product)
+    return {'categories': categories}
+
+
+def timed(label, func, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<32} {best * 1000:10.1f} ms")
+    return result, best
+
+
+def main(count, repeat, skip_pure):
+    work_dir = Path(tempfile.mkdtemp(prefix='catalog_bench_'))
+    try:
+        catalog_file = work_dir / 'products.yaml'
+        print(f"生成 {count} 个商品的合成目录...")
+        with open(catalog_file, 'w', encoding='utf-8') as f:
+            f.write(dump_yaml(build_synthetic_catalog(count)))
+        print(f"  {catalog_file} ({catalog_file.stat().st_size / 1e6:.1f} MB)")
+        print(f"  YAML Loader: {YamlLoader.__name__}")
+
+        print("\n加载耗时（取最好成绩）:")
+        if not skip_pure:
+            def pure_python():
+                with open(catalog_file, 'r', encoding='utf-8') as f:
+                    return yaml.load(f, Loader=yaml.SafeLoader)
+            timed('yaml.safe_load (纯 Python)', pure_python)
+        expected, _ = timed(f'parse_yaml ({YamlLoader.__name__})', lambda: parse_yaml(catalog_file))
+
+        cache_file = cache_path_for(catalog_file)
+
+        def cold():
+            if cache_file.exists():
+                cache_file.unlink()
+            return load_catalog(catalog_file)
+        timed('load_catalog 冷启动 (解析+写缓存)', cold, repeat)
+        warm, warm_time = timed('load_catalog 热启动 (读缓存)', lambda: load_catalog(catalog_file), repeat)
+
+        def touched():
+            # 内容不变只改时间：走内容哈希校验
+            os.utime(catalog_file)
+            return load_catalog(catalog_file)
+        timed('load_catalog touch 后 (哈希校验)', touched, repeat)
+
+        assert warm == expected, '缓存内容与直接解析结果不一致'
+        print(f"\n缓存结果与直接解析一致，共 {sum(1 for _ in iter_products(warm))} 个商品")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='商品目录加载性能测试（冷启动 vs 热启动）')
+    parser.add_argument('--products', type=int, default=50000,
+                        help='合成目录中的商品数量（默认 50000）')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='缓存相关测试重复次数，取最好成绩（默认 3）')
+    parser.add_argument('--skip-pure-python', action='store_true',
+                        help='跳过纯 Python SafeLoader（大目录时很慢）')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args.products, args.repeat, args.skip_pure_python)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+商品目录加载
+有 libyaml 时使用 CSafeLoader 解析 products.yaml，并在旁边维护一个 pickle 缓存文件，
+源文件没有变化时直接读缓存，重复加载几乎不花时间
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import yaml
+
+from variants import expand_family
+
+# PyYAML 编译了 libyaml 时使用 C 实现的 Loader，比纯 Python 版本快一个数量级
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# 缓存格式变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+
+
+def cache_path_for(yaml_path):
+    """缓存文件路径：products.yaml -> .products.yaml.cache"""
+    yaml_path = Path(yaml_path)
+    return yaml_path.with_name(f'.{yaml_path.name}.cache')
+
+
+def file_digest(path):
+    """源文件内容哈希，mtime/size 变了但内容没变时（touch、复制）仍可复用缓存"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_yaml(yaml_path):
+    """直接解析 YAML，不使用缓存"""
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def _read_cache(cache_path, stat):
+    """读取缓存；返回 (头信息, 数据)，mtime 和 size 都匹配时才读取数据部分"""
+    with open(cache_path, 'rb') as f:
+        header = pickle.load(f)
+        if header.get('version') != CACHE_VERSION:
+            return None, None
+        if header.get('mtime_ns') == stat.st_mtime_ns and header.get('size') == stat.st_size:
+            return header, pickle.load(f)
+        return header, None
+
+
+def _write_cache(cache_path, header, data):
+    """头信息和数据分两次 pickle，校验时只需反序列化很小的头信息；先写临时文件再替换"""
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # 目录只读等情况：缓存只是加速手段，写不了就算了
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def load_catalog(yaml_path, use_cache=True):
+    """加载商品目录 YAML，返回解析后的数据
+
+    缓存命中条件：缓存版本一致，并且源文件 mtime+size 一致；
+    mtime/size 不一致但内容哈希一致时也复用缓存，并更新缓存里的 mtime/size。
+    缓存文件只由本函数生成，放在源文件旁边（.products.yaml.cache），可以随时删除。
+    """
+    yaml_path = Path(yaml_path)
+    if not use_cache:
+        return parse_yaml(yaml_path)
+
+    cache_path = cache_path_for(yaml_path)
+    stat = yaml_path.stat()
+    header = None
+    if cache_path.exists():
+        try:
+            header, data = _read_cache(cache_path, stat)
+            if data is not None:
+                return data
+        except Exception:
+            header = None  # 缓存损坏，重新解析
+
+    digest = file_digest(yaml_path)
+    new_header = {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+    if header is not None and header.get('digest') == digest:
+        # 内容没变，只是文件时间变了
+        with open(cache_path, 'rb') as f:
+            pickle.load(f)
+            data = pickle.load(f)
+    else:
+        data = parse_yaml(yaml_path)
+    _write_cache(cache_path, new_header, data)
+    return data
+
+
+def iter_products(data):
+    """遍历目录中的所有商品，产出 (类目字典, 商品字典)
+
+    支持两种格式：{'categories': [...]} 或直接是类目列表；
+    按变体聚合的类目（families，见 variants.py）会展开成平铺商品
+    """
+    if not data:
+        return
+    categories = data.get('categories', []) if isinstance(data, dict) else data
+    for category in categories or []:
+        if not isinstance(category, dict):
+            continue
+        for product in category.get('products') or []:
+            yield category, product
+        for family in category.get('families') or []:
+            for product in expand_family(family):
+                yield category, product
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+带索引的商品目录存储（SQLite）
+从抓取输出（products.yaml）建立一个 SQLite 数据库，对类目、系列、标准化名称、价格、
+选项类型/取值建立索引，推荐和渲染流程可以直接按条件筛选，不必每次遍历嵌套字典
+
+数据库默认放在 YAML 旁边（.products.yaml.db），源文件变化时自动重建。
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from catalog import load_catalog, iter_products
+
+# 数据库结构变化时递增，旧数据库自动重建
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,          -- 目录中的顺序
+    category TEXT COLLATE NOCASE,    -- 抓取时的类目
+    collection TEXT COLLATE NOCASE,
+    name TEXT,
+    norm_name TEXT,
+    url TEXT,
+    price REAL,                      -- 解析后的价格，无法解析时为 NULL
+    first_image TEXT,
+    image_count INTEGER,
+    data TEXT                        -- 完整商品字典（JSON）
+);
+CREATE TABLE options (product_id INTEGER, type TEXT, value TEXT);
+-- 选项取值拆成单词，"Sadie, ivory" 可以用 ivory 命中索引
+CREATE TABLE option_terms (product_id INTEGER, type TEXT, term TEXT);
+CREATE INDEX idx_products_category ON products (category, price);
+CREATE INDEX idx_products_collection ON products (collection);
+CREATE INDEX idx_products_norm_name ON products (norm_name);
+CREATE INDEX idx_products_price ON products (price);
+CREATE INDEX idx_options_type_value ON options (type, value, product_id);
+CREATE INDEX idx_option_terms_term ON option_terms (term, type, product_id);
+"""
+
+
+def normalize_name(name):
+    """标准化商品名称：小写，连字符和多余空白统一成一个空格"""
+    if not name:
+        return ''
+    return re.sub(r'[\s\-_]+', ' ', name.lower()).strip()
+
+
+def parse_price(text):
+    """'$1,699' -> 1699.0；价格区间取第一个数；无法解析时返回 None"""
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', text or '')
+    if not match:
+        return None
+    return float(match.group(0).replace(',', ''))
+
+
+def option_terms(value):
+    return set(re.findall(r'[a-z0-9]+', value.lower()))
+
+
+def db_path_for(yaml_path):
+    yaml_path = Path(yaml_path)
+    return yaml_path.with_name(f'.{yaml_path.name}.db')
+
+
+class CatalogStore:
+    """商品目录查询接口
+
+    用法:
+        store = CatalogStore.open('products.yaml')
+        store.query(category='Sofas', max_price=2000, option='ivory', with_images=True)
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    def open(cls, yaml_path, db_path=None, rebuild=False):
+        """打开（必要时重建）YAML 对应的数据库；db_path=':memory:' 时只在内存中建立"""
+        yaml_path = Path(yaml_path)
+        db_path = db_path or db_path_for(yaml_path)
+        stat = yaml_path.stat()
+        source_key = json.dumps([SCHEMA_VERSION, stat.st_mtime_ns, stat.st_size])
+
+        conn = sqlite3.connect(str(db_path))
+        if not rebuild:
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+                if row and row[0] == source_key:
+                    return cls(conn)
+            except sqlite3.DatabaseError:
+                pass  # 还没建表或数据库损坏
+        conn.close()
+
+        if db_path != ':memory:':
+            Path(db_path).unlink(missing_ok=True)
+        conn = sqlite3.connect(str(db_path))
+        store = cls(conn)
+        store.load(load_catalog(yaml_path))
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (source_key,))
+        conn.commit()
+        return store
+
+    @classmethod
+    def from_catalog(cls, data):
+        """直接从已加载的目录数据建立内存数据库"""
+        store = cls(sqlite3.connect(':memory:'))
+        store.load(data)
+        return store
+
+    def load(self, data):
+        """建表并写入所有商品"""
+        self.conn.executescript(SCHEMA)
+        product_rows, option_rows, term_rows = [], [], []
+        for product_id, (category, product) in enumerate(iter_products(data), 1):
+            images = product.get('images') or []
+            product_rows.append((
+                product_id,
+                category.get('name', ''),
+                product.get('collection') or '',
+                product.get('name') or '',
+                normalize_name(product.get('name')),
+                product.get('url') or '',
+                parse_price(product.get('price')),
+                images[0]['url'] if images else None,
+                len(images),
+                json.dumps(product, ensure_ascii=False),
+            ))
+            for option in product.get('options') or []:
+                option_type = (option.get('type') or '').lower()
+                for value in option.get('values') or []:
+                    value = str(value)
+                    option_rows.append((product_id, option_type, value.lower()))
+                    term_rows.extend((product_id, option_type, term) for term in option_terms(value))
+        with self.conn:
+            self.conn.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", product_rows)
+            self.conn.executemany("INSERT INTO options VALUES (?, ?, ?)", option_rows)
+            self.conn.executemany("INSERT INTO option_terms VALUES (?, ?, ?)", term_rows)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def _where(self, category=None, collection=None, name=None, min_price=None, max_price=None,
+               option=None, option_type=None, option_value=None, with_images=False):
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if collection:
+            clauses.append("collection = ?")
+            params.append(collection)
+        if name:
+            clauses.append("norm_name = ?")
+            params.append(normalize_name(name))
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        if option:
+            # 选项中的单词（所有单词都要出现在同一个选项取值中）
+            terms = sorted(option_terms(option))
+            subquery = "SELECT product_id FROM option_terms WHERE term = ?"
+            for term in terms:
+                clauses.append(f"id IN ({subquery}{' AND type = ?' if option_type else ''})")
+                params.extend([term, option_type.lower()] if option_type else [term])
+        elif option_type or option_value:
+            # 精确匹配选项类型/取值
+            parts, part_params = [], []
+            if option_type:
+                parts.append("type = ?")
+                part_params.append(option_type.lower())
+            if option_value:
+                parts.append("value = ?")
+                part_params.append(option_value.lower())
+            clauses.append(f"id IN (SELECT product_id FROM options WHERE {' AND '.join(parts)})")
+            params.extend(part_params)
+        if with_images:
+            clauses.append("image_count > 0")
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, limit=None, order_by='id', **filters):
+        """按条件查询商品，返回完整商品字典列表（附加 _category 字段），默认按目录顺序
+
+        filters: category, collection, name（标准化后精确匹配）, min_price, max_price,
+                 option（选项取值中的单词，如 'ivory'，可配合 option_type）,
+                 option_type / option_value（精确匹配）, with_images
+        """
+        if order_by not in ('id', 'price', 'name'):
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        where, params = self._where(**filters)
+        sql = f"SELECT category, data FROM products{where} ORDER BY {order_by}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        results = []
+        for category, data in self.conn.execute(sql, params):
+            product = json.loads(data)
+            product['_category'] = category
+            results.append(product)
+        return results
+
+    def first_images(self, limit=None, **filters):
+        """只返回 (名称, 第一张图片URL)，不反序列化完整商品"""
+        filters['with_images'] = True
+        where, params = self._where(**filters)
+        sql = f"SELECT name, first_image FROM products{where} ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def categories(self):
+        return [row[0] for row in self.conn.execute("SELECT category FROM products GROUP BY category ORDER BY MIN(id)")]
+
+    def option_types(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT type FROM options ORDER BY type")]
+
+
+def main(args):
+    start = time.perf_counter()
+    store = CatalogStore.open(args.yaml, rebuild=args.rebuild)
+    opened = time.perf_counter()
+    products = store.query(
+        limit=args.limit,
+        order_by=args.order_by,
+        category=args.category,
+        collection=args.collection,
+        min_price=args.min_price,
+        max_price=args.max_price,
+        option=args.option,
+        option_type=args.option_type,
+        with_images=args.with_images,
+    )
+    queried = time.perf_counter()
+    for product in products:
+        print(f"[{product['_category']}] {product['name']}  {product.get('price', '')}  {product['url']}")
+    print(f"\n共 {len(products)} 个商品（目录 {store.count()} 个）; "
+          f"打开 {(opened - start) * 1000:.1f} ms, 查询 {(queried - opened) * 1000:.1f} ms")
+    store.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='按条件查询商品目录，例如: --category Sofas --max-price 2000 --option ivory --with-images')
+    parser.add_argument('--yaml', default=str(Path(__file__).parent / 'products.yaml'),
+                        help='商品目录 YAML（默认 products.yaml）')
+    parser.add_argument('--category')
+    parser.add_argument('--collection')
+    parser.add_argument('--min-price', type=float)
+    parser.add_argument('--max-price', type=float)
+    parser.add_argument('--option', help='选项取值中的单词，如 ivory')
+    parser.add_argument('--option-type', help='限定选项类型，如 material')
+    parser.add_argument('--with-images', action='store_true', help='只要有图片的商品')
+    parser.add_argument('--order-by', default='id', choices=['id', 'price', 'name'])
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--rebuild', action='store_true', help='强制重建数据库')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    main(parse_args())
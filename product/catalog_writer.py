@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+流式输出商品目录
+每个商品完成时立即追加一行到 JSONL（主格式，运行中途即可使用），
+YAML 按类目顺序分段输出，每个商品单独序列化（有 C 扩展时使用 CDumper），
+不再把整个目录放进一个大字典再一次性 yaml.dump
+"""
+
+import json
+import os
+from pathlib import Path
+
+import yaml
+
+from variants import compact_products
+
+# PyYAML 编译了 libyaml 时使用 C 实现的 Dumper，快得多
+YamlDumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+
+def dump_yaml(data):
+    return yaml.dump(data, Dumper=YamlDumper, allow_unicode=True, default_flow_style=False, sort_keys=False)
+
+
+def _indent(text, prefix='  '):
+    return ''.join(prefix + line if line.strip() else line for line in text.splitlines(True))
+
+
+class CatalogWriter:
+    """流式写出 {'categories': [...]} 结构的商品目录
+
+    JSONL 每行格式: {"category": 类目名, "category_url": 类目URL, "index": 类目内顺序, "product": 商品字典}
+
+    用法:
+        with CatalogWriter(yaml_path, CATEGORIES) as writer:
+            writer.add_product(category_index, product, index)   # 完成一个写一个
+            writer.finish_category(category_index)               # 类目完成
+    类目可以乱序完成，YAML 仍按 categories 的顺序输出；类目内按 index 排序。
+    YAML 先写到临时文件，close() 时才替换正式文件，中途崩溃不会破坏上一次的输出。
+    variants=True 时 YAML 按变体聚合成商品族（families，见 variants.py），JSONL 仍然每行一个商品。
+    """
+
+    def __init__(self, yaml_path, categories, jsonl_path=None, variants=False):
+        self.yaml_path = Path(yaml_path)
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else self.yaml_path.with_suffix('.jsonl')
+        self.categories = categories
+        self.variants = variants
+        self.product_count = 0
+        self._pending = {i: [] for i in range(len(categories))}  # 尚未写入 YAML 的商品
+        self._finished = set()
+        self._next_category = 0
+        self._jsonl = None
+        self._yaml = None
+        self._yaml_tmp = self.yaml_path.with_suffix(self.yaml_path.suffix + '.tmp')
+
+    def open(self):
+        self.yaml_path.parent.mkdir(parents=True, exist_ok=True)
+        self._jsonl = open(self.jsonl_path, 'w', encoding='utf-8')
+        self._yaml = open(self._yaml_tmp, 'w', encoding='utf-8')
+        self._yaml.write('categories:\n' if self.categories else 'categories: []\n')
+        return self
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def add_product(self, category_index, product, index=None):
+        """写入一个完成的商品：JSONL 立即落盘，YAML 等类目按顺序输出"""
+        category = self.categories[category_index]
+        record = {
+            'category': category['name'],
+            'category_url': category['url'],
+            'index': index,
+            'product': product,
+        }
+        self._jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._jsonl.flush()
+        self._pending[category_index].append((index or 0, self.product_count, product))
+        self.product_count += 1
+
+    def finish_category(self, category_index):
+        """标记类目完成，把已经可以按顺序输出的类目写入 YAML"""
+        self._finished.add(category_index)
+        while self._next_category in self._finished:
+            self._write_category(self._next_category)
+            self._next_category += 1
+
+    def _write_category(self, category_index):
+        category = self.categories[category_index]
+        header = dump_yaml([{'name': category['name'], 'url': category['url']}])
+        self._yaml.write(header)
+        products = [product for _, _, product in sorted(self._pending.pop(category_index), key=lambda item: item[:2])]
+        key = 'products'
+        if self.variants:
+            key, products = 'families', compact_products(products)
+        if not products:
+            self._yaml.write(f'  {key}: []\n')
+            return
+        self._yaml.write(f'  {key}:\n')
+        for product in products:
+            self._yaml.write(_indent(dump_yaml([product])))
+        self._yaml.flush()
+
+    def close(self, commit=True):
+        """输出剩余类目并关闭文件；commit=False 时丢弃 YAML 临时文件"""
+        if self._yaml is None:
+            return
+        if commit:
+            while self._next_category < len(self.categories):
+                self._write_category(self._next_category)
+                self._next_category += 1
+        self._jsonl.close()
+        self._yaml.close()
+        self._jsonl = self._yaml = None
+        if commit:
+            os.replace(self._yaml_tmp, self.yaml_path)
+        else:
+            self._yaml_tmp.unlink(missing_ok=True)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+断点续爬日志
+每抓完一个商品就追加一行 JSON 到日志文件，崩溃后可以用 --resume 跳过已完成的 URL，
+最后把日志整理（compact）成 YAML/JSONL 输出文件
+"""
+
+import json
+from pathlib import Path
+
+from catalog_writer import CatalogWriter
+
+
+class CrawlJournal:
+    """追加写入的 JSONL 断点日志
+
+    每行格式: {"category": 类目名, "key": key_func(商品URL), "index": 列表页顺序, "product": 商品字典}
+    内存中只保留 key -> (类目, 顺序, 文件偏移) 的索引，商品内容在整理时按偏移从文件读回。
+    """
+
+    def __init__(self, path, key_func):
+        self.path = Path(path)
+        self.key_func = key_func
+        self.records = {}  # key -> (category, index, offset)，同一个 key 以最后一次写入为准
+        self._file = None
+
+    def load(self):
+        """读取已有日志，返回成功读取的记录数；最后一行写了一半时直接忽略"""
+        self.records = {}
+        if not self.path.exists():
+            return 0
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写到一半的行
+                self.records[record['key']] = (record['category'], record.get('index'), line_offset)
+        return len(self.records)
+
+    def open(self, resume=False):
+        """打开日志准备写入；不续爬时清空旧日志"""
+        if resume:
+            self.load()
+        else:
+            self.records = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        needs_newline = resume and self.path.exists() and self.path.stat().st_size > 0 and not self._ends_with_newline()
+        self._file = open(self.path, 'ab' if resume else 'wb')
+        if needs_newline:
+            self._file.write(b'\n')  # 与写到一半的行隔开，避免新记录接在残行后面
+        return self
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, 2)
+            return f.read(1) == b'\n'
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def has(self, url):
+        return self.key_func(url) in self.records
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def products(self):
+        """逐个读出日志中的商品（生成器）"""
+        if not self.records:
+            return
+        if self._file is not None:
+            self._file.flush()
+        with open(self.path, 'rb') as f:
+            for _, _, offset in list(self.records.values()):
+                yield self._read_at(f, offset)['product']
+
+    def append(self, category_name, product, index=None):
+        """记录一个已完成的商品，立即落盘；index 为商品在列表页中的顺序，整理时按它排序"""
+        key = self.key_func(product['url'])
+        record = {'category': category_name, 'key': key, 'index': index, 'product': product}
+        offset = self._file.tell()
+        self._file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._file.flush()
+        self.records[key] = (category_name, index, offset)
+
+    def compact(self, output_file, categories, variants=False):
+        """按 categories 的顺序把日志流式整理成 YAML（以及同名 .jsonl），返回商品总数
+
+        variants=True 时 YAML 按变体聚合（见 variants.py）
+        """
+        if self._file is not None:
+            self._file.flush()
+        category_indexes = {category['name']: i for i, category in enumerate(categories)}
+        # 并发抓取时完成顺序不固定，按 (类目, 列表页顺序, 写入位置) 排序保证输出确定
+        entries = sorted(
+            (category_indexes[category], index or 0, offset)
+            for category, index, offset in self.records.values()
+            if category in category_indexes
+        )
+        with CatalogWriter(output_file, categories, variants=variants) as writer, open(self.path, 'rb') as f:
+            for category_index, index, offset in entries:
+                writer.add_product(category_index, self._read_at(f, offset)['product'], index)
+        return writer.product_count
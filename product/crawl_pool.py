@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+浏览器页面池
+固定数量的浏览器上下文/页面，通过 asyncio.Queue 把抓取任务分发给各个 worker
+"""
+
+import asyncio
+
+# 默认并发数（浏览器上下文数量）
+DEFAULT_CONCURRENCY = 4
+
+
+class PagePool:
+    """页面池：每个 worker 独占一个浏览器上下文和页面
+
+    用法:
+        async with PagePool(browser, 4) as pool:
+            result = await pool.submit(job, arg1, arg2)  # job(page, arg1, arg2)
+
+    setup_page 为可选的 async 回调，每个页面创建后调用一次（例如安装请求拦截）。
+
+    submit() 返回的 Future 按提交顺序收集即可保证输出顺序确定，
+    与任务实际完成的先后无关。
+    """
+
+    def __init__(self, browser, size=DEFAULT_CONCURRENCY, setup_page=None):
+        self.browser = browser
+        self.setup_page = setup_page
+        self.size = max(1, int(size))
+        self._queue = asyncio.Queue()
+        self._contexts = []
+        self._workers = []
+
+    async def __aenter__(self):
+        try:
+            for i in range(self.size):
+                context = await self.browser.new_context()
+                self._contexts.append(context)  # 先登记，后面的步骤失败时也能关闭
+                page = await context.new_page()
+                if self.setup_page:
+                    await self.setup_page(page)
+                self._workers.append(asyncio.create_task(self._worker(page), name=f"page-worker-{i + 1}"))
+        except BaseException:
+            # 创建到一半失败：停止已经启动的 worker，关闭已经创建的上下文（连同其中的页面）
+            await self._close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._close()
+
+    async def _close(self):
+        # 每个 worker 收到一个 None 后退出
+        for _ in self._workers:
+            await self._queue.put(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._workers, self._contexts = [], []
+
+    def submit(self, job, *args):
+        """提交任务，返回 Future；job 以 (page, *args) 的形式被调用"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, args, future))
+        return future
+
+    async def _worker(self, page):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            job, args, future = item
+            if future.cancelled():
+                continue
+            try:
+                result = await job(page, *args)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
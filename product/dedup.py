@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+商品近似去重
+精确的 URL/名称集合会漏掉同一商品的不同写法（"3 Seater" / "3-Seater"），
+也会误删名称相同但实际不同的商品。这里改为：
+
+1. 规范化 URL（加上排序后的 ?material= 等变体参数），相同即重复；
+   只有变体参数不同的 URL 是同一商品族的另一个变体，不算重复，也不再做近似比较
+2. 分块：按 类目 + URL slug/名称 单词建立倒排索引，只和共享单词的少量候选比较，
+   另外按 Cloudinary 资源ID（如 AS-000955-SD4001 中的 AS-000955）跨类目分块
+3. 打分：名称字符三元组 Jaccard 相似度，资源ID 和价格作为加减分
+"""
+
+import re
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from catalog_store import parse_price
+from variants import split_variant_url, variant_key
+
+# 相似度达到该值视为重复
+DEFAULT_THRESHOLD = 0.85
+# 单个分块超过该大小说明这个单词太常见（如 sofa），不再用它找候选
+MAX_BLOCK_SIZE = 200
+# 每个商品最多打分的候选数
+MAX_CANDIDATES = 50
+
+# Cloudinary 商品图片路径中的资源ID: .../crusader/variants/AS-000955-SD4001/...
+ASSET_ID_RE = re.compile(r'/variants/([A-Za-z0-9]+-[A-Za-z0-9]+)(?:-([A-Za-z0-9]+))?/')
+
+# 资源ID 相同/不同、价格相同/相差很大时对名称相似度的调整
+ASSET_MATCH_BONUS = 0.15
+ASSET_MISMATCH_PENALTY = 0.3
+PRICE_MATCH_BONUS = 0.05
+PRICE_MISMATCH_PENALTY = 0.2
+PRICE_MISMATCH_RATIO = 1.3
+
+
+def canonical_url(url):
+    """去掉查询参数、片段、末尾斜杠和大小写差异，同一商品的不同变体得到同一个 URL"""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    path = parts.path.rstrip('/').lower()
+    return f"{host}{path}"
+
+
+def variant_url_key(url):
+    """规范化 URL 加排序后的变体参数：同一商品的不同变体各得到一个键，参数顺序不影响结果"""
+    base_url, params = split_variant_url((url or '').strip())
+    key = canonical_url(base_url)
+    return f"{key}?{variant_key(params)}" if params else key
+
+
+def normalize_text(text):
+    """小写，非字母数字统一成一个空格：'3-Seater' 和 '3 Seater' 得到同样结果"""
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+
+def slug_tokens(url):
+    match = re.search(r'/products/([^/?#]+)', url or '')
+    return set(normalize_text(match.group(1)).split()) if match else set()
+
+
+def name_shingles(name):
+    """名称的字符三元组（在规范化文本上计算，忽略空格和连字符差异）"""
+    text = normalize_text(name).replace(' ', '')
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def asset_bases(image_urls):
+    """图片 URL 中的商品资源ID前缀（AS-000955），同一商品不同面料共用"""
+    bases = set()
+    for url in image_urls:
+        match = ASSET_ID_RE.search(url or '')
+        if match:
+            bases.add(match.group(1).upper())
+    return bases
+
+
+def product_image_urls(product):
+    """列表页商品有 imageUrl，详情商品有 images: [{url}]"""
+    urls = [image.get('url') if isinstance(image, dict) else image for image in product.get('images') or []]
+    if product.get('imageUrl'):
+        urls.append(product['imageUrl'])
+    return urls
+
+
+class Decision:
+    """一次去重判断的结果"""
+
+    __slots__ = ('duplicate', 'reason', 'score', 'match')
+
+    def __init__(self, duplicate, reason='', score=0.0, match=None):
+        self.duplicate = duplicate
+        self.reason = reason      # 'url' / 'similar' / 'variant'（同一商品族的新变体，不是重复）/ ''
+        self.score = score
+        self.match = match        # 匹配到的已有商品 (名称, URL)
+
+
+class _Entry:
+    __slots__ = ('name', 'url', 'category', 'shingles', 'assets', 'price')
+
+    def __init__(self, product, category):
+        self.name = product.get('name') or ''
+        self.url = product.get('url') or ''
+        self.category = (category or '').lower()
+        self.shingles = name_shingles(self.name)
+        self.assets = asset_bases(product_image_urls(product))
+        self.price = parse_price(product.get('price'))
+
+
+class DedupIndex:
+    """近似去重索引
+
+    用法:
+        index = DedupIndex()
+        index.add(product, category)               # 已有商品
+        decision = index.check(product, category)  # 新商品
+        if not decision.duplicate:
+            index.add(product, category)
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.entries = []
+        self.by_url = {}                   # 规范化URL + 变体参数 -> 条目编号
+        self.by_family = {}                # 去掉变体参数的规范化URL -> 条目编号
+        self.blocks = defaultdict(list)    # (类目, 单词) -> 条目编号
+        self.asset_blocks = defaultdict(list)  # 资源ID前缀 -> 条目编号
+        self.merges = []                   # 判为重复的记录: (新商品名称, 新URL, 原因, 分数, 匹配名称, 匹配URL)
+        self.counts = Counter()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _tokens(self, entry):
+        return slug_tokens(entry.url) | set(normalize_text(entry.name).split())
+
+    def add(self, product, category=None):
+        entry = _Entry(product, category)
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        if entry.url:
+            self.by_url.setdefault(variant_url_key(entry.url), entry_id)
+            self.by_family.setdefault(canonical_url(entry.url), entry_id)
+        for token in self._tokens(entry):
+            self.blocks[(entry.category, token)].append(entry_id)
+        for asset in entry.assets:
+            self.asset_blocks[asset].append(entry_id)
+        return entry_id
+
+    def _candidates(self, entry):
+        """共享单词（稀有的优先）或资源ID 的已有条目，最多 MAX_CANDIDATES 个"""
+        shared = Counter()
+        for token in self._tokens(entry):
+            block = self.blocks.get((entry.category, token))
+            if block and len(block) <= MAX_BLOCK_SIZE:
+                shared.update(block)
+        for asset in entry.assets:
+            block = self.asset_blocks.get(asset)
+            if block and len(block) <= MAX_BLOCK_SIZE:
+                shared.update(block)
+        return [entry_id for entry_id, _ in shared.most_common(MAX_CANDIDATES)]
+
+    def score(self, a, b):
+        """名称相似度，按资源ID 和价格调整"""
+        score = jaccard(a.shingles, b.shingles)
+        if a.assets and b.assets:
+            score += ASSET_MATCH_BONUS if a.assets & b.assets else -ASSET_MISMATCH_PENALTY
+        if a.price and b.price:
+            ratio = max(a.price, b.price) / min(a.price, b.price)
+            if ratio == 1:
+                score += PRICE_MATCH_BONUS
+            elif ratio > PRICE_MISMATCH_RATIO:
+                score -= PRICE_MISMATCH_PENALTY
+        return min(score, 1.0)
+
+    def check(self, product, category=None):
+        """判断商品是否与已有商品重复（不会把商品加入索引）"""
+        entry = _Entry(product, category)
+        match_id = self.by_url.get(variant_url_key(entry.url))
+        if match_id is not None:
+            return self._decide(entry, Decision(True, 'url', 1.0, match_id))
+        family_id = self.by_family.get(canonical_url(entry.url))
+        if family_id is not None:
+            # 同一商品的另一个变体（面料、尺寸不同），名称和图片必然相似，不能按近似重复丢掉
+            return self._decide(entry, Decision(False, 'variant', 1.0, family_id))
+
+        best_id, best_score = None, 0.0
+        for entry_id in self._candidates(entry):
+            score = self.score(entry, self.entries[entry_id])
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        if best_id is not None and best_score >= self.threshold:
+            return self._decide(entry, Decision(True, 'similar', best_score, best_id))
+        return self._decide(entry, Decision(False, '', best_score, best_id))
+
+    def _decide(self, entry, decision):
+        if decision.match is not None:
+            matched = self.entries[decision.match]
+            decision.match = (matched.name, matched.url)
+        self.counts[decision.reason or 'new'] += 1
+        if decision.duplicate:
+            self.merges.append((entry.name, entry.url, decision.reason, decision.score) + decision.match)
+        return decision
+
+    def report(self, limit=20):
+        print(f"\n去重: 检查 {sum(self.counts.values())} 个商品, 新商品 {self.counts['new']}, "
+              f"新变体 {self.counts['variant']}, URL 重复 {self.counts['url']}, 近似重复 {self.counts['similar']}")
+        similar = [m for m in self.merges if m[2] == 'similar']
+        for name, url, reason, score, match_name, match_url in similar[:limit]:
+            print(f"  合并 ({score:.2f}): {name} -> {match_name}")
+            print(f"      {url}\n      {match_url}")
+        if len(similar) > limit:
+            print(f"  ... 另有 {len(similar) - limit} 个近似重复未列出")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+所有抓取脚本共用的页面提取脚本
+提取函数通过 init script 在每个浏览器上下文中注入一次（window.__castleryExtract），
+之后每个页面只需要一次很小的 evaluate 调用，而不是每次都把整段 JavaScript 发过去
+"""
+
+# 列表页：提取最多 maxProducts 个商品卡片的基本信息
+LIST_EXTRACTOR_JS = r"""
+(maxProducts) => {
+    const products = [];
+    const toFullUrl = url => url.startsWith('http') ? url : 'https://www.castlery.com' + url;
+    const nameFromUrl = url => {
+        const urlMatch = url.match(/products\/([^?]+)/);
+        if (!urlMatch) return '';
+        return urlMatch[1].split('-').map(w => w.charAt(0).toUpperCase() + w.slice(1)).join(' ');
+    };
+
+    // 先找到所有商品卡片
+    const productCards = Array.from(document.querySelectorAll('article, [class*="product"], [class*="card"]'))
+        .filter(card => card.querySelector('a[href*="/products/"]') && card.querySelector('img[src*="cloudinary"]'))
+        .slice(0, maxProducts);
+
+    productCards.forEach((card, i) => {
+        const link = card.querySelector('a[href*="/products/"]');
+        const img = card.querySelector('img[src*="cloudinary"]');
+        const url = link.href || link.getAttribute('href');
+
+        // 尝试多种方式获取商品名称
+        let name = '';
+        const titleEl = card.querySelector('h2, h3, [class*="title"], [class*="name"]');
+        if (titleEl) {
+            name = titleEl.textContent?.trim();
+        } else {
+            const linkText = link.textContent?.trim();
+            if (linkText && linkText.length > 5 && linkText.length < 100 && !linkText.includes('http')) {
+                name = linkText;
+            } else {
+                name = nameFromUrl(url);
+            }
+        }
+
+        const priceEl = card.querySelector('[class*="price"], [class*="Price"]');
+        const descEl = card.querySelector('[class*="description"], [class*="feature"], [class*="tag"]');
+        const tagEl = card.querySelector('[class*="badge"], [class*="tag"], [class*="label"]');
+        products.push({
+            index: i + 1,
+            name: name || 'Unknown',
+            url: toFullUrl(url),
+            imageUrl: img.src || img.getAttribute('src') || '',
+            price: priceEl?.textContent?.trim() || 'N/A',
+            description: descEl?.textContent?.trim() || '',
+            tag: tagEl?.textContent?.trim() || ''
+        });
+    });
+
+    // 如果没找到足够的商品，尝试直接从链接提取
+    if (products.length < maxProducts) {
+        const links = Array.from(document.querySelectorAll('a[href*="/products/"]'))
+            .filter(link => {
+                const card = link.closest('article, [class*="product"], [class*="card"], div');
+                return card && card.querySelector('img[src*="cloudinary"]');
+            })
+            .slice(0, maxProducts);
+
+        links.forEach((link, i) => {
+            if (i >= products.length) {
+                const url = link.href || link.getAttribute('href');
+                products.push({
+                    index: i + 1,
+                    name: nameFromUrl(url) || 'Unknown',
+                    url: toFullUrl(url),
+                    imageUrl: '',
+                    price: 'N/A',
+                    description: '',
+                    tag: ''
+                });
+            }
+        });
+    }
+
+    return products;
+}
+"""
+
+# 详情页：名称、价格、类目/系列、选项和商品图片
+DETAIL_EXTRACTOR_JS = r"""
+() => {
+    const p = {};
+    const productTitle = document.querySelector('h1');
+    p.name = productTitle?.textContent?.trim() || '';
+    p.price = document.querySelector('h3')?.textContent?.trim() || '';
+
+    const mainCategories = ['Sofas', 'Tables', 'Chairs', 'Beds', 'Storage', 'Furniture Sets', 'Outdoor', 'Accessories'];
+    const categoryPaths = {
+        'sofas': 'Sofas',
+        'tables': 'Tables',
+        'chairs': 'Chairs',
+        'beds': 'Beds',
+        'storage': 'Storage',
+        'furniture-sets': 'Furniture Sets',
+        'outdoor': 'Outdoor',
+        'accessories': 'Accessories'
+    };
+
+    // 提取breadcrumb - 从商品标题上方的breadcrumb区域提取
+    const bc = [];
+    if (productTitle) {
+        const selector = Object.keys(categoryPaths).map(key => `a[href*="/${key}/"]`).join(', ');
+        let parent = productTitle.parentElement;
+        for (let i = 0; i < 5 && parent; i++) {
+            const links = parent.querySelectorAll(selector);
+            if (links.length > 0) {
+                links.forEach(link => {
+                    const text = link.textContent?.trim();
+                    if (text && text !== 'Home' && !text.includes('>') && !text.includes('Go to')) {
+                        if (!bc.includes(text)) bc.push(text);
+                    }
+                });
+                break;
+            }
+            parent = parent.parentElement;
+        }
+    }
+
+    // 如果还是没找到，从URL推断
+    if (bc.length === 0) {
+        const path = window.location.pathname;
+        for (const [key, value] of Object.entries(categoryPaths)) {
+            if (path.includes('/' + key + '/')) {
+                bc.push(value);
+                break;
+            }
+        }
+    }
+
+    // 确定category和collection
+    p.category = bc.find(b => mainCategories.some(c => b.includes(c))) || '';
+    p.collection = bc.length > 1 ? bc[bc.length - 1] : '';
+
+    const opts = [];
+    const excludeTypes = ['singapore', 'country selector', 'go to', 'pagination', 'stocked', 'view', 'get', 'add-on'];
+    const stripSelect = v => v?.replace(/^Select\s+/i, '');
+
+    // 选项按钮和可点击项只查询一次，所有选项类型共用
+    const selectButtons = Array.from(document.querySelectorAll('button[aria-label*="Select"]'))
+        .map(btn => stripSelect(btn.getAttribute('aria-label')))
+        .filter(Boolean);
+    const clickableValues = Array.from(document.querySelectorAll('radiogroup generic[cursor="pointer"], generic[cursor="pointer"]'))
+        .map(r => r.textContent?.trim())
+        .filter(v => v && v.length < 80);
+
+    // 方法1: 从文本中提取（更准确）
+    // 所有标签合并成一个正则，对 innerText 只扫描一遍；长标签排在前面，优先匹配 "leg color:" 而不是 "leg:"
+    const patterns = ['Model:', 'material:', 'colour:', 'orientation:', 'table:', 'frame cover:', 'variant:', 'length:', 'size:', 'color:', 'finish:', 'leg color:', 'leg:', 'wood:', 'power recliner qty:', 'bench:', 'chair material:', 'chairs qty:', 'height:', 'width:', 'depth:'];
+    const labels = patterns.map(pt => pt.replace(':', '').trim().toLowerCase());
+    const labelRegex = new RegExp(
+        '(' + [...labels].sort((a, b) => b.length - a.length).map(l => l.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')).join('|') + '):',
+        'gi'
+    );
+    const bodyText = document.body.innerText;
+    const firstValues = {};
+    for (const match of bodyText.matchAll(labelRegex)) {
+        const type = match[1].toLowerCase();
+        if (type in firstValues) continue;
+        let start = match.index + match[0].length;
+        while (start < bodyText.length && /\s/.test(bodyText[start])) start++;
+        let end = bodyText.indexOf('\n', start);
+        if (end < 0) end = bodyText.length;
+        firstValues[type] = bodyText.slice(start, end).trim();
+    }
+
+    // 按原来的标签顺序输出
+    labels.forEach(type => {
+        const currentVal = firstValues[type];
+        if (excludeTypes.some(ex => type.includes(ex))) return;
+        if (!currentVal || currentVal.length >= 100) return;
+        const vals = [currentVal];
+        // 查找相关的按钮选项
+        selectButtons.forEach(v => {
+            if (v.toLowerCase().includes(type) && !vals.includes(v)) vals.push(v);
+        });
+        // 查找radiogroup选项
+        clickableValues.forEach(v => {
+            if (!vals.includes(v) && v !== currentVal) vals.push(v);
+        });
+        opts.push({ type: type, values: [...new Set(vals)] });
+    });
+
+    // 方法2: 从DOM结构中提取选项（作为补充，但需要更严格的过滤）
+    document.querySelectorAll('[class*="option"], [class*="variant"], [class*="selector"]').forEach(section => {
+        const labelEl = section.querySelector('label, [class*="label"], [aria-label]');
+        let label = labelEl?.textContent?.trim() || labelEl?.getAttribute('aria-label') || '';
+        label = label.replace(':', '').trim().toLowerCase();
+
+        // 严格过滤
+        if (!label || excludeTypes.some(ex => label.includes(ex))) return;
+        if (label.length < 2 || label.length > 30) return;
+        if (opts.find(o => o.type === label)) return;
+
+        const values = [];
+        const currentEl = section.querySelector('[class*="selected"], [aria-selected="true"]');
+        if (currentEl) {
+            const currentVal = currentEl.textContent?.trim() || stripSelect(currentEl.getAttribute('aria-label'));
+            if (currentVal && currentVal.length < 100) values.push(currentVal);
+        }
+
+        section.querySelectorAll('button[aria-label*="Select"], button[class*="option"]').forEach(btn => {
+            const v = stripSelect(btn.getAttribute('aria-label')) || btn.textContent?.trim();
+            if (v && v.length < 100 && !values.includes(v)) values.push(v);
+        });
+
+        section.querySelectorAll('radiogroup generic[cursor="pointer"], generic[cursor="pointer"]').forEach(r => {
+            const v = r.textContent?.trim();
+            if (v && v.length < 80 && !values.includes(v)) values.push(v);
+        });
+
+        if (values.length > 0) {
+            opts.push({ type: label, values: [...new Set(values)] });
+        }
+    });
+
+    p.options = opts;
+
+    const imgs = Array.from(document.querySelectorAll('img[src*="cloudinary"][src*="crusader/variants"]'))
+        .map(img => img.src)
+        .filter(src => src && !['swatch', 'icon', 'UGC', 'Social', 'video'].some(ex => src.includes(ex)));
+    p.images = [...new Set(imgs)].slice(0, 10);
+
+    return p;
+}
+"""
+
+# 注入到浏览器上下文的 init script，每个页面加载时都会执行
+EXTRACTOR_INIT_JS = f"""
+window.__castleryExtract = {{
+    listProducts: {LIST_EXTRACTOR_JS.strip()},
+    productDetail: {DETAIL_EXTRACTOR_JS.strip()}
+}};
+"""
+
+# 提取函数不存在时（页面不是由注入过的上下文创建的）返回 null，由 Python 端补注入
+_CALL_LIST_JS = "(n) => window.__castleryExtract ? window.__castleryExtract.listProducts(n) : null"
+_CALL_DETAIL_JS = "() => window.__castleryExtract ? window.__castleryExtract.productDetail() : null"
+
+
+async def install_extractors(target):
+    """在浏览器上下文（或单个页面）上注册 init script，之后打开的页面都自带提取函数"""
+    await target.add_init_script(script=EXTRACTOR_INIT_JS)
+
+
+async def _ensure_installed(page):
+    await page.evaluate(EXTRACTOR_INIT_JS)
+
+
+async def extract_products_from_list(page, max_products=5):
+    """从商品列表页面提取商品的基本信息"""
+    products = await page.evaluate(_CALL_LIST_JS, max_products)
+    if products is None:
+        await _ensure_installed(page)
+        products = await page.evaluate(_CALL_LIST_JS, max_products)
+    return products
+
+
+async def extract_product_detail(page):
+    """从商品详情页提取完整信息"""
+    detail = await page.evaluate(_CALL_DETAIL_JS)
+    if detail is None:
+        await _ensure_installed(page)
+        detail = await page.evaluate(_CALL_DETAIL_JS)
+    return detail
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+商品详情快速通道：不启动浏览器，直接请求 HTML 并解析页面内嵌的数据
+（JSON-LD、__NEXT_DATA__），输出与 extract_product_detail() 相同结构的字典。
+解析失败时返回 None，由调用方回退到 Playwright 渲染。
+"""
+
+import asyncio
+import json
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+try:
+    import httpx
+except ImportError:  # 未安装 httpx 时快速通道不可用，全部走浏览器
+    httpx = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 与浏览器提取脚本保持一致的类目映射
+MAIN_CATEGORIES = ['Sofas', 'Tables', 'Chairs', 'Beds', 'Storage', 'Furniture Sets', 'Outdoor', 'Accessories']
+CATEGORY_PATHS = {
+    'sofas': 'Sofas',
+    'tables': 'Tables',
+    'chairs': 'Chairs',
+    'beds': 'Beds',
+    'storage': 'Storage',
+    'furniture-sets': 'Furniture Sets',
+    'outdoor': 'Outdoor',
+    'accessories': 'Accessories',
+}
+# 图片过滤规则同浏览器提取脚本
+IMAGE_EXCLUDES = ('swatch', 'icon', 'UGC', 'Social', 'video')
+MAX_IMAGES = 10
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'),
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'en-SG,en;q=0.9',
+}
+
+
+def response_validators(headers):
+    """从响应头（键为小写）中取出条件请求用的 ETag / Last-Modified"""
+    return {
+        'etag': headers.get('etag'),
+        'last_modified': headers.get('last-modified'),
+    }
+
+
+class _EmbeddedDataParser(HTMLParser):
+    """收集页面中的 JSON-LD 和 __NEXT_DATA__ 脚本内容"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld = []
+        self.next_data = None
+        self._current = None
+        self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'script':
+            return
+        attrs = dict(attrs)
+        if attrs.get('type') == 'application/ld+json':
+            self._current = 'ld'
+        elif attrs.get('id') == '__NEXT_DATA__':
+            self._current = 'next'
+        else:
+            self._current = None
+        self._buffer = []
+
+    def handle_data(self, data):
+        if self._current:
+            self._buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != 'script' or not self._current:
+            return
+        try:
+            payload = json.loads(''.join(self._buffer))
+        except ValueError:
+            payload = None
+        if payload is not None:
+            if self._current == 'ld':
+                self.json_ld.extend(payload if isinstance(payload, list) else [payload])
+            else:
+                self.next_data = payload
+        self._current = None
+        self._buffer = []
+
+
+def _iter_ld_nodes(nodes):
+    """展开 JSON-LD 中的 @graph"""
+    for node in nodes:
+        if isinstance(node, dict):
+            if '@graph' in node:
+                yield from _iter_ld_nodes(node['@graph'])
+            else:
+                yield node
+
+
+def _ld_types(node):
+    t = node.get('@type', [])
+    return set(t if isinstance(t, list) else [t])
+
+
+def format_price(value):
+    """把数字价格格式化成页面上的样式，如 1699 -> $1,699"""
+    if value in (None, ''):
+        return ''
+    if isinstance(value, str):
+        if value.strip().startswith('$'):
+            return value.strip()
+        try:
+            value = float(value.replace(',', ''))
+        except ValueError:
+            return value.strip()
+    text = f"{value:,.2f}".rstrip('0').rstrip('.')
+    return f"${text}"
+
+
+def _image_urls(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return _image_urls(value.get('url') or value.get('contentUrl') or value.get('src'))
+    if isinstance(value, list):
+        urls = []
+        for v in value:
+            urls.extend(_image_urls(v))
+        return urls
+    return []
+
+
+def filter_images(urls):
+    """只保留商品主图，去重并限制数量"""
+    result = []
+    for url in urls:
+        if not url or 'cloudinary' not in url or 'crusader/variants' not in url:
+            continue
+        if any(ex in url for ex in IMAGE_EXCLUDES):
+            continue
+        if url not in result:
+            result.append(url)
+    return result[:MAX_IMAGES]
+
+
+def _add_option(options, type_, value):
+    type_ = str(type_).replace(':', '').strip().lower()
+    value = str(value).strip()
+    if not type_ or not value or len(value) >= 100:
+        return
+    for opt in options:
+        if opt['type'] == type_:
+            if value not in opt['values']:
+                opt['values'].append(value)
+            return
+    options.append({'type': type_, 'values': [value]})
+
+
+def _options_from_ld(product, variants):
+    options = []
+    for prop in product.get('additionalProperty', []) or []:
+        if isinstance(prop, dict):
+            _add_option(options, prop.get('name', ''), prop.get('value', ''))
+    varies_by = product.get('variesBy') or []
+    if isinstance(varies_by, str):
+        varies_by = [varies_by]
+    keys = [v.rsplit('/', 1)[-1] for v in varies_by]
+    for variant in variants:
+        for key in keys:
+            if variant.get(key):
+                _add_option(options, key, variant[key])
+        for prop in variant.get('additionalProperty', []) or []:
+            if isinstance(prop, dict):
+                _add_option(options, prop.get('name', ''), prop.get('value', ''))
+    return options
+
+
+def _category_from_breadcrumb(nodes):
+    for node in nodes:
+        if 'BreadcrumbList' not in _ld_types(node):
+            continue
+        names = []
+        for item in node.get('itemListElement', []):
+            if not isinstance(item, dict):
+                continue
+            name = item.get('name')
+            if not name and isinstance(item.get('item'), dict):
+                name = item['item'].get('name')
+            if name and name != 'Home':
+                names.append(name.strip())
+        category = next((n for n in names if any(c in n for c in MAIN_CATEGORIES)), '')
+        collection = names[-1] if len(names) > 1 else ''
+        return category, collection
+    return '', ''
+
+
+def _category_from_url(url):
+    path = urlparse(url).path
+    for key, value in CATEGORY_PATHS.items():
+        if f'/{key}/' in path:
+            return value
+    return ''
+
+
+def parse_json_ld(nodes, url=''):
+    """从 JSON-LD 节点中解析商品详情，找不到 Product 时返回 None"""
+    nodes = list(_iter_ld_nodes(nodes))
+    product = next((n for n in nodes if _ld_types(n) & {'Product', 'ProductGroup'}), None)
+    if not product or not product.get('name'):
+        return None
+
+    variants = [v for v in product.get('hasVariant', []) or [] if isinstance(v, dict)]
+    offers = product.get('offers') or (variants[0].get('offers') if variants else None) or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    price = offers.get('price') or offers.get('lowPrice')
+
+    images = _image_urls(product.get('image'))
+    for variant in variants:
+        images.extend(_image_urls(variant.get('image')))
+
+    category, collection = _category_from_breadcrumb(nodes)
+    return {
+        'name': product['name'].strip(),
+        'price': format_price(price),
+        'category': category or _category_from_url(url),
+        'collection': collection,
+        'options': _options_from_ld(product, variants),
+        'images': filter_images(images),
+    }
+
+
+def _find_product_node(data, depth=0):
+    """在 __NEXT_DATA__ 中查找看起来像商品的对象（有名称，且有价格或图片）"""
+    if depth > 12:
+        return None
+    if isinstance(data, dict):
+        if isinstance(data.get('name'), str) and ('price' in data or 'images' in data) and ('variants' in data or 'options' in data):
+            return data
+        for value in data.values():
+            found = _find_product_node(value, depth + 1)
+            if found is not None:
+                return found
+    elif isinstance(data, list):
+        for value in data:
+            found = _find_product_node(value, depth + 1)
+            if found is not None:
+                return found
+    return None
+
+
+def parse_next_data(next_data, url=''):
+    """从 __NEXT_DATA__ 中解析商品详情，找不到商品对象时返回 None"""
+    product = _find_product_node(next_data)
+    if not product:
+        return None
+
+    price = product.get('price')
+    if isinstance(price, dict):
+        price = price.get('amount') or price.get('value') or price.get('current')
+
+    options = []
+    for opt in product.get('options') or []:
+        if not isinstance(opt, dict):
+            continue
+        type_ = opt.get('name') or opt.get('label') or opt.get('type') or ''
+        for value in opt.get('values') or []:
+            if isinstance(value, dict):
+                value = value.get('name') or value.get('label') or value.get('value') or ''
+            _add_option(options, type_, value)
+
+    images = _image_urls(product.get('images'))
+    for variant in product.get('variants') or []:
+        if isinstance(variant, dict):
+            images.extend(_image_urls(variant.get('images') or variant.get('image')))
+
+    category = product.get('category')
+    if isinstance(category, dict):
+        category = category.get('name')
+    collection = product.get('collection')
+    if isinstance(collection, dict):
+        collection = collection.get('name')
+    return {
+        'name': product['name'].strip(),
+        'price': format_price(price),
+        'category': category or _category_from_url(url),
+        'collection': collection or '',
+        'options': options,
+        'images': filter_images(images),
+    }
+
+
+def parse_product_html(html, url=''):
+    """解析详情页 HTML，优先 JSON-LD，其次 __NEXT_DATA__
+
+    只有名称存在且价格或图片至少有一项时才认为解析成功，否则返回 None。
+    """
+    parser = _EmbeddedDataParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        return None
+
+    candidates = []
+    if parser.json_ld:
+        candidates.append(parse_json_ld(parser.json_ld, url))
+    if parser.next_data is not None:
+        candidates.append(parse_next_data(parser.next_data, url))
+
+    detail = None
+    for candidate in candidates:
+        if not candidate:
+            continue
+        if detail is None:
+            detail = candidate
+            continue
+        # 合并两种来源：前者缺的字段用后者补齐
+        for key, value in candidate.items():
+            if not detail.get(key) and value:
+                detail[key] = value
+
+    if not detail or not detail.get('name') or not (detail.get('price') or detail.get('images')):
+        return None
+    return detail
+
+
+class FastDetailFetcher:
+    """复用连接池的异步 HTML 抓取器
+
+    用法:
+        async with FastDetailFetcher() as fetcher:
+            detail = await fetcher.fetch(url)  # None 表示需要回退到浏览器
+    """
+
+    def __init__(self, concurrency=8, timeout=20, enabled=True):
+        # enabled 只控制是否解析详情；装了 httpx 就建立连接池，条件请求也要用
+        self.enabled = enabled and httpx is not None
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.validators = {}  # url -> {"etag": ..., "last_modified": ...}
+        self._client = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        if httpx is not None:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency,
+                                    max_keepalive_connections=self.concurrency),
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch_html(self, url):
+        async with self._semaphore:
+            response = await self._client.get(url)
+        if response.status_code != 200:
+            return None
+        self.validators[url] = response_validators(response.headers)
+        return response.text
+
+    async def revalidate(self, url, headers):
+        """发送条件请求，服务器返回 304 时说明页面未变化"""
+        if self._client is None or not headers:
+            return False
+        try:
+            async with self._semaphore:
+                response = await self._client.head(url, headers=headers)
+        except Exception:
+            return False
+        return response.status_code == 304
+
+    async def fetch(self, url):
+        """抓取并解析详情页，失败时返回 None"""
+        if not self.enabled or self._client is None:
+            return None
+        try:
+            html = await self.fetch_html(url)
+            detail = parse_product_html(html, url) if html else None
+        except Exception:
+            detail = None
+        if detail:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return detail
+
+    def report(self):
+        if not self.enabled:
+            print("\n快速通道: 未启用" + ("（未安装 httpx）" if httpx is None else ""))
+            return
+        total = self.hits + self.misses
+        print(f"\n快速通道: {self.hits}/{total} 个详情页无需浏览器, {self.misses} 个回退到 Playwright")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+增量抓取：记录每个商品URL的指纹，只重新抓取发生变化或已过期的详情页
+
+指纹来源：
+1. 列表卡片字段（名称、价格、标签、描述）的哈希，列表页每次都会抓取
+2. 详情页 HTTP 响应的 ETag / Last-Modified，过期后用条件请求确认是否变化
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from catalog import load_catalog, iter_products
+
+# 默认指纹有效期：超过该时间即使卡片没变也重新确认
+DEFAULT_TTL_HOURS = 24 * 7
+
+# 参与卡片指纹的列表页字段
+CARD_FIELDS = ('name', 'price', 'tag', 'description')
+
+FRESH = 'fresh'        # 卡片没变且未过期，直接沿用上次结果
+STALE = 'stale'        # 卡片没变但已过期，需要确认
+CHANGED = 'changed'    # 卡片字段变化
+NEW = 'new'            # 第一次见到
+
+
+def card_fingerprint(product):
+    """列表卡片字段的哈希"""
+    payload = json.dumps([product.get(field) or '' for field in CARD_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def load_previous_products(output_file):
+    """读取上一次的输出，返回 URL -> 商品字典"""
+    output_file = Path(output_file)
+    if not output_file.exists():
+        return {}
+    previous = {}
+    for _, product in iter_products(load_catalog(output_file)):
+        if product.get('url'):
+            previous[product['url']] = product
+    return previous
+
+
+class ChangeTracker:
+    """根据指纹决定哪些详情页需要重新抓取
+
+    指纹保存在 JSON 文件中: {url: {"card": 哈希, "etag": ..., "last_modified": ..., "checked_at": 时间戳}}
+    """
+
+    def __init__(self, store_path, previous_output, ttl_hours=DEFAULT_TTL_HOURS, enabled=True):
+        self.store_path = Path(store_path)
+        self.previous_output = previous_output
+        self.ttl_seconds = ttl_hours * 3600
+        self.enabled = enabled
+        self.fingerprints = {}
+        self.previous = {}
+        self.counts = {FRESH: 0, STALE: 0, CHANGED: 0, NEW: 0, 'revalidated': 0}
+
+    def load(self):
+        if not self.enabled:
+            return self
+        if self.store_path.exists():
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                self.fingerprints = json.load(f)
+        self.previous = load_previous_products(self.previous_output)
+        return self
+
+    def save(self):
+        if not self.enabled:
+            return
+        tmp_path = self.store_path.with_suffix(self.store_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.fingerprints, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.store_path)
+
+    def check(self, product, now=None):
+        """返回 (状态, 上次的商品字典)；上次结果不存在时一律视为 NEW"""
+        if not self.enabled:
+            return NEW, None
+        now = now or time.time()
+        url = product['url']
+        entry = self.fingerprints.get(url)
+        previous = self.previous.get(url)
+        if not entry or not previous:
+            state = NEW
+        elif entry.get('card') != card_fingerprint(product):
+            state = CHANGED
+        elif now - entry.get('checked_at', 0) > self.ttl_seconds:
+            state = STALE
+        else:
+            state = FRESH
+        self.counts[state] += 1
+        return state, previous
+
+    def validators(self, url):
+        """条件请求用的请求头（If-None-Match / If-Modified-Since）"""
+        entry = self.fingerprints.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url, now=None):
+        """条件请求确认未变化，刷新检查时间"""
+        self.counts['revalidated'] += 1
+        if url in self.fingerprints:
+            self.fingerprints[url]['checked_at'] = now or time.time()
+
+    def record(self, product, result, validators=None, now=None):
+        """记录新抓取结果的指纹；没有图片的结果视为抓取失败，不记录，下次重试"""
+        if not self.enabled or not result.get('images'):
+            return
+        validators = validators or {}
+        self.fingerprints[product['url']] = {
+            'card': card_fingerprint(product),
+            'etag': validators.get('etag'),
+            'last_modified': validators.get('last_modified'),
+            'checked_at': now or time.time(),
+        }
+
+    def report(self):
+        if not self.enabled:
+            print("\n增量抓取: 未启用（全量抓取）")
+            return
+        c = self.counts
+        reused = c[FRESH] + c['revalidated']
+        total = sum(c[s] for s in (FRESH, STALE, CHANGED, NEW))
+        print(f"\n增量抓取: {reused}/{total} 个详情页沿用上次结果 "
+              f"(未变化 {c[FRESH]}, 条件请求确认 {c['revalidated']}), "
+              f"重新抓取: 变化 {c[CHANGED]}, 过期 {c[STALE] - c['revalidated']}, 新商品 {c[NEW]}")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+列表页商品收集器
+不断滚动（或点击"加载更多"、跟随分页链接），直到收集够目标数量或商品卡片不再增加，
+每发现一批新商品就立即产出，详情页抓取不必等整个列表收集完
+"""
+
+from extractors import extract_products_from_list
+from page_settle import settle_page, LISTING
+
+# 滚动后等待新卡片出现的最长时间（毫秒）
+GROWTH_TIMEOUT_MS = 4000
+# 连续多少轮没有新商品就尝试其它加载方式/结束
+MAX_STALE_ROUNDS = 2
+# 最多滚动轮数，防止无限滚动页面一直加载下去
+MAX_ROUNDS = 40
+
+# 滚动到底部，等待带图片的商品链接数量比滚动前增加（或超时），返回是否增加
+SCROLL_AND_WAIT_JS = """
+    (timeoutMs) => new Promise(resolve => {
+        const count = () => {
+            let n = 0;
+            document.querySelectorAll('a[href*="/products/"]').forEach(link => {
+                const card = link.closest('article, [class*="product"], [class*="card"], div');
+                if (card && card.querySelector('img[src*="cloudinary"]')) n++;
+            });
+            return n;
+        };
+        const previous = count();
+        window.scrollTo(0, document.body.scrollHeight);
+        const start = performance.now();
+        const poll = () => {
+            if (count() > previous) resolve(true);
+            else if (performance.now() - start >= timeoutMs) resolve(false);
+            else setTimeout(poll, 150);
+        };
+        poll();
+    })
+"""
+
+# 点击"加载更多"类按钮，找到并点击返回 true
+CLICK_LOAD_MORE_JS = """
+    () => {
+        const pattern = /^(load|show|view) more/i;
+        const button = Array.from(document.querySelectorAll('button, a[role="button"]'))
+            .find(el => pattern.test(el.textContent?.trim() || '') && !el.disabled);
+        if (!button) return false;
+        button.scrollIntoView();
+        button.click();
+        return true;
+    }
+"""
+
+# 分页链接（rel=next）
+NEXT_PAGE_JS = """
+    () => {
+        const next = document.querySelector('a[rel="next"], link[rel="next"]');
+        return next ? (next.href || next.getAttribute('href')) : null;
+    }
+"""
+
+
+async def harvest_listing(page, target, accept=None):
+    """异步生成器：逐批产出列表页上新出现的商品，直到收集够 target 个或不再增长
+
+    页面需要已经打开类目页并完成 settle。产出的商品字典结构与
+    extract_products_from_list() 相同，index 为在本类目中的发现顺序（从 1 开始）。
+    accept(product) 返回 False 的商品（如重复商品）不产出，也不计入 target。
+    """
+    seen = set()
+    accepted = 0
+    stale_rounds = 0
+
+    for _ in range(MAX_ROUNDS):
+        # 已见过的卡片之后再多取 target 个，保证新卡片在提取窗口内
+        products = await extract_products_from_list(page, len(seen) + target)
+        new_products = [p for p in products if p['url'] not in seen]
+        for product in new_products:
+            seen.add(product['url'])
+            product['index'] = len(seen)
+            if accept is not None and not accept(product):
+                continue
+            accepted += 1
+            yield product
+            if accepted >= target:
+                return
+
+        stale_rounds = 0 if new_products else stale_rounds + 1
+        if stale_rounds >= MAX_STALE_ROUNDS:
+            # 滚动已经加载不出新商品：依次尝试"加载更多"按钮和分页链接
+            if await page.evaluate(CLICK_LOAD_MORE_JS):
+                stale_rounds = 0
+            else:
+                next_url = await page.evaluate(NEXT_PAGE_JS)
+                if not next_url or next_url == page.url:
+                    return
+                await page.goto(next_url, wait_until='domcontentloaded', timeout=60000)
+                await settle_page(page, LISTING)
+                stale_rounds = 0
+                continue
+
+        await page.evaluate(SCROLL_AND_WAIT_JS, GROWTH_TIMEOUT_MS)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+页面就绪等待策略
+替代 goto 之后固定的 asyncio.sleep：提取器需要的数据一出现就返回，
+并记录每类页面的等待耗时
+"""
+
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+LISTING = 'listing'
+DETAIL = 'detail'
+
+# 各类页面"数据已就绪"的判定条件（在页面中执行）
+READY_PREDICATES = {
+    # 列表页：至少出现 min_items 个带 Cloudinary 图片的商品链接
+    LISTING: """
+        (minItems) => {
+            const links = document.querySelectorAll('a[href*="/products/"]');
+            let count = 0;
+            for (const link of links) {
+                const card = link.closest('article, [class*="product"], [class*="card"], div');
+                if (card && card.querySelector('img[src*="cloudinary"]')) count++;
+                if (count >= minItems) return true;
+            }
+            return false;
+        }
+    """,
+    # 详情页：标题、价格和商品图都已渲染
+    DETAIL: """
+        () => {
+            const h1 = document.querySelector('h1');
+            if (!h1 || !h1.textContent.trim()) return false;
+            if (!document.querySelector('h3')) return false;
+            return !!document.querySelector('img[src*="cloudinary"][src*="crusader/variants"]');
+        }
+    """,
+}
+
+# 等待 DOM 在 quietMs 内没有变化（最多 maxMs），用于让选项、图片列表完成渲染
+DOM_QUIET_JS = """
+    ({quietMs, maxMs}) => new Promise(resolve => {
+        const start = performance.now();
+        let timer = null;
+        const done = () => { observer.disconnect(); resolve(performance.now() - start); };
+        const observer = new MutationObserver(() => {
+            clearTimeout(timer);
+            if (performance.now() - start >= maxMs) { done(); return; }
+            timer = setTimeout(done, quietMs);
+        });
+        observer.observe(document.body, {childList: true, subtree: true, attributes: true});
+        timer = setTimeout(done, quietMs);
+        setTimeout(done, maxMs);
+    })
+"""
+
+# 就绪判定的超时时间（毫秒）
+READY_TIMEOUT_MS = 20000
+# DOM 静默判定参数（毫秒）
+DOM_QUIET_MS = 300
+DOM_QUIET_MAX_MS = 2000
+# 就绪判定超时后，兜底等待网络空闲的时间（毫秒）
+NETWORK_IDLE_TIMEOUT_MS = 5000
+
+
+class SettleStats:
+    """按页面类型统计等待耗时"""
+
+    def __init__(self):
+        self.timings = {}
+        self.timeouts = {}
+
+    def record(self, page_type, seconds, ready):
+        self.timings.setdefault(page_type, []).append(seconds)
+        if not ready:
+            self.timeouts[page_type] = self.timeouts.get(page_type, 0) + 1
+
+    def summary(self):
+        result = {}
+        for page_type, values in self.timings.items():
+            ordered = sorted(values)
+            result[page_type] = {
+                'pages': len(ordered),
+                'total': sum(ordered),
+                'avg': sum(ordered) / len(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+                'timeouts': self.timeouts.get(page_type, 0),
+            }
+        return result
+
+    def report(self):
+        print("\n页面等待耗时统计:")
+        for page_type, s in self.summary().items():
+            print(f"  {page_type}: {s['pages']} 页, 合计 {s['total']:.1f}s, "
+                  f"平均 {s['avg']:.2f}s, p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, "
+                  f"最大 {s['max']:.2f}s, 超时 {s['timeouts']} 次")
+
+
+# 默认的全局统计，脚本结束时调用 settle_stats.report() 输出
+settle_stats = SettleStats()
+
+
+async def settle_page(page, page_type, min_items=1, stats=None):
+    """等待页面数据就绪，返回是否在超时前满足就绪条件
+
+    1. 轮询 READY_PREDICATES 中对应的条件，满足即进入下一步
+    2. 等待 DOM 短暂静默，让选项和图片列表渲染完整
+    3. 如果条件超时，退而等待网络空闲，之后仍继续提取
+    """
+    stats = stats or settle_stats
+    start = time.perf_counter()
+    ready = True
+    try:
+        arg = min_items if page_type == LISTING else None
+        await page.wait_for_function(READY_PREDICATES[page_type], arg=arg, timeout=READY_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        ready = False
+        try:
+            await page.wait_for_load_state('networkidle', timeout=NETWORK_IDLE_TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            pass  # 网络一直不空闲也继续尝试提取
+
+    if ready:
+        await page.evaluate(DOM_QUIET_JS, {'quietMs': DOM_QUIET_MS, 'maxMs': DOM_QUIET_MAX_MS})
+
+    elapsed = time.perf_counter() - start
+    stats.record(page_type, elapsed, ready)
+    return ready
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+请求拦截：抓取时屏蔽图片、字体、媒体和第三方统计脚本
+提取器只读取 DOM 属性（img.src、文本内容），不需要真正下载这些资源
+"""
+
+from urllib.parse import urlparse
+
+# 允许加载的资源类型（Playwright request.resource_type），列表页和详情页相同：
+# 列表页无限滚动/"加载更多"通过 xhr/fetch 取下一页；走浏览器的详情页是没有内嵌数据、
+# 需要前端请求接口才能渲染的页面（见 fast_detail.py），同样要放行 xhr/fetch。
+# 样式表需要保留：innerText 依赖 CSS 判断元素是否可见，懒加载也依赖布局
+ALLOWED_RESOURCE_TYPES = frozenset({'document', 'script', 'xhr', 'fetch', 'stylesheet'})
+
+# 第三方统计/广告域名，即使是脚本或接口请求也屏蔽
+TRACKER_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googleadservices.com',
+    'facebook.net',
+    'facebook.com',
+    'hotjar.com',
+    'clarity.ms',
+    'tiktok.com',
+    'pinterest.com',
+    'criteo.com',
+    'criteo.net',
+    'bing.com',
+    'snapchat.com',
+    'segment.io',
+    'segment.com',
+    'klaviyo.com',
+    'yotpo.com',
+    'nr-data.net',
+    'newrelic.com',
+    'sentry.io',
+    'intercom.io',
+    'zendesk.com',
+)
+
+# 被屏蔽的请求没有下载，无法测量实际大小；报告中按以下典型大小估算节省的流量
+ESTIMATED_BYTES = {
+    'image': 150 * 1024,
+    'media': 1024 * 1024,
+    'font': 40 * 1024,
+    'script': 60 * 1024,
+    'xhr': 5 * 1024,
+    'fetch': 5 * 1024,
+    'stylesheet': 20 * 1024,
+    'other': 10 * 1024,
+}
+
+
+def is_tracker(url):
+    host = urlparse(url).hostname or ''
+    return any(host == t or host.endswith('.' + t) for t in TRACKER_HOSTS)
+
+
+class ResourceBlocker:
+    """拦截不需要的请求，并统计屏蔽数量和实际下载字节数
+
+    用法:
+        blocker = ResourceBlocker()
+        await blocker.attach(page)
+        await page.goto(url)
+        ...
+        blocker.report()
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.blocked = {}            # resource_type -> 屏蔽次数
+        self.blocked_trackers = 0
+        self.allowed_requests = 0
+        self.downloaded_bytes = 0
+
+    async def attach(self, page):
+        """为页面安装拦截规则（页面池创建页面时调用）"""
+        page.on('requestfinished', self._on_request_finished)
+        if self.enabled:
+            await page.route('**/*', self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        if resource_type not in ALLOWED_RESOURCE_TYPES:
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+            await route.abort()
+        elif resource_type != 'document' and is_tracker(request.url):
+            self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+            self.blocked_trackers += 1
+            await route.abort()
+        else:
+            self.allowed_requests += 1
+            await route.continue_()
+
+    async def _on_request_finished(self, request):
+        try:
+            sizes = await request.sizes()
+            self.downloaded_bytes += sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+        except Exception:
+            pass  # 页面已关闭等情况下拿不到大小，忽略
+
+    def estimated_saved_bytes(self):
+        return sum(ESTIMATED_BYTES.get(t, ESTIMATED_BYTES['other']) * n for t, n in self.blocked.items())
+
+    def report(self):
+        total_blocked = sum(self.blocked.values())
+        print("\n请求拦截统计:")
+        if not self.enabled:
+            print("  未启用拦截")
+        print(f"  放行请求: {self.allowed_requests} 个, 实际下载 {self.downloaded_bytes / 1024 / 1024:.1f} MB")
+        print(f"  屏蔽请求: {total_blocked} 个（其中第三方统计 {self.blocked_trackers} 个）")
+        for resource_type, count in sorted(self.blocked.items(), key=lambda kv: -kv[1]):
+            print(f"    {resource_type}: {count}")
+        print(f"  估算节省: 约 {self.estimated_saved_bytes() / 1024 / 1024:.1f} MB"
+              f"（按每类资源的典型大小估算，被屏蔽的请求未下载，无法实测）")
@@ -4,11 +4,20 @@
 使用Playwright进行浏览器自动化，爬取更多商品并去重
 """
 
+import argparse
 import asyncio
-import yaml
 from playwright.async_api import async_playwright
 from pathlib import Path
-import re
+
+from page_settle import settle_page, settle_stats, LISTING, DETAIL
+from resource_blocker import ResourceBlocker
+from fast_detail import FastDetailFetcher
+from crawl_journal import CrawlJournal
+from catalog import load_catalog, iter_products
+from dedup import DedupIndex, variant_url_key
+from extractors import install_extractors, extract_product_detail
+from listing_harvester import harvest_listing
+from crawl_pool import PagePool, DEFAULT_CONCURRENCY
 
 CATEGORIES = [
     {"name": "Sofas", "url": "https://www.castlery.com/sg/sofas/all-sofas"},
@@ -24,430 +33,175 @@ CATEGORIES = [
 # 每个类目爬取的商品数量（可以调整）
 PRODUCTS_PER_CATEGORY = 25  # 设置为25个商品
 
-def normalize_url(url):
-    """标准化URL，去除查询参数，用于去重"""
-    if not url:
-        return ""
-    # 提取基础URL（去除查询参数）
-    base_url = url.split('?')[0]
-    return base_url.lower().strip()
-
-def normalize_name(name):
-    """标准化商品名称，用于去重"""
-    if not name:
-        return ""
-    # 转换为小写，去除多余空格
-    normalized = re.sub(r'\s+', ' ', name.lower().strip())
-    return normalized
-
-async def extract_products_from_list(page, max_products=30):
-    """从商品列表页面提取商品的基本信息"""
-    try:
-        await page.wait_for_selector('a[href*="/products/"]', timeout=20000)
-    except:
-        pass  # 即使超时也继续尝试提取
-    
-    # 尝试滚动页面以加载更多商品
-    for _ in range(3):
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await asyncio.sleep(1)
-        await page.evaluate("window.scrollTo(0, 0)")
-        await asyncio.sleep(0.5)
-    
-    products = await page.evaluate(f"""
-        () => {{
-            const products = [];
-            // 先找到所有商品卡片
-            const productCards = Array.from(document.querySelectorAll('article, [class*="product"], [class*="card"]'))
-                .filter(card => {{
-                    const link = card.querySelector('a[href*="/products/"]');
-                    const img = card.querySelector('img[src*="cloudinary"]');
-                    return link && img;
-                }})
-                .slice(0, {max_products});
-            
-            productCards.forEach((card, i) => {{
-                const link = card.querySelector('a[href*="/products/"]');
-                const img = card.querySelector('img[src*="cloudinary"]');
-                
-                // 尝试多种方式获取商品名称
-                let name = '';
-                const titleEl = card.querySelector('h2, h3, [class*="title"], [class*="name"]');
-                if (titleEl) {{
-                    name = titleEl.textContent?.trim();
-                }} else {{
-                    // 尝试从链接中提取
-                    const linkText = link.textContent?.trim();
-                    if (linkText && linkText.length > 5 && linkText.length < 100 && !linkText.includes('http')) {{
-                        name = linkText;
-                    }} else {{
-                        // 从URL中提取商品名称
-                        const url = link.href || link.getAttribute('href');
-                        const urlMatch = url.match(/products\\/([^?]+)/);
-                        if (urlMatch) {{
-                            name = urlMatch[1].split('-').map(w => w.charAt(0).toUpperCase() + w.slice(1)).join(' ');
-                        }}
-                    }}
-                }}
-                
-                const priceEl = card.querySelector('[class*="price"], [class*="Price"]');
-                const descEl = card.querySelector('[class*="description"], [class*="feature"], [class*="tag"]');
-                const tagEl = card.querySelector('[class*="badge"], [class*="tag"], [class*="label"]');
-                
-                if (link && img) {{
-                    const url = link.href || link.getAttribute('href');
-                    const fullUrl = url.startsWith('http') ? url : 'https://www.castlery.com' + url;
-                    products.push({{
-                        index: i + 1,
-                        name: name || 'Unknown',
-                        url: fullUrl,
-                        price: priceEl?.textContent?.trim() || 'N/A',
-                        description: descEl?.textContent?.trim() || '',
-                        tag: tagEl?.textContent?.trim() || ''
-                    }});
-                }}
-            }});
-            
-            // 如果没找到足够的商品，尝试直接从链接提取
-            if (products.length < {max_products}) {{
-                const links = Array.from(document.querySelectorAll('a[href*="/products/"]'))
-                    .filter(link => {{
-                        const card = link.closest('article, [class*="product"], [class*="card"], div');
-                        return card && card.querySelector('img[src*="cloudinary"]');
-                    }})
-                    .slice(0, {max_products});
-                
-                links.forEach((link, i) => {{
-                    if (i >= products.length) {{
-                        const url = link.href || link.getAttribute('href');
-                        const fullUrl = url.startsWith('http') ? url : 'https://www.castlery.com' + url;
-                        const urlMatch = url.match(/products\\/([^?]+)/);
-                        let name = 'Unknown';
-                        if (urlMatch) {{
-                            name = urlMatch[1].split('-').map(w => w.charAt(0).toUpperCase() + w.slice(1)).join(' ');
-                        }}
-                        products.push({{
-                            index: i + 1,
-                            name: name,
-                            url: fullUrl,
-                            price: 'N/A',
-                            description: '',
-                            tag: ''
-                        }});
-                    }}
-                }});
-            }}
-            
-            return products;
-        }}
-    """)
-    return products
+async def render_product_detail(page, url):
+    """用浏览器渲染详情页并提取（在页面池中执行）"""
+    await page.goto(url, wait_until='domcontentloaded', timeout=60000)
+    await settle_page(page, DETAIL)
+    return await extract_product_detail(page)
 
-async def extract_product_detail(page):
-    """从商品详情页提取完整信息"""
+async def scrape_product(pool, fetcher, journal, category, product):
+    """抓取单个商品详情并写入断点日志，出错时只保留列表页信息"""
     try:
-        await page.wait_for_selector('h1', timeout=20000)
-    except:
-        pass  # 即使超时也继续尝试提取
-    
-    detail = await page.evaluate("""
-        () => {
-            const p = {};
-            p.name = document.querySelector('h1')?.textContent?.trim() || '';
-            p.price = document.querySelector('h3')?.textContent?.trim() || '';
-            
-            // 提取breadcrumb - 从商品标题上方的breadcrumb区域提取
-            let bc = [];
-            const productTitle = document.querySelector('h1');
-            if (productTitle) {
-                let parent = productTitle.parentElement;
-                for (let i = 0; i < 5 && parent; i++) {
-                    const links = parent.querySelectorAll('a[href*="/sofas/"], a[href*="/tables/"], a[href*="/chairs/"], a[href*="/beds/"], a[href*="/storage/"], a[href*="/furniture-sets/"], a[href*="/outdoor/"], a[href*="/accessories/"]');
-                    if (links.length > 0) {
-                        links.forEach(link => {
-                            const text = link.textContent?.trim();
-                            const href = link.getAttribute('href') || link.href || '';
-                            if (text && text !== 'Home' && !text.includes('>') && !text.includes('Go to')) {
-                                if (!bc.includes(text)) bc.push(text);
-                            }
-                        });
-                        break;
-                    }
-                    parent = parent.parentElement;
-                }
-            }
-            
-            // 如果还是没找到，从URL推断
-            if (bc.length === 0) {
-                const url = window.location.pathname;
-                const categoryMap = {
-                    'sofas': 'Sofas',
-                    'tables': 'Tables', 
-                    'chairs': 'Chairs',
-                    'beds': 'Beds',
-                    'storage': 'Storage',
-                    'furniture-sets': 'Furniture Sets',
-                    'outdoor': 'Outdoor',
-                    'accessories': 'Accessories'
-                };
-                for (const [key, value] of Object.entries(categoryMap)) {
-                    if (url.includes('/' + key + '/')) {
-                        bc.push(value);
-                        break;
-                    }
-                }
-            }
-            
-            // 确定category和collection
-            const mainCategories = ['Sofas','Tables','Chairs','Beds','Storage','Furniture Sets','Outdoor','Accessories'];
-            p.category = bc.find(b => mainCategories.some(c => b.includes(c))) || '';
-            if (bc.length > 1) {
-                const categoryIndex = bc.findIndex(b => mainCategories.some(c => b.includes(c)));
-                if (categoryIndex >= 0 && categoryIndex < bc.length - 1) {
-                    p.collection = bc[bc.length - 1];
-                } else if (bc.length > 0) {
-                    p.collection = bc[bc.length - 1];
-                }
-            } else if (bc.length === 1) {
-                p.collection = '';
-            }
-            
-            const opts = [];
-            const excludeTypes = ['singapore', 'country selector', 'go to', 'pagination', 'stocked', 'view', 'get', 'add-on'];
-            
-            // 方法1: 从文本中提取（更准确）
-            const bodyText = document.body.innerText;
-            const patterns = ['Model:', 'material:', 'colour:', 'orientation:', 'table:', 'frame cover:', 'variant:', 'length:', 'size:', 'color:', 'finish:', 'leg color:', 'leg:', 'wood:', 'power recliner qty:', 'bench:', 'chair material:', 'chairs qty:', 'height:', 'width:', 'depth:'];
-            
-            patterns.forEach(pattern => {
-                const regex = new RegExp(pattern + '\\\\s*([^\\\\n]+)', 'i');
-                const match = bodyText.match(regex);
-                if (match) {
-                    const type = pattern.replace(':', '').trim().toLowerCase();
-                    // 过滤无关类型
-                    if (excludeTypes.some(ex => type.includes(ex))) return;
-                    
-                    const currentVal = match[1].trim().split('\\\\n')[0].trim();
-                    if (currentVal && currentVal.length < 100 && currentVal.length > 0) {
-                        const vals = [currentVal];
-                        // 查找相关的按钮选项
-                        document.querySelectorAll('button[aria-label*="Select"]').forEach(btn => {
-                            const v = btn.getAttribute('aria-label')?.replace(/^Select\\\\s+/i, '');
-                            if (v && v.toLowerCase().includes(type.toLowerCase()) && !vals.includes(v)) vals.push(v);
-                        });
-                        // 查找radiogroup选项
-                        document.querySelectorAll('radiogroup generic[cursor="pointer"], generic[cursor="pointer"]').forEach(r => {
-                            const v = r.textContent?.trim();
-                            if (v && v.length < 80 && v.length > 0 && !vals.includes(v) && v !== currentVal) vals.push(v);
-                        });
-                        if (vals.length > 0) {
-                            opts.push({ type: type, values: [...new Set(vals)] });
-                        }
-                    }
-                }
-            });
-            
-            // 方法2: 从DOM结构中提取选项（作为补充，但需要更严格的过滤）
-            const optionSections = document.querySelectorAll('[class*="option"], [class*="variant"], [class*="selector"]');
-            optionSections.forEach(section => {
-                const labelEl = section.querySelector('label, [class*="label"], [aria-label]');
-                let label = labelEl?.textContent?.trim() || labelEl?.getAttribute('aria-label') || '';
-                label = label.replace(':', '').trim().toLowerCase();
-                
-                // 严格过滤
-                if (!label || excludeTypes.some(ex => label.includes(ex))) return;
-                if (label.length < 2 || label.length > 30) return;
-                if (opts.find(o => o.type === label)) return;
-                
-                const values = [];
-                const currentEl = section.querySelector('[class*="selected"], [aria-selected="true"]');
-                if (currentEl) {
-                    const currentVal = currentEl.textContent?.trim() || currentEl.getAttribute('aria-label')?.replace(/^Select\\\\s+/i, '');
-                    if (currentVal && currentVal.length < 100) values.push(currentVal);
-                }
-                
-                section.querySelectorAll('button[aria-label*="Select"], button[class*="option"]').forEach(btn => {
-                    const v = btn.getAttribute('aria-label')?.replace(/^Select\\\\s+/i, '') || btn.textContent?.trim();
-                    if (v && v.length < 100 && !values.includes(v)) values.push(v);
-                });
-                
-                section.querySelectorAll('radiogroup generic[cursor="pointer"], generic[cursor="pointer"]').forEach(r => {
-                    const v = r.textContent?.trim();
-                    if (v && v.length < 80 && v.length > 0 && !values.includes(v)) values.push(v);
-                });
-                
-                if (label && values.length > 0) {
-                    opts.push({ type: label, values: [...new Set(values)] });
-                }
-            });
-            
-            p.options = opts;
-            
-            const imgs = Array.from(document.querySelectorAll('img[src*="cloudinary"][src*="crusader/variants"]'))
-                .filter(img => !img.src.includes('swatch') && !img.src.includes('icon') && !img.src.includes('UGC') && !img.src.includes('Social') && !img.src.includes('video'))
-                .map(img => img.src)
-                .filter(Boolean);
-            p.images = [...new Set(imgs)].slice(0, 10);
-            
-            return p;
+        # 优先走 HTTP 快速通道，解析失败再交给页面池用浏览器渲染
+        detail = await fetcher.fetch(product['url'])
+        if not detail:
+            detail = await pool.submit(render_product_detail, product['url'])
+        
+        # 合并信息
+        full_product = {
+            'name': detail.get('name') or product['name'],
+            'url': product['url'],
+            'price': detail.get('price') or product['price'],
+            'original_price': None,
+            'description': product.get('description', ''),
+            'category': detail.get('category') or category['name'],
+            'collection': detail.get('collection', ''),
+            'tag': product.get('tag', ''),
+            'delivery': 'Leaves warehouse by Feb 3',  # 默认值
+            'options': detail.get('options', []),
+            'images': [{'url': url} for url in detail.get('images', [])]
+        }
+    except Exception as e:
+        print(f"    [{category['name']}] 错误 ({product['name']}): {e}")
+        # 即使出错也添加基本信息
+        full_product = {
+            'name': product['name'],
+            'url': product['url'],
+            'price': product['price'],
+            'original_price': None,
+            'description': product.get('description', ''),
+            'category': category['name'],
+            'collection': '',
+            'tag': product.get('tag', ''),
+            'delivery': '',
+            'options': [],
+            'images': []
         }
-    """)
-    return detail
+    journal.append(category['name'], full_product, index=product['index'])
+    return full_product
+
+async def scrape_category(browser, pool, category, dedup, blocker, fetcher, journal):
+    """抓取单个类目的商品，并去重
 
-async def scrape_category(browser, category, seen_urls, seen_names):
-    """抓取单个类目的商品，并去重"""
+    列表页边滚动边产出新商品链接，每个新商品立即交给详情抓取任务，
+    列表收集和详情抓取同时进行。
+    """
     print(f"正在处理类目: {category['name']}")
     page = await browser.new_page()
+    await install_extractors(page.context)
+    await blocker.attach(page)
+    
+    def accept(product):
+        """去重检查；通过的商品立即记入已见集合，避免同一类目内重复"""
+        i = product['index']
+        # 断点续爬：日志中已完成的商品直接跳过
+        if journal.has(product['url']):
+            print(f"  跳过已完成商品 {i}: {product['name']} (断点日志中已存在)")
+            return False
+        
+        # 近似去重：规范化URL（含变体参数）相同，或名称/图片资源ID/价格足够相似
+        decision = dedup.check(product, category['name'])
+        if decision.duplicate:
+            reason = 'URL已存在' if decision.reason == 'url' else f'与 {decision.match[0]} 相似度 {decision.score:.2f}'
+            print(f"  跳过重复商品 {i}: {product['name']} ({reason})")
+            return False
+        if decision.reason == 'variant':
+            print(f"  新变体 {i}: {product['name']} ({product['url']})")
+        
+        dedup.add(product, category['name'])
+        return True
     
+    tasks = []
     try:
         # 访问类目页面
         await page.goto(category['url'], wait_until='domcontentloaded', timeout=60000)
-        await asyncio.sleep(2)  # 等待页面加载
-        
-        # 提取商品列表
-        products = await extract_products_from_list(page, PRODUCTS_PER_CATEGORY)
-        print(f"  找到 {len(products)} 个商品链接")
-        
-        # 访问每个商品详情页
-        detailed_products = []
-        for i, product in enumerate(products, 1):
-            # 检查是否重复（基于URL）
-            normalized_url = normalize_url(product['url'])
-            if normalized_url in seen_urls:
-                print(f"  跳过重复商品 {i}/{len(products)}: {product['name']} (URL已存在)")
-                continue
-            
-            # 检查名称是否重复
-            normalized_name = normalize_name(product['name'])
-            if normalized_name in seen_names:
-                print(f"  跳过重复商品 {i}/{len(products)}: {product['name']} (名称已存在)")
-                continue
-            
-            print(f"  处理商品 {i}/{len(products)}: {product['name']}")
-            try:
-                await page.goto(product['url'], wait_until='domcontentloaded', timeout=60000)
-                await asyncio.sleep(1.5)  # 减少等待时间
-                
-                detail = await extract_product_detail(page)
-                
-                # 合并信息
-                full_product = {
-                    'name': detail.get('name') or product['name'],
-                    'url': product['url'],
-                    'price': detail.get('price') or product['price'],
-                    'original_price': None,
-                    'description': product.get('description', ''),
-                    'category': detail.get('category') or category['name'],
-                    'collection': detail.get('collection', ''),
-                    'tag': product.get('tag', ''),
-                    'delivery': 'Leaves warehouse by Feb 3',  # 默认值
-                    'options': detail.get('options', []),
-                    'images': [{'url': url} for url in detail.get('images', [])]
-                }
-                
-                # 添加到已见集合
-                seen_urls.add(normalized_url)
-                seen_names.add(normalized_name)
-                
-                detailed_products.append(full_product)
-            except Exception as e:
-                print(f"    错误: {e}")
-                # 即使出错也添加基本信息（如果URL不重复）
-                normalized_url = normalize_url(product['url'])
-                if normalized_url not in seen_urls:
-                    seen_urls.add(normalized_url)
-                    detailed_products.append({
-                        'name': product['name'],
-                        'url': product['url'],
-                        'price': product['price'],
-                        'original_price': None,
-                        'description': product.get('description', ''),
-                        'category': category['name'],
-                        'collection': '',
-                        'tag': product.get('tag', ''),
-                        'delivery': '',
-                        'options': [],
-                        'images': []
-                    })
+        await settle_page(page, LISTING)  # 等待商品卡片出现
         
-        print(f"  成功处理 {len(detailed_products)} 个新商品")
-        return detailed_products
+        # 边收集列表边抓取详情
+        async for product in harvest_listing(page, PRODUCTS_PER_CATEGORY, accept=accept):
+            print(f"  处理商品 {product['index']}: {product['name']}")
+            tasks.append(asyncio.create_task(scrape_product(pool, fetcher, journal, category, product)))
+        print(f"  [{category['name']}] 列表收集完成，{len(tasks)} 个新商品")
     finally:
         await page.close()
+        # 列表页出错时也等已经开始的详情任务完成，它们已写入断点日志
+        detailed_products = await asyncio.gather(*tasks)
+    
+    print(f"  [{category['name']}] 成功处理 {len(detailed_products)} 个新商品")
+    return list(detailed_products)
 
-async def main():
-    """主函数"""
-    output_file = Path(__file__).parent / 'products_extended.yaml'
+async def main(resume=False, concurrency=DEFAULT_CONCURRENCY, variants=False, output_file=None, existing_file=None):
+    """主函数；output_file / existing_file 默认为脚本目录下的 products_extended.yaml / products.yaml"""
+    output_file = Path(output_file or Path(__file__).parent / 'products_extended.yaml')
+    journal_file = output_file.with_suffix('.journal.jsonl')
     
     # 读取现有文件，用于去重
-    existing_file = Path(__file__).parent / 'products.yaml'
-    seen_urls = set()
-    seen_names = set()
+    existing_file = Path(existing_file or Path(__file__).parent / 'products.yaml')
+    dedup = DedupIndex()
     
     if existing_file.exists():
         print(f"读取现有文件 {existing_file} 用于去重...")
         try:
-            with open(existing_file, 'r', encoding='utf-8') as f:
-                existing_data = yaml.safe_load(f)
-            
-            # 提取现有商品的URL和名称
-            # 支持两种格式：categories 列表或 categories 字典
-            if existing_data:
-                categories_list = []
-                if 'categories' in existing_data:
-                    categories_list = existing_data['categories']
-                elif isinstance(existing_data, list):
-                    categories_list = existing_data
-                
-                for cat in categories_list:
-                    if isinstance(cat, dict) and 'products' in cat:
-                        for product in cat.get('products', []):
-                            url = product.get('url', '')
-                            name = product.get('name', '')
-                            if url:
-                                seen_urls.add(normalize_url(url))
-                            if name:
-                                seen_names.add(normalize_name(name))
+            # 使用带缓存的目录加载器，products.yaml 没变时直接读缓存
+            for category, product in iter_products(load_catalog(existing_file)):
+                dedup.add(product, category.get('name'))
             
-            print(f"  已加载 {len(seen_urls)} 个现有商品URL用于去重")
+            print(f"  已加载 {len(dedup)} 个现有商品用于去重")
         except Exception as e:
             print(f"  读取现有文件失败: {e}，将从头开始爬取")
             import traceback
             traceback.print_exc()
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
-        
-        all_categories = []
-        total_new_products = 0
-        
-        for category in CATEGORIES:
-            try:
-                products = await scrape_category(browser, category, seen_urls, seen_names)
-                total_new_products += len(products)
-                all_categories.append({
-                    'name': category['name'],
-                    'url': category['url'],
-                    'products': products
-                })
-            except Exception as e:
-                print(f"处理类目 {category['name']} 时出错: {e}")
-                all_categories.append({
-                    'name': category['name'],
-                    'url': category['url'],
-                    'products': []
-                })
-        
-        await browser.close()
-        
-        # 保存到YAML文件
-        data = {'categories': all_categories}
-        with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(data, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+    # 打开断点日志（与去重同样按含变体参数的URL记录）；续爬时已完成的商品也参与去重
+    journal = CrawlJournal(journal_file, variant_url_key).open(resume=resume)
+    if resume:
+        print(f"从断点日志 {journal_file} 续爬，已完成 {len(journal.records)} 个商品")
+        for product in journal.products():
+            dedup.add(product, product.get('category'))
+    
+    with journal:
+        async with async_playwright() as p, FastDetailFetcher() as fetcher:
+            browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+            
+            total_new_products = 0
+            blocker = ResourceBlocker()
+            
+            async def setup_page(page):
+                await install_extractors(page.context)
+                await blocker.attach(page)
+            
+            # 详情页由页面池并发渲染；类目之间仍按顺序处理，保证去重结果确定
+            async with PagePool(browser, concurrency, setup_page=setup_page) as pool:
+                for category in CATEGORIES:
+                    try:
+                        products = await scrape_category(browser, pool, category, dedup, blocker, fetcher, journal)
+                        total_new_products += len(products)
+                    except Exception as e:
+                        print(f"处理类目 {category['name']} 时出错: {e}")
+            
+            await browser.close()
         
-        print(f"\n完成! 数据已保存到 {output_file}")
-        print(f"共处理 {len(all_categories)} 个类目")
-        print(f"共爬取 {total_new_products} 个新商品（已去重）")
+        # 把断点日志流式整理成YAML和JSONL文件
+        total_products = journal.compact(output_file, CATEGORIES, variants=variants)
+    
+    print(f"\n完成! 数据已保存到 {output_file} 和 {output_file.with_suffix('.jsonl')}")
+    print(f"共处理 {len(CATEGORIES)} 个类目")
+    print(f"本次爬取 {total_new_products} 个新商品（已去重），输出共 {total_products} 个商品")
+    dedup.report()
+    settle_stats.report()
+    blocker.report()
+    fetcher.report()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='批量抓取Castlery更多商品信息并去重')
+    parser.add_argument('--resume', action='store_true',
+                        help='从断点日志继续，跳过已完成的商品URL')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'并发渲染详情页的浏览器页面数量（默认 {DEFAULT_CONCURRENCY}）')
+    parser.add_argument('--variants', action='store_true',
+                        help='YAML 按变体聚合输出（同一商品的不同面料/尺寸合并为一个商品族）')
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    args = parse_args()
+    asyncio.run(main(resume=args.resume, concurrency=args.concurrency, variants=args.variants))
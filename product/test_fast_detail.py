@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+测试快速通道的 HTML 解析和回退判断（不需要浏览器和网络）
+fixtures/ 下是保存下来的详情页 HTML：只有 JSON-LD、只有 __NEXT_DATA__、两者都没有（需要回退到浏览器）
+
+    python test_fast_detail.py
+    python -m pytest test_fast_detail.py
+"""
+
+import asyncio
+from pathlib import Path
+
+from fast_detail import (
+    FastDetailFetcher, httpx, parse_json_ld, parse_next_data, parse_product_html, _EmbeddedDataParser,
+)
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+CDN = 'https://res.cloudinary.com/castlery/image/upload/w_1200/crusader/variants'
+
+EXPECTED = {
+    'detail_json_ld.html': {
+        'name': 'Dawson Chaise Sectional Sofa',
+        'price': '$2,899',
+        'category': 'Sofas',
+        'collection': 'Dawson Collection',
+        'options': [
+            {'type': 'orientation', 'values': ['Left Facing']},
+            {'type': 'color', 'values': ['Performance Boucle', 'Ivory']},
+        ],
+        # 色卡图被过滤，重复的变体图只保留一张
+        'images': [f'{CDN}/40440611/dawson-chaise-1.jpg', f'{CDN}/40440612/dawson-chaise-boucle.jpg'],
+    },
+    'detail_next_data.html': {
+        'name': 'Seb Extendable Dining Table',
+        'price': '$1,299',
+        'category': 'Tables',
+        'collection': 'Seb Collection',
+        'options': [
+            {'type': 'size', 'values': ['1.6m', '2m']},
+            {'type': 'finish', 'values': ['Natural', 'Walnut']},
+        ],
+        # 图标被过滤
+        'images': [f'{CDN}/50120001/seb-table-1.jpg', f'{CDN}/50120002/seb-table-2.jpg'],
+    },
+    'detail_no_embedded_data.html': None,  # 只有渲染后的 DOM 能读出商品信息，需要回退
+}
+
+
+def load(name):
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+
+def embedded(name):
+    parser = _EmbeddedDataParser()
+    parser.feed(load(name))
+    return parser
+
+
+def test_json_ld_only():
+    parser = embedded('detail_json_ld.html')
+    assert parser.next_data is None
+    assert parse_json_ld(parser.json_ld) == EXPECTED['detail_json_ld.html']
+    assert parse_product_html(load('detail_json_ld.html')) == EXPECTED['detail_json_ld.html']
+
+
+def test_next_data_only():
+    parser = embedded('detail_next_data.html')
+    assert parser.json_ld == []
+    assert parse_next_data(parser.next_data) == EXPECTED['detail_next_data.html']
+    assert parse_product_html(load('detail_next_data.html')) == EXPECTED['detail_next_data.html']
+
+
+def test_no_embedded_data_falls_back():
+    parser = embedded('detail_no_embedded_data.html')
+    assert parser.next_data is None
+    assert parse_json_ld(parser.json_ld) is None  # 只有 Organization，没有 Product
+    assert parse_product_html(load('detail_no_embedded_data.html')) is None
+
+
+def test_category_from_url():
+    # JSON-LD 没有面包屑时类目取自 URL
+    html = load('detail_json_ld.html').replace('"BreadcrumbList"', '"SiteNavigationElement"')
+    detail = parse_product_html(html, 'https://www.castlery.com/sg/sofas/dawson-chaise-sectional-sofa')
+    assert detail['category'] == 'Sofas'
+    assert detail['collection'] == ''
+
+
+async def _fetch_all(pages):
+    """用 httpx.MockTransport 代替网络，返回 (url -> 解析结果, fetcher)"""
+    def handler(request):
+        name = request.url.path.rsplit('/', 1)[-1]
+        headers = {'etag': f'"{name}"', 'last-modified': 'Mon, 01 Jun 2026 00:00:00 GMT'}
+        return httpx.Response(200, text=load(name), headers=headers)
+
+    async with FastDetailFetcher(concurrency=2) as fetcher:
+        await fetcher._client.aclose()
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        results = {url: await fetcher.fetch(url) for url in pages}
+    return results, fetcher
+
+
+def test_fetcher_fallback_decision():
+    if httpx is None:
+        print("⚠️  未安装 httpx，跳过 FastDetailFetcher 测试")
+        return
+    pages = [f'https://www.castlery.com/sg/products/{name}' for name in EXPECTED]
+    results, fetcher = asyncio.run(_fetch_all(pages))
+    for url, name in zip(pages, EXPECTED):
+        assert results[url] == EXPECTED[name]
+        # 回退的页面也记下了验证器，下次可以发条件请求
+        assert fetcher.validators[url]['etag'] == f'"{name}"'
+    assert (fetcher.hits, fetcher.misses) == (2, 1)
+
+
+def main():
+    tests = [test_json_ld_only, test_next_data_only, test_no_embedded_data_falls_back, test_category_from_url,
+             test_fetcher_fallback_decision]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
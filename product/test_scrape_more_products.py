@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+测试 scrape_more_products 的去重 + 断点日志 + 整理输出流程（不需要浏览器和网络）
+列表页、详情页都用假的对象代替：列表依次产出几个商品卡片（包括同一商品的两个变体），
+检查哪些商品被抓取并写入断点日志，以及 --variants 输出的商品族展开后与抓取结果一致。
+
+    python test_scrape_more_products.py
+    python -m pytest test_scrape_more_products.py
+"""
+
+import asyncio
+import json
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import yaml
+
+import scrape_more_products
+from catalog import iter_products, load_catalog
+from catalog_writer import CatalogWriter
+from crawl_journal import CrawlJournal
+from dedup import DedupIndex, variant_url_key
+
+PRODUCT_URL = 'https://www.castlery.com/sg/products/dawson-chaise-sectional-sofa'
+CDN = 'https://res.cloudinary.com/castlery/image/upload/w_1200/crusader/variants'
+CATEGORY = scrape_more_products.CATEGORIES[0]  # Sofas
+
+# 列表页上的卡片：已有商品（products.yaml 中）、同一个新商品的两个变体、参数顺序不同的重复卡片
+EXISTING = {'name': 'Madison Sofa', 'url': 'https://www.castlery.com/sg/products/madison-sofa?material=ivory',
+            'price': '$1,499', 'imageUrl': f'{CDN}/MS-000101-IV01/madison.jpg'}
+LISTING = [
+    dict(EXISTING),
+    {'name': 'Dawson Chaise Sectional Sofa', 'url': f'{PRODUCT_URL}?material=boucle&orientation=left',
+     'price': '$2,899', 'imageUrl': f'{CDN}/DS-040440-BC01/dawson-boucle.jpg'},
+    {'name': 'Dawson Chaise Sectional Sofa', 'url': f'{PRODUCT_URL}?material=ivory&orientation=left',
+     'price': '$2,899', 'imageUrl': f'{CDN}/DS-040440-IV01/dawson-ivory.jpg'},
+    {'name': 'Dawson Chaise Sectional Sofa', 'url': f'{PRODUCT_URL}?orientation=left&material=ivory',
+     'price': '$2,899', 'imageUrl': f'{CDN}/DS-040440-IV01/dawson-ivory.jpg'},
+]
+# 详情页（按 URL）；两个变体只有价格、选项值和图片不同
+DETAILS = {
+    LISTING[1]['url']: {'name': 'Dawson Chaise Sectional Sofa', 'price': '$2,899', 'category': 'Sofas',
+                        'collection': 'Dawson', 'options': [{'type': 'material', 'values': ['Boucle']}],
+                        'images': [f'{CDN}/DS-040440-BC01/dawson-boucle-1.jpg',
+                                   f'{CDN}/DS-040440-BC01/dawson-boucle-2.jpg']},
+    LISTING[2]['url']: {'name': 'Dawson Chaise Sectional Sofa', 'price': '$2,999', 'category': 'Sofas',
+                        'collection': 'Dawson', 'options': [{'type': 'material', 'values': ['Ivory']}],
+                        'images': [f'{CDN}/DS-040440-IV01/dawson-ivory-1.jpg']},
+}
+
+
+class FakePage:
+    context = None
+    url = 'about:blank'
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        return None
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    """代替 async_playwright()：chromium.launch() 返回 FakeBrowser"""
+
+    def __init__(self):
+        self.chromium = self
+
+    async def launch(self, **kwargs):
+        return FakeBrowser()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeBlocker:
+    async def attach(self, page):
+        pass
+
+    def report(self):
+        pass
+
+
+class FakeFetcher:
+    """快速通道：按 URL 返回详情，记录请求过的 URL"""
+
+    def __init__(self):
+        self.fetched = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def report(self):
+        pass
+
+    async def fetch(self, url):
+        self.fetched.append(url)
+        return DETAILS.get(url)
+
+
+class FakePool:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def submit(self, job, *args):
+        raise AssertionError(f"不应回退到浏览器: {args}")
+
+
+async def fake_harvest_listing(page, target, accept=None):
+    """与 listing_harvester.harvest_listing 相同的约定：按发现顺序编号，accept 返回 False 的不产出；
+    只有 Sofas 类目页有商品"""
+    if page.url != CATEGORY['url']:
+        return
+    for index, card in enumerate(LISTING, 1):
+        product = dict(card, index=index, description='', tag='')
+        if accept is None or accept(product):
+            yield product
+
+
+async def _noop(*args, **kwargs):
+    return True
+
+
+@contextmanager
+def fake_browser(**replacements):
+    """把 scrape_more_products 中用到浏览器的部分换成假的对象，退出时恢复"""
+    replacements = dict({'harvest_listing': fake_harvest_listing, 'install_extractors': _noop,
+                         'settle_page': _noop}, **replacements)
+    originals = {name: getattr(scrape_more_products, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(scrape_more_products, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(scrape_more_products, name, value)
+
+
+def crawl(journal_path):
+    """用假的列表页跑一遍 scrape_category，返回 (新商品, 快速通道请求过的 URL, 断点日志, 去重索引)"""
+    with fake_browser():
+        dedup = DedupIndex()
+        dedup.add(EXISTING, CATEGORY['name'])
+        fetcher = FakeFetcher()
+        journal = CrawlJournal(journal_path, variant_url_key).open()
+        products = asyncio.run(scrape_more_products.scrape_category(
+            FakeBrowser(), FakePool(), CATEGORY, dedup, FakeBlocker(), fetcher, journal))
+        return products, fetcher.fetched, journal, dedup
+
+
+def test_both_variants_are_journaled():
+    with tempfile.TemporaryDirectory() as tmp:
+        products, fetched, journal, dedup = crawl(Path(tmp) / 'products_extended.journal.jsonl')
+        with journal:
+            # 已有商品和参数顺序不同的重复卡片被跳过，两个变体都被抓取
+            assert fetched == [LISTING[1]['url'], LISTING[2]['url']]
+            assert [p['url'] for p in products] == [LISTING[1]['url'], LISTING[2]['url']]
+            assert journal.has(LISTING[1]['url']) and journal.has(LISTING[2]['url'])
+            assert journal.has(LISTING[3]['url'])  # 参数顺序不影响键
+            assert not journal.has(PRODUCT_URL)
+            assert len(journal.records) == 2
+            assert [p['price'] for p in journal.products()] == ['$2,899', '$2,999']
+        assert (dedup.counts['url'], dedup.counts['variant'], dedup.counts['new']) == (2, 1, 1)
+
+        # 续爬：日志中的两个变体都被识别为已完成
+        resumed = CrawlJournal(Path(tmp) / 'products_extended.journal.jsonl', variant_url_key).open(resume=True)
+        with resumed:
+            assert len(resumed.records) == 2
+            assert resumed.has(LISTING[1]['url']) and resumed.has(LISTING[2]['url'])
+
+
+def test_variants_end_to_end():
+    """main(variants=True)：抓取 -> 断点日志 -> 按变体聚合的 YAML，展开后与逐条输出的 JSONL 一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        existing_file = tmp / 'products.yaml'
+        with CatalogWriter(existing_file, [CATEGORY]) as writer:
+            writer.add_product(0, EXISTING, 1)
+        output_file = tmp / 'products_extended.yaml'
+        with fake_browser(async_playwright=FakePlaywright, FastDetailFetcher=FakeFetcher, PagePool=FakePool,
+                          ResourceBlocker=FakeBlocker):
+            asyncio.run(scrape_more_products.main(variants=True, output_file=output_file,
+                                                  existing_file=existing_file))
+
+        data = yaml.safe_load(output_file.read_text(encoding='utf-8'))
+        sofas = data['categories'][0]
+        assert sofas['name'] == 'Sofas' and 'products' not in sofas
+        assert len(sofas['families']) == 1
+        family = sofas['families'][0]
+        assert family['base_url'] == PRODUCT_URL
+        assert sorted(family['variants']) == ['material=boucle&orientation=left', 'material=ivory&orientation=left']
+        assert all(not category.get('families') for category in data['categories'][1:])
+
+        # 展开后的商品与逐条写出的 JSONL（未聚合）完全相同
+        flat = [json.loads(line)['product'] for line in output_file.with_suffix('.jsonl').open(encoding='utf-8')]
+        expanded = [product for _, product in iter_products(load_catalog(output_file, use_cache=False))]
+        assert [p['url'] for p in flat] == [LISTING[1]['url'], LISTING[2]['url']]
+        assert sorted(expanded, key=lambda p: p['url']) == sorted(flat, key=lambda p: p['url'])
+        assert {p['price'] for p in expanded} == {'$2,899', '$2,999'}
+
+
+def main():
+    tests = [test_both_variants_are_journaled, test_variants_end_to_end]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__name__}: {e!r}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+按变体聚合的紧凑商品格式
+同一商品的不同面料/尺寸（...sofa?material=sadie_ivory&length=2_03m）原来各自是一条完整记录，
+名称、描述、选项和图片大量重复。紧凑格式把它们合并成一个商品族：
+
+    families:
+    - base_url: https://www.castlery.com/sg/products/agnes-slipcover-storage-3-seater-sofa
+      name: ...              # 所有变体相同的字段只存一次
+      image_prefix: https://res.cloudinary.com/castlery/image/private/w_1995,.../
+      images: [v1756710507/crusader/variants/AS-000955-SD4001/xxx.jpg, ...]  # 按资源ID去重
+      variants:
+        length=2_03m&material=sadie_ivory:   # 按选项排序后的查询参数，查找为 O(1)
+          images: [0, 1, 2]  # 族图片下标；与族图片完全相同时省略
+                             # 同一 public_id 的不同变换只保留一个 URL，需要其它尺寸时按 public_id 重新生成
+          price: $1,699      # 只存与族不同的字段
+
+catalog.iter_products() 读取时会自动展开成原来的平铺商品，下游加载代码不需要改动。
+"""
+
+import argparse
+import re
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# 抓取脚本输出的字段顺序，展开时按这个顺序重建商品字典
+FIELD_ORDER = ('name', 'url', 'price', 'original_price', 'description', 'category',
+               'collection', 'tag', 'delivery', 'options', 'images')
+
+# Cloudinary 图片 URL: <前缀: .../image/private/变换参数/> + <v版本号/public_id>
+CLOUDINARY_RE = re.compile(r'^(https?://res\.cloudinary\.com/.+?/)(v\d+/.+)$')
+
+
+def split_variant_url(url):
+    """商品 URL -> (基础 URL, 变体参数字典)"""
+    parts = urlsplit(url or '')
+    base_url = f"{parts.scheme}://{parts.netloc}{parts.path}" if parts.netloc else parts.path
+    return base_url, dict(parse_qsl(parts.query, keep_blank_values=True))
+
+
+def variant_key(params):
+    """变体参数 -> 排序后的查询字符串，作为变体表的键"""
+    return urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+def variant_url(base_url, key):
+    return f"{base_url}?{key}" if key else base_url
+
+
+def split_image_url(url):
+    """Cloudinary 图片 URL -> (变换前缀, 'v版本号/public_id')；不是 Cloudinary 图片时前缀为空"""
+    match = CLOUDINARY_RE.match(url or '')
+    return (match.group(1), match.group(2)) if match else ('', url or '')
+
+
+def image_asset_key(url):
+    """图片去重的键：public_id（忽略变换参数和版本号）"""
+    _, rest = split_image_url(url)
+    return re.sub(r'^v\d+/', '', rest)
+
+
+def _image_urls(product):
+    return [image.get('url') if isinstance(image, dict) else image for image in product.get('images') or []]
+
+
+def compact_family(base_url, members):
+    """把同一基础 URL 的若干变体合并成一个商品族，members 为 [(变体键, 商品字典)]"""
+    family = {'base_url': base_url}
+    products = [product for _, product in members]
+
+    # 所有变体都有且取值相同的字段放到族里
+    shared_keys = [
+        key for key in products[0]
+        if key not in ('url', 'images') and all(key in p and p[key] == products[0][key] for p in products[1:])
+    ]
+    for key in shared_keys:
+        family[key] = products[0][key]
+
+    # 图片按 public_id 去重；最常见的变换前缀只存一次，其余图片保留完整 URL
+    image_urls, image_index = [], {}
+    for product in products:
+        for url in _image_urls(product):
+            asset = image_asset_key(url)
+            if asset not in image_index:
+                image_index[asset] = len(image_urls)
+                image_urls.append(url)
+    prefixes = Counter(split_image_url(url)[0] for url in image_urls)
+    prefix = prefixes.most_common(1)[0][0] if prefixes else ''
+    if prefix:
+        family['image_prefix'] = prefix
+        family['images'] = [url[len(prefix):] if url.startswith(prefix) else url for url in image_urls]
+    else:
+        family['images'] = image_urls
+
+    all_images = list(range(len(image_urls)))
+    variants = {}
+    for key, product in members:
+        row = {k: v for k, v in product.items() if k not in shared_keys and k not in ('url', 'images')}
+        if product.get('url') != variant_url(base_url, key):
+            row['url'] = product.get('url')  # 参数顺序不同等情况，保留原 URL
+        # 同一资源的不同变换（如有无 b_rgb 背景）只保留第一次出现的 URL
+        indexes = list(dict.fromkeys(image_index[image_asset_key(url)] for url in _image_urls(product)))
+        if indexes != all_images:
+            row['images'] = indexes
+        variants[key] = row
+    family['variants'] = variants
+    return family
+
+
+def compact_products(products):
+    """平铺商品列表 -> 商品族列表（按每个族第一次出现的位置排序）"""
+    groups = {}
+    for product in products:
+        base_url, params = split_variant_url(product.get('url'))
+        key = variant_key(params)
+        members = groups.setdefault(base_url, [])
+        if any(existing_key == key for existing_key, _ in members):
+            # 同一变体重复出现（不应该发生），作为单独的族保留，不丢数据
+            groups.setdefault(f"{base_url}#{len(groups)}", []).append((key, product))
+            continue
+        members.append((key, product))
+    return [compact_family(base_url.split('#')[0], members) for base_url, members in groups.items()]
+
+
+def expand_variant(family, key, row=None):
+    """族 + 变体键 -> 原来的平铺商品字典"""
+    row = family['variants'][key] if row is None else row
+    prefix = family.get('image_prefix', '')
+    images = family.get('images') or []
+    indexes = row.get('images', range(len(images)))
+    merged = {k: v for k, v in family.items() if k not in ('base_url', 'image_prefix', 'images', 'variants')}
+    merged.update({k: v for k, v in row.items() if k != 'images'})
+    merged.setdefault('url', variant_url(family['base_url'], key))
+    merged['images'] = [{'url': images[i] if '://' in images[i] else prefix + images[i]} for i in indexes]
+    ordered = {k: merged.pop(k) for k in FIELD_ORDER if k in merged}
+    ordered.update(merged)
+    return ordered
+
+
+def expand_family(family):
+    for key, row in family['variants'].items():
+        yield expand_variant(family, key, row)
+
+
+def find_variant(family, **options):
+    """按选项参数查找变体，如 find_variant(family, material='sadie_ivory', length='2_03m')"""
+    key = variant_key(options)
+    if key not in family['variants']:
+        return None
+    return expand_variant(family, key)
+
+
+def compact_catalog(data):
+    """{'categories': [{name, url, products}]} -> {'categories': [{name, url, families}]}"""
+    categories = []
+    for category in data.get('categories', []):
+        compact = {k: v for k, v in category.items() if k != 'products'}
+        compact['families'] = compact_products(category.get('products') or [])
+        categories.append(compact)
+    return {'categories': categories}
+
+
+def main(args):
+    from catalog import load_catalog, iter_products
+    from catalog_writer import dump_yaml
+
+    source = Path(args.input)
+    output = Path(args.output) if args.output else source.with_name(source.stem + '.variants.yaml')
+    data = load_catalog(source)
+    compact = compact_catalog(data)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(dump_yaml(compact))
+
+    products = sum(1 for _ in iter_products(data))
+    families = sum(len(c['families']) for c in compact['categories'])
+    restored = [p for _, p in iter_products(load_catalog(output, use_cache=False))]
+    assert len(restored) == products, '展开后的商品数量不一致'
+    print(f"{source} ({source.stat().st_size} 字节, {products} 个商品)")
+    print(f"  -> {output} ({output.stat().st_size} 字节, {families} 个商品族)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='把平铺的商品目录转换成按变体聚合的紧凑格式')
+    parser.add_argument('input', nargs='?', default=str(Path(__file__).parent / 'products.yaml'))
+    parser.add_argument('-o', '--output', help='输出文件（默认 <输入>.variants.yaml）')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    main(parse_args())